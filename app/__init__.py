@@ -10,12 +10,18 @@ from app.src.logic_user_interaction import generate_username, log_activity
 from app.src.routes_session import session_bp
 from app.src.routes_configure import configure_bp
 from app.src.routes_play import play_bp
+from app.src.logic_query_stats import init_query_stats
+from app.src.logic_profiling import init_profiling
+from app.src.logic_world_version import init_world_version
+from app.src.logic_fragment_cache import init_fragment_cache
+from app.src.logic_assets import init_assets
+from app.src.logic_compression import init_compression
 from .database import db, get_db_uri
 from .models import GENERAL_ID, EQUIPMENT_SLOTS_ID, StorageType
 from .serialization import init_game_session
 from .utils import format_num, htmlify_filter, mask_string
 
-def create_app():
+def create_app(db_uri=None, query_stats=False):
     app = Flask(__name__)
 
     # ------------------------------------------------------------------------
@@ -27,7 +33,7 @@ def create_app():
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=30)
     app.config['DATA_DIR'] = os.path.join(app.root_path, 'data_files')
 
-    app.config['SQLALCHEMY_DATABASE_URI'] = get_db_uri()
+    app.config['SQLALCHEMY_DATABASE_URI'] = db_uri or get_db_uri()
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
         'connect_args': {
@@ -37,6 +43,12 @@ def create_app():
 
     app.config['UPLOAD_DIR'] = os.path.join(app.config['DATA_DIR'], 'uploads')
     app.config['MAX_CONTENT_LENGTH'] = 20 * 1024 * 1024
+    app.config['QUERY_STATS'] = False
+    app.config['PROFILE_DIR'] = os.path.join(
+        os.path.dirname(app.root_path), 'sqlite_data', 'profiles')
+    app.config['COMPRESS_MIN_BYTES'] = 1024
+    app.config['COMPRESS_GZIP_LEVEL'] = 6
+    app.config['COMPRESS_BROTLI_QUALITY'] = 5
 
     # ------------------------------------------------------------------------
     # 2. Extensions Initialization
@@ -44,6 +56,14 @@ def create_app():
     db.init_app(app)
     Migrate(app, db)
     app.jinja_env.undefined = StrictUndefined
+    init_fragment_cache(app)
+    init_assets(app)
+    init_compression(app)
+    # Before the session middleware so that its work is measured too
+    if query_stats:
+        init_query_stats(app)
+    init_profiling(app)
+    init_world_version(app)
 
     # ------------------------------------------------------------------------
     # 3. Blueprints Registration
@@ -71,7 +91,8 @@ def create_app():
     def inject_user_vars():
         return {
             'current_username': session.get('username'),
-            'game_token': session.get('game_token')
+            'game_token': session.get('game_token'),
+            'query_stats': g.get('query_stats')
         }
 
     @app.context_processor
@@ -93,7 +114,8 @@ def create_app():
         """
         if request.endpoint and (
                 request.endpoint.startswith('static')
-                or 'favicon' in request.endpoint):
+                or 'favicon' in request.endpoint
+                or request.endpoint == 'session.metrics'):
             return
 
         # 1. Ensure Game Token exists in session
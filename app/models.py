@@ -1,6 +1,8 @@
+import hashlib
 import logging
 from datetime import datetime
 from sqlalchemy import select, event as sa_event, inspect as sa_inspect
+from sqlalchemy.orm import Mapper
 from .database import db
 
 logger = logging.getLogger(__name__)
@@ -31,22 +33,66 @@ class JsonKeys:
 # Key: (game_token, attrib_id) → Value: {label: entry_id}
 _enum_cache: dict[tuple, dict[str, int]] = {}
 
+# Returned for columns without a default; equal to no value
+_MISSING = object()
+
 # ------------------------------------------------------------------------
 # Model Utilities
 # ------------------------------------------------------------------------
 
+class HydrationPlan:
+    """
+    What creating objects of a model class needs to know about it,
+    worked out once instead of for every object.
+    """
+    def __init__(self, cls):
+        mapper = sa_inspect(cls)
+        self.known_names = frozenset(
+            [attr.key for attr in mapper.column_attrs]
+            + [rel.key for rel in mapper.relationships])
+        # Only the class's own table, not those of parent classes
+        columns = cls.__table__.columns
+        self.json_columns = frozenset(
+            col.name for col in columns if isinstance(col.type, db.JSON))
+        # (column name, default, whether the default must be called)
+        self.defaults = tuple(
+            (col.name, col.default.arg, callable(col.default.arg))
+            for col in columns if col.default is not None)
+        self.legacy_keys = tuple(getattr(cls, 'LEGACY_KEYS', {}).items())
+        self.legacy_values = tuple(
+            getattr(cls, 'LEGACY_VALUES', {}).items())
+        # Entities and Recipe get IDs from IdSequence
+        self.needs_id = cls in ENTITIES.values() or cls is Recipe
+
+    def default_for(self, col_name, missing=None):
+        for name, arg, is_callable in self.defaults:
+            if name == col_name:
+                return arg(None) if is_callable else arg
+        return missing
+
+# Key: model class → HydrationPlan
+_hydration_plans: dict[type, HydrationPlan] = {}
+
+def hydration_plan(cls):
+    plan = _hydration_plans.get(cls)
+    if plan is None:
+        plan = _hydration_plans[cls] = HydrationPlan(cls)
+    return plan
+
+@sa_event.listens_for(Mapper, 'after_configured')
+def _build_hydration_plans():
+    for mapper in db.Model.registry.mappers:
+        hydration_plan(mapper.class_)
+
 @sa_event.listens_for(db.Model, 'init', propagate=True)
 def auto_init_defaults(target, _args, kwargs):
     """
     Whenever a new Model instance is created, look for columns
     with defaults and apply them to the Python object immediately.
     """
-    for column in target.__table__.columns:
-        if column.default is not None and column.name not in kwargs:
-            if callable(column.default.arg):
-                setattr(target, column.name, column.default.arg(None))
-            else:
-                setattr(target, column.name, column.default.arg)
+    for name, arg, is_callable in hydration_plan(type(target)).defaults:
+        if name not in kwargs:
+            setattr(target, name, arg(None) if is_callable else arg)
 
 def deep_rel(attr, child_cls, fk_field):
     """Helper to format deep relationship dictionary entries."""
@@ -141,11 +187,10 @@ class DictHydrator(db.Model):
             raise ValueError(
                 f"Expected a dict but got {type(data).__name__}: {repr(data)}")
 
+        plan = hydration_plan(cls)
+
         # Log any unrecognized scalar fields
-        insp = sa_inspect(cls).mapper
-        column_names = {col.key for col in insp.column_attrs}
-        relationship_names = {rel.key for rel in insp.relationships}
-        known_names = column_names | relationship_names
+        known_names = plan.known_names
         for k in data:
             if k not in known_names and not isinstance(data[k], (list, dict)):
                 logger.warning(
@@ -154,43 +199,35 @@ class DictHydrator(db.Model):
                 )
 
         # Legacy self-healing
-        for old_key, new_key in cls.LEGACY_KEYS.items():
+        for old_key, new_key in plan.legacy_keys:
             if old_key in data:
                 data[new_key] = data.pop(old_key)
-        for key, values_map in cls.LEGACY_VALUES.items():
+        for key, values_map in plan.legacy_values:
             if key in data:
                 current_val = data[key]
                 if current_val in values_map:
                     data[key] = values_map[current_val]
 
         # Set simple values
+        json_columns = plan.json_columns
         for k, v in data.items():
-            if hasattr(cls, k):
-                column = cls.__table__.columns.get(k)
-                is_array_col = column is not None and isinstance(
-                    column.type, db.JSON)
-                if not isinstance(v, (list, dict)) or is_array_col:
-                    fields[k] = v
+            if isinstance(v, (list, dict)) and k not in json_columns:
+                continue
+            if k in known_names or hasattr(cls, k):
+                fields[k] = v
 
         # Apply mandatory IDs or overrides
         fields.update(overrides)
 
         # If this model needs a manual ID and doesn't have one, generate it.
-        # This applies to entities and Recipe.
-        if hasattr(cls, 'id') and fields.get('id') is None:
-            if cls in list(ENTITIES.values()) + [Recipe]:
-                fields['id'] = IdSequence.generate_next_id(game_token)
+        if plan.needs_id and fields.get('id') is None:
+            fields['id'] = IdSequence.generate_next_id(game_token)
 
         return cls(game_token=game_token, **fields)
 
     def _get_column_default(self, col_name):
         """Return the default value for a column, or a sentinel if none."""
-        _MISSING = object()  # defined at module level, not inline
-        column = self.__table__.columns.get(col_name)
-        if column is None or column.default is None:
-            return _MISSING
-        arg = column.default.arg
-        return arg(None) if callable(arg) else arg
+        return hydration_plan(type(self)).default_for(col_name, _MISSING)
 
     def to_dict_sparse(self, data: dict) -> dict:
         """Strip keys whose values are empty or match the column default."""
@@ -2287,6 +2324,19 @@ class IdSequence(db.Model):
 
         return assigned_id
 
+class GameVersion(db.Model):
+    """
+    Counts committed changes to each game, so that a request in any
+    worker can tell whether a page it sent earlier is still current.
+    The row with an empty token counts bulk statements, which can't be
+    traced to one game.
+    """
+    __tablename__ = 'game_versions'
+    game_token = db.Column(db.String(50), primary_key=True)
+    world = db.Column(db.Integer, nullable=False, default=0)
+    # Only changes to the scenario setup
+    config = db.Column(db.Integer, nullable=False, default=0)
+
 # ------------------------------------------------------------------------
 # Session Tracking
 # ------------------------------------------------------------------------
@@ -2312,4 +2362,16 @@ class GameMessage(db.Model):
     game_token = db.Column(db.String(50), index=True, nullable=False)
     timestamp = db.Column(db.DateTime, default=db.func.current_timestamp())
     message = db.Column(db.Text)
+    # Short digest of the text so duplicate probes can use an index
+    message_hash = db.Column(db.String(16))
     count = db.Column(db.Integer, default=1)
+
+    __table_args__ = (
+        db.Index('ix_game_messages_token_hash', 'game_token', 'message_hash'),
+        db.Index('ix_game_messages_token_time', 'game_token', 'timestamp', 'id'),
+    )
+
+    @staticmethod
+    def hash_text(text):
+        return hashlib.blake2b(
+            (text or '').encode('utf-8'), digest_size=8).hexdigest()
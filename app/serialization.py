@@ -2,6 +2,7 @@ import logging
 import json
 import os
 import re
+import time
 from flask import g, current_app, session
 from sqlalchemy import func, delete
 from sqlalchemy.orm import identity
@@ -10,7 +11,10 @@ from .models import (
     prime_enum_cache, clear_enum_cache,
     Entity, Attrib, Pile, Recipe, Progress, Scenario, IdSequence)
 from .src.logic_user_interaction import clear_session_logs
+from .src.logic_event import clear_event_plans
+from .src.logic_mentions import clear_mention_index
 from .src.logic_discovery import run_discovery_scan
+from .src.logic_metrics import SCENARIO_IMPORT_SECONDS
 from .utils import name_stripped
 
 logger = logging.getLogger(__name__)
@@ -89,6 +93,7 @@ def import_from_dict(data):
     Load all data from JSON dictionary.
     Wipes existing session data and rebuilds using model hydration.
     """
+    start = time.perf_counter()
     try:
         # Wipe current data
         game_token = g.game_token
@@ -143,6 +148,7 @@ def import_from_dict(data):
 
         # Check for unmasking dependencies
         run_discovery_scan(game_token)
+        SCENARIO_IMPORT_SECONDS.observe(time.perf_counter() - start)
     except:
         db.session.rollback()
         raise
@@ -313,6 +319,8 @@ def clear_game_data(game_token=None):
     db.session.execute(delete(IdSequence).filter_by(game_token=game_token))
     db.session.execute(delete(Entity).filter_by(game_token=game_token))
     clear_session_logs(game_token)
+    clear_event_plans(game_token)
+    clear_mention_index(game_token)
 
     db.session.commit()
     logger.info("Token %s cleared.", game_token)
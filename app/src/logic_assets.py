@@ -0,0 +1,109 @@
+"""
+Fingerprinted, precompressed static files without a build step.
+
+At startup every file under the static folder is hashed, and text files
+are gzipped, plus brotli when that package is installed. url_for for
+static files adds the hash as ?v=, so an edited file gets a new URL and
+the response for a current hash can be cached for good. As with
+templates outside debug mode, edits are picked up on restart. In debug
+mode files are served as they are on disk, without hashes.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS_BYTES = 512
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+@dataclass
+class Asset:
+    digest: str
+    mimetype: str
+    # Key: content encoding → compressed bytes
+    encoded: dict[str, bytes] = field(default_factory=dict)
+
+def compress_variants(data):
+    """Only variants that come out smaller, best first."""
+    variants = {}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data)
+    variants['gzip'] = gzip.compress(data, compresslevel=9, mtime=0)
+    return {
+        encoding: body for encoding, body in variants.items()
+        if len(body) < len(data)}
+
+def load_assets(static_folder):
+    """Key: path relative to the static folder, as passed to url_for."""
+    assets = {}
+    for root, _dirs, files in os.walk(static_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            mimetype = (
+                mimetypes.guess_type(name)[0] or 'application/octet-stream')
+            asset = Asset(
+                hashlib.blake2b(data, digest_size=8).hexdigest(), mimetype)
+            if (len(data) >= MIN_COMPRESS_BYTES
+                    and mimetype.startswith(COMPRESSIBLE_TYPES)):
+                asset.encoded = compress_variants(data)
+            rel_path = os.path.relpath(path, static_folder)
+            assets[rel_path.replace(os.sep, '/')] = asset
+    return assets
+
+def init_assets(app):
+    """Fingerprints static URLs and serves compressed, cacheable files."""
+    send_plain = app.view_functions['static']
+    loaded = {}
+
+    def get_asset(filename):
+        # run(debug=True) sets debug after this, so check when used
+        if app.debug:
+            return None
+        if 'assets' not in loaded:
+            loaded['assets'] = load_assets(app.static_folder)
+        return loaded['assets'].get(filename)
+
+    @app.url_defaults
+    def add_fingerprint(endpoint, values):
+        if endpoint == 'static' and 'v' not in values:
+            asset = get_asset(values.get('filename'))
+            if asset:
+                values['v'] = asset.digest
+
+    def serve_static(filename):
+        asset = get_asset(filename)
+        if asset is None:
+            # Debug mode, added since startup, or missing
+            return send_plain(filename=filename)
+
+        encoding = next((
+            encoding for encoding in asset.encoded
+            if request.accept_encodings[encoding] > 0), None)
+        if encoding:
+            response = app.response_class(
+                asset.encoded[encoding], mimetype=asset.mimetype)
+            response.headers['Content-Encoding'] = encoding
+            response.set_etag(f"{asset.digest}-{encoding}")
+            response.make_conditional(request)
+        else:
+            response = send_plain(filename=filename)
+        if asset.encoded:
+            response.vary.add('Accept-Encoding')
+        if request.args.get('v') == asset.digest:
+            response.headers['Cache-Control'] = IMMUTABLE
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    app.view_functions['static'] = serve_static
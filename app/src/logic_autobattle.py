@@ -1,16 +1,17 @@
 import random
 import logging
+from collections import Counter
 from flask import g
 from app.models import (
-    db, Character, Location, Attrib, AttribVal, Event,
-    AutobattleField, AutobattleStage, Participant,
-    OutcomeType)
-from .logic_event import (
-    roll_for_outcome, roll_for_system_outcome,
-    resolve_effects, process_all_auto_effects, get_chain_results)
+    db, Character, Location, Attrib, AttribVal,
+    AutobattleField, AutobattleStage, Participant)
+from .logic_event import ChainStats, run_event_chain
 
 logger = logging.getLogger(__name__)
 
+# Battles still going after this many rounds are called off
+MAX_BATTLE_ROUNDS = 100
+
 def is_autobattle_enabled():
     """Returns True if any location has autobattle enabled."""
     return Location.query.filter_by(
@@ -28,91 +29,116 @@ def get_battle_participants(loc_id):
         parties.setdefault(p_name, []).append(c)
     return parties
 
-def get_char_stat(char, field_type):
-    """Helper to find HP, Max HP, etc. based on Attrib configuration."""
-    attr = Attrib.query.filter_by(
-        game_token=char.game_token,
-        ab_field=field_type
-    ).first()
-    if not attr:
-        return 0
-
-    val = AttribVal.query.filter_by(
-        game_token=char.game_token,
-        subject_id=char.id,
-        attrib_id=attr.id
-    ).first()
-    return val.value if val else 0
-
-def get_missing_hp(char):
-    max_hp = get_char_stat(char, AutobattleField.MAX_HP)
-    current_hp = get_char_stat(char, AutobattleField.HP)
-    return max_hp - current_hp
-
-def execute_event_chain(event_id, role_entities, depth=0):
+class CombatState:
     """
-    Executes an event and recursively follows any eligible chains.
-    'depth' prevents accidental infinite loops in configuration.
-    Returns False if no event could be executed.
+    HP and Max HP of everyone at a battle location, loaded with one query.
+
+    Holds the AttribVal rows from the session, which are the same objects
+    that effects change, so reads stay current during a round without
+    querying again. Only a character that had no row when loading is
+    looked up again, in case an effect has created it since.
+    Call snapshot() before committing so the results can be read
+    afterwards without reloading expired rows.
     """
-    if depth > 5:
-        logger.warning("Event chain reached max depth at event %s", event_id)
-        return True
-
-    game_token = g.game_token
-    event = db.session.get(Event, (game_token, event_id))
-    if not event:
-        return False
-
-    # 1. Roll the outcome
-    # For now, autobattle uses 'Normal' difficulty (0.5) for Four-Way rolls
-    if event.outcome_type == OutcomeType.ROLLER:
-        # Defaulting to 1d20 for system rolls if unspecified
-        result_val, _result_str, tier = roll_for_system_outcome(
-            event_id)
-    else:
-        result_val, _result_str, tier = roll_for_outcome(
-            event_id, role_entities, difficulty=0.5, group_messages=False)
-    if result_val is None:
-        return False
-
-    # 2. Apply the effects (HP changes, status updates, etc.)
-    # resolve_effects gives us the ledger (virtual state change)
-    # needed to evaluate the next link
-    _resolved_effects, ledger = resolve_effects(
-        event, role_entities, result_val, tier)
-    process_all_auto_effects(
-        event, role_entities, result_val, tier)
-
-    # 3. Check for Chained Events
-    # get_chain_results checks link requirements (e.g., 'If Success')
-    # against the current roll and the ledger
-    chains = get_chain_results(
-        event, role_entities, result_val, tier, ledger)
-
-    if chains:
-        # If multiple branches are eligible, pick one randomly
-        next_event = random.choice(chains)
-        execute_event_chain(next_event['child_id'], role_entities, depth + 1)
-    return True
+    FIELDS = (AutobattleField.HP, AutobattleField.MAX_HP)
+
+    def __init__(self, loc_id):
+        game_token = g.game_token
+        self.game_token = game_token
+        self.loc_id = loc_id
+        self.parties = get_battle_participants(loc_id)
+        self.chars = sorted(
+            (c for members in self.parties.values() for c in members),
+            key=lambda c: c.id)
+        self.summary = None
+        self.damage = Counter()  # event id -> HP removed
+        self.chains = ChainStats()
+
+        # ab_field -> attrib_id, keeping the first if several share a field
+        self.attrib_ids = {}
+        for attrib_id, field in db.session.query(
+                Attrib.id, Attrib.ab_field).filter(
+                    Attrib.game_token == game_token,
+                    Attrib.ab_field.in_(self.FIELDS)
+                ).order_by(Attrib.id):
+            self.attrib_ids.setdefault(field, attrib_id)
+
+        self._rows = {}
+        if self.chars and self.attrib_ids:
+            for row in AttribVal.query.filter(
+                    AttribVal.game_token == game_token,
+                    AttribVal.attrib_id.in_(self.attrib_ids.values()),
+                    AttribVal.subject_id.in_([c.id for c in self.chars])):
+                self._rows[(row.subject_id, row.attrib_id)] = row
+
+    def stat(self, char, field):
+        attrib_id = self.attrib_ids.get(field)
+        if attrib_id is None:
+            return 0
+        key = (char.id, attrib_id)
+        row = self._rows.get(key)
+        if row is None:
+            # An effect may have added the value since loading
+            row = db.session.get(
+                AttribVal, (self.game_token, attrib_id, char.id))
+            if row is None:
+                return 0
+            self._rows[key] = row
+        return row.value
+
+    def hp(self, char):
+        return self.stat(char, AutobattleField.HP)
+
+    def missing_hp(self, char):
+        return self.stat(char, AutobattleField.MAX_HP) - self.hp(char)
+
+    def total_hp(self):
+        return sum(self.hp(c) for c in self.chars)
 
-def run_battle_round(loc_id):
+    def alive_parties(self):
+        parties = []
+        for c in self.chars:
+            party = c.party or "Unformatted"
+            if self.hp(c) >= 1 and party not in parties:
+                parties.append(party)
+        return parties
+
+    def snapshot(self):
+        """Plain (char_id, party, hp, max_hp) tuples for after commit."""
+        self.summary = [
+            (c.id, c.party or "Unformatted", self.hp(c),
+             self.stat(c, AutobattleField.MAX_HP))
+            for c in self.chars]
+        return self.summary
+
+def execute_tracked(state, event_id, role_entities):
+    """Runs an event chain and credits the HP it removed to the event."""
+    hp_before = state.total_hp()
+    executed = run_event_chain(event_id, role_entities, state.chains)
+    if executed:
+        state.damage[event_id] += hp_before - state.total_hp()
+    return executed
+
+def run_battle_round(loc_id, state=None, commit=True):
     """
     Executes one round of combat.
     1. Before Turn (DoTs)
     2. Turn Actions (Attacks)
     3. After Turn (Death Checks)
+    Pass a CombatState to read the results after the commit.
     """
-    parties = get_battle_participants(loc_id)
+    if state is None:
+        state = CombatState(loc_id)
+    parties = state.parties
     if len(parties) < 2:
+        state.snapshot()
         return False, "Need at least two opposing parties."
 
-    all_chars = [c for p in parties.values() for c in p]
     # Sort by a generic initiative or just ID for now
-    all_chars.sort(key=lambda x: x.id)
+    all_chars = state.chars
 
     for actor in all_chars:
-        if get_char_stat(actor, AutobattleField.HP) < 1:
+        if state.hp(actor) < 1:
             continue
 
         # Before Turn (DoTs)
@@ -121,12 +147,12 @@ def run_battle_round(loc_id):
             if e.ab_stage == AutobattleStage.BEFORE
         ]
         for act in before_actions:
-            execute_event_chain(act.id, {
+            execute_tracked(state, act.id, {
                 Participant.SUBJECT: actor.id,
                 Participant.AT: loc_id
             })
 
-        if get_char_stat(actor, AutobattleField.HP) < 1:
+        if state.hp(actor) < 1:
             continue
 
         # Action Selection
@@ -145,12 +171,12 @@ def run_battle_round(loc_id):
             if p_name != actor.party:
                 enemies.extend([
                     m for m in members
-                    if get_char_stat(m, AutobattleField.HP) >= 1])
+                    if state.hp(m) >= 1])
 
         if enemies:
             # Sort enemies by missing HP descending
             # (most damaged first)
-            enemies.sort(key=get_missing_hp, reverse=True)
+            enemies.sort(key=state.missing_hp, reverse=True)
             target = enemies[0]
 
             # Priority Sorting & Tie-Breaking
@@ -169,7 +195,7 @@ def run_battle_round(loc_id):
                     Participant.TARGET: target.id,
                     Participant.AT: loc_id
                 }
-                executed = execute_event_chain(action.id, role_entities)
+                executed = execute_tracked(state, action.id, role_entities)
                 if executed:
                     # Successfully executed an action,
                     # end the turn attempts
@@ -181,31 +207,50 @@ def run_battle_round(loc_id):
             e for e in actor.abilities
             if e.ab_stage == AutobattleStage.AFTER]
         for act in after_actions:
-            execute_event_chain(
-                act.id, {
+            execute_tracked(
+                state, act.id, {
                     Participant.SUBJECT: actor.id,
                     Participant.AT: loc_id})
 
-    db.session.commit()
+    state.snapshot()
+    if commit:
+        db.session.commit()
     return True, "Round completed."
 
-def run_battle_reset(loc_id):
+def resolve_battle(loc_id, max_rounds=MAX_BATTLE_ROUNDS, state=None):
+    """
+    Runs rounds until at most one party is standing, without committing.
+    Returns a timeline with the state snapshot after each round.
+    The state's damage totals cover the whole battle.
+    """
+    if state is None:
+        state = CombatState(loc_id)
+    timeline = []
+    while len(state.alive_parties()) > 1 and len(timeline) < max_rounds:
+        success, _msg = run_battle_round(loc_id, state, commit=False)
+        if not success:
+            break
+        timeline.append(state.summary)
+    return timeline
+
+def run_battle_reset(loc_id, state=None):
     """Executes 'reset' stage events for all characters at the location."""
-    parties = get_battle_participants(loc_id)
-    all_chars = [c for p in parties.values() for c in p]
+    if state is None:
+        state = CombatState(loc_id)
 
-    for actor in all_chars:
+    for actor in state.chars:
         reset_actions = [
             e for e in actor.abilities
             if e.ab_stage == AutobattleStage.RESET
         ]
         for act in reset_actions:
-            execute_event_chain(
+            run_event_chain(
                 act.id, {
                     Participant.SUBJECT: actor.id,
                     Participant.AT: loc_id
-                }
+                }, state.chains
             )
 
+    state.snapshot()
     db.session.commit()
     return True
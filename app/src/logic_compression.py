@@ -0,0 +1,184 @@
+"""
+Compression of HTML and JSON responses, as WSGI middleware so that it
+sees the finished response of every view.
+
+A response with a Content-Length is compressed in one go, and the time
+taken is added to its Server-Timing header. A streamed response is
+compressed chunk by chunk with a flush after each, so the client gets
+every chunk as soon as the app yields it; its headers have already
+been sent by then, so the time isn't reported.
+"""
+import time
+import zlib
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, quote_etag, unquote_etag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript',
+    'application/xml', 'image/svg+xml')
+DEFAULT_MIN_BYTES = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 5
+
+class GzipEncoder:
+    name = 'gzip'
+
+    def __init__(self, level):
+        # wbits 16 + 15: gzip header and trailer
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+class BrotliEncoder:
+    name = 'br'
+
+    def __init__(self, quality):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+class CompressionMiddleware:
+    """Wraps a WSGI app, compressing responses the client accepts."""
+    def __init__(self, wsgi_app, min_bytes=DEFAULT_MIN_BYTES,
+                 gzip_level=DEFAULT_GZIP_LEVEL,
+                 brotli_quality=DEFAULT_BROTLI_QUALITY):
+        self.wsgi_app = wsgi_app
+        self.min_bytes = min_bytes
+        # Preferred first
+        self.encoders = {}
+        if brotli is not None:
+            self.encoders['br'] = lambda: BrotliEncoder(brotli_quality)
+        self.encoders['gzip'] = lambda: GzipEncoder(gzip_level)
+
+    def choose_encoding(self, environ):
+        accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+        for name in self.encoders:
+            if accepted[name] > 0:
+                return name
+        return None
+
+    def should_compress(self, status, headers):
+        code = int(status.split(None, 1)[0])
+        if code < 200 or code in (204, 206) or code >= 300:
+            return False
+        if 'Content-Encoding' in headers \
+                or 'no-transform' in headers.get('Cache-Control', ''):
+            return False
+        content_type = headers.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        length = headers.get('Content-Length', type=int)
+        return length is None or length >= self.min_bytes
+
+    def __call__(self, environ, start_response):
+        encoding = self.choose_encoding(environ)
+        if encoding is None or environ['REQUEST_METHOD'] == 'HEAD':
+            return self.wsgi_app(environ, start_response)
+
+        # Flask starts the response before returning the body. Hold it
+        # back until we know whether to compress.
+        started = _DeferredStart()
+        app_iter = self.wsgi_app(environ, started)
+        headers = Headers(started.headers)
+        if not self.should_compress(started.status, headers):
+            start_response(started.status, started.headers, started.exc_info)
+            return app_iter
+
+        encoder = self.encoders[encoding]()
+        _mark_encoded(headers, encoding)
+        if 'Content-Length' not in headers:
+            start_response(
+                started.status, headers.to_wsgi_list(), started.exc_info)
+            return self.compress_stream(app_iter, encoder)
+
+        body, timing = self.compress_whole(app_iter, encoder)
+        headers['Content-Length'] = str(len(body))
+        existing = headers.get('Server-Timing')
+        headers['Server-Timing'] = (
+            f'{existing}, {timing}' if existing else timing)
+        start_response(
+            started.status, headers.to_wsgi_list(), started.exc_info)
+        return [body]
+
+    @staticmethod
+    def compress_whole(app_iter, encoder):
+        """The compressed body and its Server-Timing entry."""
+        try:
+            data = b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        start_time = time.perf_counter()
+        body = encoder.compress(data) + encoder.finish()
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        return body, f'compress;dur={elapsed_ms:.1f};desc="{encoder.name}"'
+
+    @staticmethod
+    def compress_stream(app_iter, encoder):
+        try:
+            for chunk in app_iter:
+                if not chunk:
+                    continue
+                compressed = encoder.compress(chunk) + encoder.flush()
+                if compressed:
+                    yield compressed
+            yield encoder.finish()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+class _DeferredStart:
+    """A start_response that only records its arguments."""
+    status = None
+    headers = None
+    exc_info = None
+
+    def __call__(self, status, headers, exc_info=None):
+        self.status = status
+        self.headers = headers
+        self.exc_info = exc_info
+        return self.write
+
+    @staticmethod
+    def write(_data):
+        raise RuntimeError("write() isn't supported under compression")
+
+def _mark_encoded(headers, encoding):
+    headers['Content-Encoding'] = encoding
+    vary = headers.get('Vary')
+    if not vary:
+        headers['Vary'] = 'Accept-Encoding'
+    elif 'accept-encoding' not in vary.lower():
+        headers['Vary'] = f'{vary}, Accept-Encoding'
+    # Same content, different bytes, so the ETag can only match weakly
+    etag, weak = unquote_etag(headers.get('ETag'))
+    if etag is not None and not weak:
+        headers['ETag'] = quote_etag(etag, weak=True)
+
+def init_compression(app):
+    """Wraps app.wsgi_app using the COMPRESS_* settings."""
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app,
+        min_bytes=app.config.get('COMPRESS_MIN_BYTES', DEFAULT_MIN_BYTES),
+        gzip_level=app.config.get('COMPRESS_GZIP_LEVEL', DEFAULT_GZIP_LEVEL),
+        brotli_quality=app.config.get(
+            'COMPRESS_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY))
@@ -1,15 +1,22 @@
 import random
 import math
 import logging
+import operator
+from itertools import chain
+from collections import Counter, namedtuple
 from flask import g, session
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
 from app.models import (
     db, GENERAL_ID, Entity, Item, Location, Character, Attrib, Event,
     StorageType, Operation, OutcomeType, SuccessTier, RollerType, Participant,
-    AttribVal, EnumEntry, Pile, LocDest, Recipe)
-from app.utils import maskable_name
+    AttribVal, EnumEntry, Pile, LocDest, Recipe, RecipeSource,
+    RecipeByproduct, EventField, EventFactor, EventLink)
+from app.utils import VersionedCache, maskable_name
 from .logic_piles import (
     adjust_quantity, get_accessible_quantity, adjust_accessible_quantity)
 from .logic_user_interaction import add_message
+from .logic_world_version import current_config_version
 from .logic_navigation import (
     get_all_valid_coords, straight_line_dist, get_default_position)
 
@@ -193,6 +200,288 @@ def get_inner_breakdown(val, mod_val, op):
     }
     return formats.get(op, v)
 
+# ------------------------------------------------------------------------
+# Compiled Plans
+# ------------------------------------------------------------------------
+
+# Plans are checked against the stored configuration version, so a
+# change saved by another worker recompiles them here too. Changes in
+# this process are dropped as soon as they are flushed.
+MAX_PLANS = 4096
+MAX_LINK_GRAPHS = 64
+
+# Key: (game_token, event_id) → EventPlan
+_event_plans = VersionedCache(MAX_PLANS)
+# Key: (game_token, field_id) → FieldPlan
+_field_plans = VersionedCache(MAX_PLANS)
+# Key: game_token → LinkGraph
+_link_graphs = VersionedCache(MAX_LINK_GRAPHS)
+
+# Modes whose value comes from configuration rather than the anchor entity
+CONSTANT_MODES = {
+    Participant.LIMIT, Participant.ENUM,
+    Participant.RATE_AMT, Participant.RATE_DUR,
+    Participant.SOURCE_QTY, Participant.BYP_QTY}
+
+_FAST_OPS = {
+    Operation.ADD: operator.add,
+    Operation.SUB: operator.sub,
+    Operation.MULT: operator.mul,
+    Operation.EQ: operator.eq,
+    Operation.GE: operator.ge,
+    Operation.LT: operator.lt,
+}
+
+def _to_float(val):
+    try:
+        return float(val)
+    except (ValueError, TypeError):
+        return 0.0
+
+_EnumEntry = namedtuple('_EnumEntry', 'id order_index label')
+
+class AttribPlan:
+    """
+    Snapshot of an Attrib's definition.
+    Stands in for the Attrib when calling apply_operation or formatting.
+    """
+    __slots__ = ('is_binary', 'enum_entries', '_rank_of', '_id_of')
+
+    format_value = Attrib.format_value
+
+    def __init__(self, attrib):
+        self.is_binary = attrib.is_binary
+        self.enum_entries = tuple(
+            _EnumEntry(e.id, e.order_index, e.label)
+            for e in attrib.enum_entries)
+        self._rank_of = {}
+        self._id_of = {}
+        for entry in self.enum_entries:
+            self._rank_of.setdefault(entry.id, entry.order_index)
+            self._id_of.setdefault(entry.order_index, entry.id)
+
+    def id_to_rank(self, entry_id):
+        return self._rank_of.get(int(entry_id))
+
+    def rank_to_id(self, rank):
+        return self._id_of.get(rank)
+
+def compile_operation(op, operand, output_range=None, enum=None):
+    """
+    Returns a function of one value equivalent to
+    apply_operation(val, operand, op, output_range, enum).
+    """
+    if enum is not None and enum.enum_entries:
+        return lambda val: apply_operation(
+            val, operand, op, output_range, enum)
+    operand_num = _to_float(operand)
+    fast = _FAST_OPS.get(op)
+    if fast:
+        return lambda val: fast(_to_float(val), operand_num)
+    return lambda val: apply_numeric_op(
+        _to_float(val), operand_num, op, output_range)
+
+class FieldPlan:
+    """Resolved, read-only view of an EventField."""
+    __slots__ = (
+        'field_id', 'field_mode', 'name', 'constant', 'universal_item',
+        'attrib', 'enum', 'needs_anchor', 'writer', 'depends_on')
+
+    def __init__(self, field_def):
+        game_token = field_def.game_token
+        mode = field_def.field_mode
+        self.field_id = field_def.id
+        self.field_mode = mode
+        self.name = field_def.get_field_name()
+        self.constant = None
+        self.universal_item = False
+        self.attrib = None
+        self.enum = None
+        self.needs_anchor = mode not in Participant.REQUIRES_PRESELECTED
+        self.writer = _EFFECT_WRITERS.get(mode)
+        # The field's name and the effect writes read these too
+        depends_on = {('field', field_def.id)}
+        for kind, entity_id in (
+                ('item', field_def.item_id),
+                ('item', field_def.source_item_id),
+                ('attrib', field_def.attrib_id)):
+            if entity_id:
+                depends_on.add((kind, entity_id))
+
+        if mode in Participant.USES_RECIPE:
+            depends_on.add(('recipe', field_def.recipe_id))
+            self.constant = _recipe_constant(field_def)
+        elif mode == Participant.LIMIT and field_def.item_id \
+                and not field_def.child_of_anchor:
+            depends_on.add(('item', field_def.item_id))
+            item = db.session.get(Item, (game_token, field_def.item_id))
+            self.constant = item.q_limit if item else 0.0
+        elif mode == Participant.ENUM and not field_def.child_of_anchor:
+            entry = db.session.get(EnumEntry, field_def.enumentry_id) \
+                if field_def.enumentry_id else None
+            if entry:
+                depends_on.add(('attrib', entry.attrib_id))
+            self.constant = float(entry.order_index) if entry else 0.0
+
+        if mode == Participant.QTY and field_def.item_id:
+            depends_on.add(('item', field_def.item_id))
+            item = db.session.get(Item, (game_token, field_def.item_id))
+            self.universal_item = bool(
+                item and item.storage_type == StorageType.UNIVERSAL)
+
+        if mode == Participant.ATTR and field_def.attrib_id:
+            depends_on.add(('attrib', field_def.attrib_id))
+            attrib = db.session.get(Attrib, (game_token, field_def.attrib_id))
+            if attrib:
+                self.attrib = AttribPlan(attrib)
+                if attrib.enum_entries:
+                    self.enum = self.attrib
+
+        self.depends_on = frozenset(depends_on)
+
+def _recipe_constant(field_def):
+    if not field_def.recipe_id:
+        return 0.0
+    recipe = db.session.get(Recipe, (field_def.game_token, field_def.recipe_id))
+    if not recipe:
+        return 0.0
+    mode = field_def.field_mode
+    if mode == Participant.RATE_AMT:
+        return recipe.rate_amount
+    if mode == Participant.RATE_DUR:
+        return float(recipe.rate_duration)
+    if mode == Participant.SOURCE_QTY:
+        src = next(
+            (s for s in recipe.sources
+             if s.item_id == field_def.source_item_id), None)
+        return src.q_required if src else 0.0
+    byp = next(
+        (b for b in recipe.byproducts
+         if b.item_id == field_def.source_item_id), None)
+    return byp.rate_amount if byp else 0.0
+
+class FactorPlan:
+    """Field plans and operator closures for one EventFactor."""
+    __slots__ = (
+        'factor_id', 'infield', 'outfield', 'transform', 'compare',
+        'depends_on')
+
+    def __init__(self, factor):
+        self.factor_id = factor.id
+        self.infield = get_field_plan(factor.infield) \
+            if factor.infield else None
+        self.outfield = get_field_plan(factor.outfield) \
+            if factor.outfield else None
+        self.transform = compile_operation(
+            factor.op_transform, factor.val_transform) \
+            if factor.op_transform else None
+        self.compare = compile_operation(
+            factor.op_application, factor.val_required,
+            enum=self.infield.enum if self.infield else None)
+        depends_on = {('event', factor.event_id)}
+        for field_plan in (self.infield, self.outfield):
+            if field_plan:
+                depends_on |= field_plan.depends_on
+        self.depends_on = frozenset(depends_on)
+
+class EventPlan:
+    """Everything about an Event that does not change between rolls."""
+    __slots__ = ('event_id', 'factors', 'depends_on')
+
+    def __init__(self, event):
+        self.event_id = event.id
+        self.factors = {f.id: FactorPlan(f) for f in event.factors}
+        depends_on = {('event', event.id)}
+        for factor_plan in self.factors.values():
+            depends_on |= factor_plan.depends_on
+        self.depends_on = frozenset(depends_on)
+
+def get_field_plan(field_def):
+    if field_def.id is None:
+        return FieldPlan(field_def)
+    key = (field_def.game_token, field_def.id)
+    version = current_config_version(field_def.game_token)
+    plan = _field_plans.get(key, version)
+    if plan is None:
+        plan = _field_plans.put(key, version, FieldPlan(field_def))
+    return plan
+
+def get_event_plan(event):
+    key = (event.game_token, event.id)
+    version = current_config_version(event.game_token)
+    plan = _event_plans.get(key, version)
+    if plan is None:
+        plan = _event_plans.put(key, version, EventPlan(event))
+    return plan
+
+def get_factor_plan(factor):
+    if factor.id is None or factor.event_id is None:
+        return FactorPlan(factor)
+    event = db.session.get(Event, (factor.game_token, factor.event_id))
+    plan = get_event_plan(event).factors.get(factor.id) if event else None
+    return plan or FactorPlan(factor)
+
+def clear_event_plans(game_token=None, changed=None):
+    """
+    Drops cached plans for a token, or only those depending on
+    any of the changed (kind, id) pairs. The link graph is dropped
+    when any link changes.
+    """
+    for cache in (_event_plans, _field_plans):
+        cache.discard_if(
+            lambda key, plan: (game_token is None or key[0] == game_token)
+            and (changed is None or plan.depends_on & changed))
+    if changed is None or any(kind == 'link' for kind, _id in changed):
+        _link_graphs.discard_if(
+            lambda key, _graph: game_token is None or key == game_token)
+
+def _plan_dependency(obj):
+    if isinstance(obj, Event):
+        return ('event', obj.id)
+    if isinstance(obj, EventFactor):
+        return ('event', obj.event_id)
+    if isinstance(obj, EventLink):
+        return ('link', obj.parent_id)
+    if isinstance(obj, EventField):
+        return ('field', obj.id)
+    if isinstance(obj, Attrib):
+        return ('attrib', obj.id)
+    if isinstance(obj, EnumEntry):
+        return ('attrib', obj.attrib_id)
+    if isinstance(obj, Item):
+        return ('item', obj.id)
+    if isinstance(obj, Recipe):
+        return ('recipe', obj.id)
+    if isinstance(obj, (RecipeSource, RecipeByproduct)):
+        return ('recipe', obj.recipe_id)
+    return None
+
+@sa_event.listens_for(Session, 'after_flush')
+def _invalidate_changed_plans(session_obj, _flush_context):
+    changed = {}
+    for obj in chain(session_obj.new, session_obj.dirty, session_obj.deleted):
+        dependency = _plan_dependency(obj)
+        if dependency:
+            changed.setdefault(obj.game_token, set()).add(dependency)
+    pending = session_obj.info.setdefault('plan_changes', {})
+    for game_token, keys in changed.items():
+        clear_event_plans(game_token, keys)
+        pending.setdefault(game_token, set()).update(keys)
+
+@sa_event.listens_for(Session, 'after_commit')
+def _forget_plan_changes(session_obj):
+    session_obj.info.pop('plan_changes', None)
+
+@sa_event.listens_for(Session, 'after_transaction_end')
+def _revert_plan_changes(session_obj, transaction):
+    # Anything still pending was rolled back or discarded, so plans
+    # compiled after those flushes may hold values that no longer exist
+    if transaction.parent is not None:
+        return
+    changed = session_obj.info.pop('plan_changes', None) or {}
+    for game_token, keys in changed.items():
+        clear_event_plans(game_token, keys)
+
 # ------------------------------------------------------------------------
 # Fields
 # ------------------------------------------------------------------------
@@ -257,6 +546,12 @@ def get_entity_value(anchor_id, field_def, subject_id=None, ledger=None):
         if ledger_key and ledger_key in ledger:
             return ledger[ledger_key]
 
+    # Configured values were already looked up when compiling
+    if field_def.field_mode in CONSTANT_MODES:
+        plan = get_field_plan(field_def)
+        if plan.constant is not None:
+            return plan.constant
+
     # Distance Calculation (Read-Only)
     if field_def.field_mode == Participant.DIST:
         if not subject_id or not anchor_id:
@@ -407,8 +702,7 @@ def can_use_field(field, entity):
     # --- 2. Universal Storage Check ---
     # If the item is universal, only ID 1 (General Storage) can meet it
     if field.field_mode == Participant.QTY and field.item_id:
-        item_def = db.session.get(Item, (game_token, field.item_id))
-        if item_def and item_def.storage_type == StorageType.UNIVERSAL:
+        if get_field_plan(field).universal_item:
             return entity.id == GENERAL_ID
 
     # --- 3. Standard Attribute Check (On the Anchor itself) ---
@@ -439,7 +733,6 @@ def is_factor_met(factor, entity, subject_id=None,
     Evaluates if a specific entity satisfies the requirements of an EventFactor.
     Used for UI validation and filtering.
     """
-    game_token = g.game_token
     field = factor.infield
 
     def meets(bval):
@@ -457,47 +750,238 @@ def is_factor_met(factor, entity, subject_id=None,
     # 3. If it's a comparison (==, >=, etc.), we must check the actual value
     # Fetch the value from the entity
     val = get_entity_value(entity.id, field, subject_id, ledger)
+    plan = get_factor_plan(factor)
 
     # Apply inner transform (e.g. Rounding or Softcap)
     if factor.op_transform and factor.op_transform != Operation.CONST:
-        val = apply_operation(val, factor.val_transform, factor.op_transform)
+        val = plan.transform(val)
     elif factor.op_transform == Operation.CONST:
         val = factor.val_transform
 
     # Evaluate the comparison: (FetchedVal Op RequiredVal)
-    attrib = None
-    if field.field_mode == Participant.ATTR and field.attrib_id:
-        attrib = db.session.get(Attrib, (game_token, field.attrib_id))
-        if attrib and not attrib.enum_entries:
-            attrib = None
-    is_satisfied = apply_operation(
-        val, factor.val_required, factor.op_application, attrib=attrib)
+    is_satisfied = plan.compare(val)
 
     return is_satisfied if not factor.negate else not is_satisfied
 
-def calculate_determinants(event, role_entities):
+# Marks a value the batch path can't pick the same way as the per-entity
+# query, so the caller falls back to get_entity_value
+AMBIGUOUS = object()
+
+def _chunked(values, size=500):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+class CandidateValues:
+    """
+    Values needed to check a set of factors against many candidate
+    entities, fetched with a few set-based queries.
+    """
+    def __init__(self, factors, candidates):
+        game_token = g.game_token
+        fields = [f.infield for f in factors if f.infield]
+        cand_ids = {ent.id for ent in candidates}
+        owner_ids = cand_ids | {GENERAL_ID}
+        for key in ('old_char_id', 'old_loc_id'):
+            if session.get(key):
+                owner_ids.add(session[key])
+
+        # Piles by owner
+        self.piles = {}
+        for chunk in _chunked(owner_ids):
+            for pile in Pile.query.filter(
+                    Pile.game_token == game_token,
+                    Pile.owner_id.in_(chunk)).all():
+                self.piles.setdefault(pile.owner_id, []).append(pile)
+
+        # Attribute values of candidates, their piles and configured items
+        self.attrib_vals = {}
+        attrib_ids = {
+            f.attrib_id for f in fields
+            if f.field_mode == Participant.ATTR and f.attrib_id}
+        if attrib_ids:
+            subject_ids = cand_ids | {
+                p.item_id for piles in self.piles.values() for p in piles
+            } | {f.item_id for f in fields if f.item_id}
+            for chunk in _chunked(subject_ids):
+                for av in AttribVal.query.filter(
+                        AttribVal.game_token == game_token,
+                        AttribVal.attrib_id.in_(attrib_ids),
+                        AttribVal.subject_id.in_(chunk)).all():
+                    self.attrib_vals[(av.subject_id, av.attrib_id)] = av.value
+
+    def _carried(self, entity):
+        """Piles usable as children: equipped ones for characters."""
+        piles = self.piles.get(entity.id, [])
+        if entity.entity_type == Character.TYPENAME:
+            return [p for p in piles if p.slot_id is not None]
+        return piles
+
+    def can_use_field(self, field, plan, entity):
+        """Same result as can_use_field()."""
+        if field.child_of_anchor:
+            for pile in self._carried(entity):
+                if field.field_mode == Participant.ATTR:
+                    if (pile.item_id, field.attrib_id) in self.attrib_vals:
+                        return True
+                elif field.field_mode == Participant.QTY:
+                    if pile.item_id == field.item_id:
+                        return True
+            return False
+
+        if field.field_mode == Participant.QTY and field.item_id:
+            if plan.universal_item:
+                return entity.id == GENERAL_ID
+
+        if field.field_mode == Participant.ATTR and field.attrib_id:
+            subject_id = entity.id
+            if field.item_id:
+                if not db.session.get(Item, (g.game_token, field.item_id)):
+                    return False
+                subject_id = field.item_id
+            if (subject_id, field.attrib_id) not in self.attrib_vals:
+                return False
+
+        if field.field_mode == Participant.QTY and field.item_id:
+            if not any(p.item_id == field.item_id
+                       for p in self.piles.get(entity.id, [])):
+                return False
+
+        return True
+
+    def value(self, field, plan, entity, subject_id=None):
+        """Same result as get_entity_value() without a ledger,
+        or AMBIGUOUS."""
+        mode = field.field_mode
+        if mode in CONSTANT_MODES and plan.constant is not None:
+            return plan.constant
+
+        if mode == Participant.DIST:
+            if not subject_id or not entity.id:
+                return 0.0
+            subj = db.session.get(Entity, (g.game_token, subject_id))
+            if not (subj and subj.position and entity.position):
+                return 0.0
+            return float(
+                straight_line_dist(subj.position, entity.position) or 0.0)
+
+        target_id = entity.id
+        if field.child_of_anchor:
+            if mode == Participant.ATTR:
+                item_ids = {
+                    p.item_id for p in self._carried(entity)
+                    if (p.item_id, field.attrib_id) in self.attrib_vals}
+                if not item_ids:
+                    return 0.0
+                if len(item_ids) > 1:
+                    return AMBIGUOUS
+                target_id = item_ids.pop()
+            elif mode == Participant.QTY:
+                if entity.entity_type == Character.TYPENAME and not any(
+                        p.item_id == field.item_id
+                        for p in self._carried(entity)):
+                    return 0.0
+                target_id = field.item_id
+            else:
+                return AMBIGUOUS
+
+        if mode == Participant.ATTR:
+            if field.item_id:
+                target_id = field.item_id
+            return self.attrib_vals.get((target_id, field.attrib_id), 0.0)
+
+        if mode == Participant.QTY and field.item_id:
+            if field.role == Participant.PRESELECTED:
+                owner_id = GENERAL_ID
+            elif entity.entity_type == Item.TYPENAME:
+                owner_id = session.get('old_char_id') \
+                    or session.get('old_loc_id') or GENERAL_ID
+            else:
+                owner_id = entity.id
+            quantities = [
+                p.quantity for p in self.piles.get(owner_id, [])
+                if p.item_id == field.item_id]
+            if not quantities:
+                return 0.0
+            if len(quantities) > 1:
+                return AMBIGUOUS
+            return quantities[0]
+
+        if mode in CONSTANT_MODES:
+            return AMBIGUOUS
+        return 0.0
+
+def filter_candidates(
+        factors, candidates, subject_id=None, require_comparison=None):
+    """
+    Checks every factor against every candidate, returning
+    {entity: [factors not met]}. Gives the same answers as calling
+    is_factor_met() for each pair, but with the reads done in bulk.
+
+    require_comparison: optional function of a factor, like the
+    is_factor_met() argument. Defaults to always True.
+    """
+    candidates = list(candidates)
+    failures = {ent: [] for ent in candidates}
+    factors = list(factors)
+    if not candidates or not factors:
+        return failures
+
+    values = CandidateValues(factors, candidates)
+    for factor in factors:
+        field = factor.infield
+        plan = get_factor_plan(factor)
+        needs_value = factor.is_comparison and (
+            require_comparison is None or require_comparison(factor))
+
+        for ent in candidates:
+            if not field or not values.can_use_field(
+                    field, plan.infield, ent):
+                met = False
+            elif not needs_value:
+                met = True
+            else:
+                val = values.value(field, plan.infield, ent, subject_id)
+                if val is AMBIGUOUS:
+                    val = get_entity_value(ent.id, field, subject_id)
+                if factor.op_transform \
+                        and factor.op_transform != Operation.CONST:
+                    val = plan.transform(val)
+                elif factor.op_transform == Operation.CONST:
+                    val = factor.val_transform
+                met = plan.compare(val)
+            if factor.negate:
+                met = not met
+            if not met:
+                failures[ent].append(factor)
+    return failures
+
+def calculate_determinants(event, role_entities, ledger=None):
     """
     Returns a list of calculated modifiers based on selected participants.
         [{label, source_name, field_name, value, op}, ...]
+    Values already changed in the ledger are read from there.
     """
     game_token = g.game_token
     modifiers = []
     sides, _, _ = num_sides(event)
     subject_id = resolve_anchor_id(Participant.SUBJECT, role_entities)
+    plan = get_event_plan(event)
 
     for det in event.determinants:
         val = 0.0
         calc_value = None
         breakdown_text = ""
         infield = det.infield
-        field_name = infield.get_field_name() if infield else "Value"
+        det_plan = plan.factors.get(det.id) or get_factor_plan(det)
+        field_plan = det_plan.infield
+        field_name = field_plan.name if field_plan else "Value"
         source_display = "Constant"
         value_display_override = None
 
         attrib = None
-        if infield and infield.field_mode == Participant.ATTR \
-                and infield.attrib_id:
-            attrib = db.session.get(Attrib, (game_token, infield.attrib_id))
+        if field_plan and field_plan.field_mode == Participant.ATTR:
+            attrib = field_plan.attrib
 
         if det.op_transform == Operation.MEM_RECALL:
             source_display = "Memory"
@@ -524,17 +1008,12 @@ def calculate_determinants(event, role_entities):
             anchor_id = resolve_anchor_id(infield.role, role_entities, infield)
             if anchor_id is None:
                 continue
-            val = get_entity_value(anchor_id, infield, subject_id)
+            val = get_entity_value(anchor_id, infield, subject_id, ledger)
 
             # Source Display Name
-            if infield.field_mode == Participant.ENUM:
+            if field_plan.field_mode == Participant.ENUM:
                 source_display = "Constant"
-                entry = db.session.get(EnumEntry, infield.enumentry_id)
-                if entry:
-                    breakdown_text = f"{entry.label} ({entry.order_index})"
-                else:
-                    breakdown_text = format_for_display(val)
-            elif infield.field_mode in Participant.REQUIRES_PRESELECTED:
+            elif not field_plan.needs_anchor:
                 if infield.item_id:
                     blueprint_item = db.session.get(Item, (game_token, infield.item_id))
                     source_display = \
@@ -559,7 +1038,7 @@ def calculate_determinants(event, role_entities):
                     )
                     if anchor and anchor.entity_type == Character.TYPENAME:
                         query = query.filter(Pile.slot_id.is_not(None))
-                    if infield.field_mode == Participant.ATTR:
+                    if field_plan.field_mode == Participant.ATTR:
                         pile = query.join(
                             AttribVal, (
                                 AttribVal.subject_id == Item.id) & (
@@ -614,8 +1093,12 @@ def calculate_determinants(event, role_entities):
         is_met = True
         if det.is_comparison:
             # Evaluate: (TransformedVal Op ValRequired)
-            raw_result = apply_operation(
-                val, det.val_required, det.op_application, sides, attrib)
+            if field_plan and attrib is not field_plan.attrib:
+                # The transform left rank space, so compare plain numbers
+                raw_result = apply_operation(
+                    val, det.val_required, det.op_application)
+            else:
+                raw_result = det_plan.compare(val)
             is_met = bool(raw_result)
         if det.negate:
             is_met = not is_met
@@ -686,7 +1169,7 @@ def calculate_numeric_impact(eff, role_entities, roll_val=None, ledger=None):
         impact = eff.val_transform
 
     if eff.op_transform:
-        impact = apply_operation(impact, eff.val_transform, eff.op_transform)
+        impact = get_factor_plan(eff).transform(impact)
 
     return impact, relies_on_roll
 
@@ -863,18 +1346,20 @@ def preview_effects(event, role_entities, roll_val=None):
         })
     return results
 
-def resolve_effects(event, role_entities, roll_val, tier=None):
+def resolve_effects(event, role_entities, roll_val, tier=None, ledger=None):
     """
     Calculates the final outcome of every effect for display after a roll
     has occurred, but before it is applied.
 
     Calls preview_effects for all structural/display info, then fills in
-    the now-known roll_val.
+    the now-known roll_val. Pass a ledger to carry changes over from
+    earlier rolls; it is updated in place.
     """
     game_token = g.game_token
     previews = preview_effects(event, role_entities)
     results = []
-    ledger = {}
+    if ledger is None:
+        ledger = {}
 
     for preview, eff in zip(previews, event.effects):
         field_def = eff.outfield
@@ -951,9 +1436,13 @@ def resolve_effects(event, role_entities, roll_val, tier=None):
         })
     return results, ledger
 
-def get_chain_results(event, role_entities, roll_val, tier, ledger=None):
+def get_chain_results(
+        event, role_entities, roll_val, tier, ledger=None, checks=None):
     """
     Evaluates follow-up events against the post-event state (the ledger).
+    Pass a checks dict to remember links that only depend on the roll,
+    so they aren't worked out again when a chain comes back to them
+    with the same result.
     """
     game_token = g.game_token
     subject_id = resolve_anchor_id(Participant.SUBJECT, role_entities)
@@ -961,6 +1450,15 @@ def get_chain_results(event, role_entities, roll_val, tier, ledger=None):
 
     for evt_link in event.chained:
         is_eligible = True
+        check_key = None
+        if checks is not None and not isinstance(roll_val, list) and (
+                not evt_link.req or not evt_link.req.infield
+                or evt_link.req.get_val_from == Participant.OUTCOME):
+            check_key = (evt_link.id, tier, roll_val)
+            if check_key in checks:
+                if checks[check_key]:
+                    chain_results.append(checks[check_key])
+                continue
 
         if evt_link.req:
             # 1. Check Outcome Success Tier
@@ -988,11 +1486,15 @@ def get_chain_results(event, role_entities, roll_val, tier, ledger=None):
                 elif factor.infield.field_mode not in Participant.REQUIRES_PRESELECTED:
                     is_eligible = False
 
+        option = None
         if is_eligible:
-            chain_results.append({
+            option = {
                 "child_id": evt_link.child_id,
                 "child_name": evt_link.child.name
-            })
+            }
+            chain_results.append(option)
+        if check_key is not None:
+            checks[check_key] = option
 
     return chain_results
 
@@ -1023,256 +1525,268 @@ def check_outcome_success(filter_val, tier):
 
     return False
 
-def process_all_auto_effects(event, role_entities, roll_val, tier):
+def apply_resolved_effects(event, role_entities, roll_val, resolved):
+    """
+    Writes an auto-applied event's effects using the impacts that
+    resolve_effects already calculated, rather than calculating each
+    one again.
+    """
     if not event.auto_apply:
         return
+    impacts = {res['effect_id']: res['impact_value'] for res in resolved}
     for eff in event.effects:
-        if not check_outcome_success(eff.outcome_success, tier):
-            continue
-        do_effect_change(eff, roll_val, role_entities)
+        if eff.id in impacts:
+            do_effect_change(
+                eff, roll_val, role_entities, impact=impacts[eff.id])
 
-def do_effect_change(eff, roll_val, role_entities):
+def do_effect_change(eff, roll_val, role_entities, impact=None, op=None):
     """
     Calculates math, writes to DB, and logs the change.
+    Pass an impact that was already calculated to skip calculating it
+    again, and an op to apply it with instead of the effect's own,
+    for example when writing a ledger total.
     """
-    game_token = g.game_token
-
     # --- Step 1: Calculate Impact (The "From") ---
-    impact, _ = calculate_numeric_impact(eff, role_entities, roll_val)
+    if impact is None:
+        impact, _ = calculate_numeric_impact(eff, role_entities, roll_val)
 
     # --- Step 2: Apply To Database (The "To") ---
     field_def = eff.outfield
     if not field_def:
         return True, ''
+    plan = get_factor_plan(eff).outfield
 
     # If the mode requires a specific instance (Character/Location/Pile),
     # validate that the participant role is resolved.
-    if field_def.field_mode not in Participant.REQUIRES_PRESELECTED:
+    out_entity_id = None
+    if plan.needs_anchor:
         out_entity_id = resolve_anchor_id(
             field_def.role, role_entities, field_def)
         if out_entity_id is None:
             return False, f"No entity available for role {field_def.role}"
-    op = eff.op_application
+    if op is None:
+        op = eff.op_application
 
-    # Destination A: Attributes
-    if field_def.field_mode == Participant.ATTR:
-        if field_def.child_of_anchor:
-            anchor = db.session.get(Entity, (game_token, out_entity_id))
-            query = db.session.query(Pile).join(
-                Item,
-                (Pile.item_id == Item.id) &
-                (Pile.game_token == Item.game_token)
-            ).join(
-                AttribVal,
-                (AttribVal.subject_id == Item.id) &
-                (AttribVal.game_token == Item.game_token)
-            ).filter(
-                Pile.game_token == game_token,
-                Pile.owner_id == out_entity_id,
-                AttribVal.attrib_id == field_def.attrib_id
-            )
-            if anchor and anchor.entity_type == Character.TYPENAME:
-                query = query.filter(Pile.slot_id.is_not(None))
-            pile = query.first()
-            if pile:
-                out_entity_id = pile.item_id
-            else:
-                anchor = db.session.get(Entity, (game_token, out_entity_id))
-                anchor_name = maskable_name(anchor) if anchor else "(Unknown)"
-                attr = db.session.get(Attrib, (game_token, field_def.attrib_id))
-                attr_name = attr.name if attr else "(Unknown)"
-                return False, f"Could not find an item at {anchor_name}" \
-                              f" that has {attr_name}."
-        elif field_def.item_id:
-            out_entity_id = field_def.item_id
-
-        record = AttribVal.query.filter_by(
-            game_token=game_token,
-            subject_id=out_entity_id,
-            attrib_id=field_def.attrib_id
-        ).first()
-        current = record.value if record else 0.0
-        attrib = db.session.get(Attrib, (game_token, field_def.attrib_id))
-        new_val = apply_operation(current, impact, op, attrib=attrib)
-
-        if not record:
-            db.session.add(AttribVal(
-                game_token=game_token, subject_id=out_entity_id,
-                attrib_id=field_def.attrib_id, value=new_val))
-        else:
-            record.value = new_val
+    if plan.writer:
+        error = plan.writer(
+            field_def, plan, out_entity_id, impact, op,
+            roll_val, role_entities)
+        if error:
+            return False, error
 
-    # Destination B: Item Quantities
-    elif field_def.field_mode == Participant.QTY:
-        current = get_accessible_quantity(field_def.item_id, out_entity_id)
-        new_qty = impact if op == Operation.ASSIGN \
-            else apply_operation(current, impact, op)
+    db.session.flush()
+    return True, ''
 
-        # Dropping items on a Location's floor should land at the
-        # triggering character's feet.
-        position = None
-        out_entity = db.session.get(Entity, (game_token, out_entity_id))
-        if out_entity and out_entity.entity_type == Location.TYPENAME:
-            item = db.session.get(Item, (game_token, field_def.item_id))
-            if item and item.storage_type != StorageType.UNIVERSAL:
-                subject_id = resolve_anchor_id(
-                    Participant.SUBJECT, role_entities)
-                subject = db.session.get(Entity, (game_token, subject_id)) \
-                    if subject_id else None
-                if subject and subject.entity_type == Character.TYPENAME \
-                        and subject.position:
-                    position = subject.position
-
-        adjust_accessible_quantity(
-            field_def.item_id, out_entity_id, new_qty - current, position)
-
-    # Destination C: Item Limit (Blueprint)
-    elif field_def.field_mode == Participant.LIMIT:
+# Each writes an effect to one kind of destination, returning an error
+# message or None. The field plan holds the one for its mode.
+
+def _write_attrib(
+        field_def, plan, out_entity_id, impact, op, _roll_val,
+        _role_entities):
+    game_token = g.game_token
+    if field_def.child_of_anchor:
+        anchor = db.session.get(Entity, (game_token, out_entity_id))
+        query = db.session.query(Pile).join(
+            Item,
+            (Pile.item_id == Item.id) &
+            (Pile.game_token == Item.game_token)
+        ).join(
+            AttribVal,
+            (AttribVal.subject_id == Item.id) &
+            (AttribVal.game_token == Item.game_token)
+        ).filter(
+            Pile.game_token == game_token,
+            Pile.owner_id == out_entity_id,
+            AttribVal.attrib_id == field_def.attrib_id
+        )
+        if anchor and anchor.entity_type == Character.TYPENAME:
+            query = query.filter(Pile.slot_id.is_not(None))
+        pile = query.first()
+        if pile:
+            out_entity_id = pile.item_id
+        else:
+            anchor_name = maskable_name(anchor) if anchor else "(Unknown)"
+            attr = db.session.get(Attrib, (game_token, field_def.attrib_id))
+            attr_name = attr.name if attr else "(Unknown)"
+            return f"Could not find an item at {anchor_name}" \
+                   f" that has {attr_name}."
+    elif field_def.item_id:
+        out_entity_id = field_def.item_id
+
+    record = AttribVal.query.filter_by(
+        game_token=game_token,
+        subject_id=out_entity_id,
+        attrib_id=field_def.attrib_id
+    ).first()
+    current = record.value if record else 0.0
+    new_val = apply_operation(current, impact, op, attrib=plan.attrib)
+
+    if not record:
+        db.session.add(AttribVal(
+            game_token=game_token, subject_id=out_entity_id,
+            attrib_id=field_def.attrib_id, value=new_val))
+    else:
+        record.value = new_val
+    return None
+
+def _write_quantity(
+        field_def, _plan, out_entity_id, impact, op, _roll_val,
+        role_entities):
+    game_token = g.game_token
+    current = get_accessible_quantity(field_def.item_id, out_entity_id)
+    new_qty = impact if op == Operation.ASSIGN \
+        else apply_operation(current, impact, op)
+
+    # Dropping items on a Location's floor should land at the
+    # triggering character's feet.
+    position = None
+    out_entity = db.session.get(Entity, (game_token, out_entity_id))
+    if out_entity and out_entity.entity_type == Location.TYPENAME:
         item = db.session.get(Item, (game_token, field_def.item_id))
-        if item:
-            current = item.q_limit
-            item.q_limit = impact if op == Operation.ASSIGN \
+        if item and item.storage_type != StorageType.UNIVERSAL:
+            subject_id = resolve_anchor_id(
+                Participant.SUBJECT, role_entities)
+            subject = db.session.get(Entity, (game_token, subject_id)) \
+                if subject_id else None
+            if subject and subject.entity_type == Character.TYPENAME \
+                    and subject.position:
+                position = subject.position
+
+    adjust_accessible_quantity(
+        field_def.item_id, out_entity_id, new_qty - current, position)
+    return None
+
+def _write_limit(
+        field_def, _plan, _out_entity_id, impact, op, _roll_val,
+        _role_entities):
+    """Item Limit (Blueprint)"""
+    item = db.session.get(Item, (g.game_token, field_def.item_id))
+    if item:
+        current = item.q_limit
+        item.q_limit = impact if op == Operation.ASSIGN \
+            else apply_operation(current, impact, op)
+        add_message(
+            f"Set {maskable_name(item)} "
+            f"storage limit to {item.q_limit:g}")
+    return None
+
+def _write_recipe(
+        field_def, _plan, _out_entity_id, impact, op, _roll_val,
+        _role_entities):
+    """Recipe Efficiency (Global Blueprint Change)"""
+    recipe = db.session.get(Recipe, (g.game_token, field_def.recipe_id))
+    if not recipe:
+        return None
+    if field_def.field_mode == Participant.RATE_AMT:
+        current = recipe.rate_amount
+        recipe.rate_amount = impact if op == Operation.ASSIGN \
+            else apply_operation(current, impact, op)
+        add_message(
+            f"Set {maskable_name(recipe.product)} "
+            f"yield to {recipe.rate_amount:g}")
+    elif field_def.field_mode == Participant.RATE_DUR:
+        current = recipe.rate_duration
+        new_dur = impact if op == Operation.ASSIGN \
+            else apply_operation(current, impact, op)
+        # Truncate to integer and clamp at 1 second minimum
+        recipe.rate_duration = max(1, int(new_dur))
+        add_message(
+            f"Set {maskable_name(recipe.product)} "
+            f"duration to {recipe.rate_duration}s")
+    elif field_def.field_mode == Participant.SOURCE_QTY:
+        src = next((s for s in recipe.sources
+            if s.item_id == field_def.source_item_id), None)
+        if src:
+            current = src.q_required
+            src.q_required = impact if op == Operation.ASSIGN \
                 else apply_operation(current, impact, op)
             add_message(
-                f"Set {maskable_name(item)} "
-                f"storage limit to {item.q_limit:g}")
+                f"Set {maskable_name(recipe.product)} "
+                f"source ({maskable_name(src.ingredient)}) "
+                f"to {src.q_required:g}")
+    elif field_def.field_mode == Participant.BYP_QTY:
+        byp = next((b for b in recipe.byproducts
+            if b.item_id == field_def.source_item_id), None)
+        if byp:
+            current = byp.rate_amount
+            byp.rate_amount = impact if op == Operation.ASSIGN \
+                else apply_operation(current, impact, op)
+            add_message(
+                f"Set {maskable_name(recipe.product)} "
+                f"byproduct ({maskable_name(byp.item)}) "
+                f"to {byp.rate_amount:g}")
+    return None
+
+def _write_place(
+        field_def, _plan, _out_entity_id, _impact, _op, roll_val,
+        _role_entities):
+    """Physical Placement"""
+    game_token = g.game_token
+    if not field_def.loc_id:
+        return "No location (At) for placement."
+    loc = db.session.get(Location, (game_token, field_def.loc_id))
+    position = roll_val \
+        if isinstance(roll_val, list) and len(roll_val) == 2 \
+        else get_default_position(loc)
+
+    # Create or increment the pile
+    adjust_quantity(
+        field_def.item_id,
+        field_def.loc_id,
+        delta=1.0,
+        position=position
+    )
 
-    # Destination D: Recipe Efficiency (Global Blueprint Change)
-    elif field_def.field_mode in Participant.USES_RECIPE:
-        recipe = db.session.get(Recipe, (game_token, field_def.recipe_id))
-        if recipe:
-            if field_def.field_mode == Participant.RATE_AMT:
-                current = recipe.rate_amount
-                recipe.rate_amount = impact if op == Operation.ASSIGN \
-                    else apply_operation(current, impact, op)
-                add_message(
-                    f"Set {maskable_name(recipe.product)} "
-                    f"yield to {recipe.rate_amount:g}")
-            elif field_def.field_mode == Participant.RATE_DUR:
-                current = recipe.rate_duration
-                new_dur = impact if op == Operation.ASSIGN \
-                    else apply_operation(current, impact, op)
-                # Truncate to integer and clamp at 1 second minimum
-                recipe.rate_duration = max(1, int(new_dur))
-                add_message(
-                    f"Set {maskable_name(recipe.product)} "
-                    f"duration to {recipe.rate_duration}s")
-            elif field_def.field_mode == Participant.SOURCE_QTY:
-                src = next((s for s in recipe.sources
-                    if s.item_id == field_def.source_item_id), None)
-                if src:
-                    current = src.q_required
-                    src.q_required = impact if op == Operation.ASSIGN \
-                        else apply_operation(current, impact, op)
-                    add_message(
-                        f"Set {maskable_name(recipe.product)} "
-                        f"source ({maskable_name(src.ingredient)}) "
-                        f"to {src.q_required:g}")
-
-            elif field_def.field_mode == Participant.BYP_QTY:
-                byp = next((b for b in recipe.byproducts
-                    if b.item_id == field_def.source_item_id), None)
-                if byp:
-                    current = byp.rate_amount
-                    byp.rate_amount = impact if op == Operation.ASSIGN \
-                        else apply_operation(current, impact, op)
-                    add_message(
-                        f"Set {maskable_name(recipe.product)} "
-                        f"byproduct ({maskable_name(byp.item)}) "
-                        f"to {byp.rate_amount:g}")
-
-    # Destination E: Physical Placement
-    elif field_def.field_mode == Participant.PLACE:
-        if not field_def.loc_id:
-            return False, "No location (At) for placement."
+    item = db.session.get(Item, (game_token, field_def.item_id))
+    add_message(f"Placed {maskable_name(item)} at {roll_val}")
+    return None
+
+def _write_teleport(
+        field_def, _plan, out_entity_id, _impact, _op, roll_val,
+        _role_entities):
+    """Move a character to a location and position."""
+    game_token = g.game_token
+    char = db.session.get(Character, (game_token, out_entity_id))
+    if not char:
+        return "Expected a character."
+    if not field_def.loc_id: # Nowhere
+        char.location_id = None
+        char.position = None
+        add_message(f"{char.name} is now inactive.")
+    else:
+        # Determine Position
         loc = db.session.get(Location, (game_token, field_def.loc_id))
-        position = roll_val \
+        char.location_id = field_def.loc_id
+        char.position = roll_val \
             if isinstance(roll_val, list) and len(roll_val) == 2 \
             else get_default_position(loc)
-
-        # Create or increment the pile
-        adjust_quantity(
-            field_def.item_id,
-            field_def.loc_id,
-            delta=1.0,
-            position=position
-        )
-
-        item = db.session.get(Item, (game_token, field_def.item_id))
-        add_message(f"Placed {maskable_name(item)} at {roll_val}")
-
-    # Destination F: Teleportation
-    elif field_def.field_mode == Participant.TELEPORT:
-        char = db.session.get(Character, (game_token, out_entity_id))
-        if not char:
-            return False, "Expected a character."
-        if not field_def.loc_id: # Nowhere
-            char.location_id = None
-            char.position = None
-            add_message(f"{char.name} is now inactive.")
-        else:
-            # Determine Position
-            loc = db.session.get(Location, (game_token, field_def.loc_id))
-            char.location_id = field_def.loc_id
-            char.position = roll_val \
-                if isinstance(roll_val, list) and len(roll_val) == 2 \
-                else get_default_position(loc)
-            add_message(
-                f"Positioned {char.name} at {maskable_name(loc)} {char.position}")
-
-    db.session.flush()
-    return True, ''
+        add_message(
+            f"Positioned {char.name} at {maskable_name(loc)} {char.position}")
+    return None
+
+# Key: field mode → writer; modes missing here are read-only
+_EFFECT_WRITERS = {
+    Participant.ATTR: _write_attrib,
+    Participant.QTY: _write_quantity,
+    Participant.LIMIT: _write_limit,
+    Participant.RATE_AMT: _write_recipe,
+    Participant.RATE_DUR: _write_recipe,
+    Participant.SOURCE_QTY: _write_recipe,
+    Participant.BYP_QTY: _write_recipe,
+    Participant.PLACE: _write_place,
+    Participant.TELEPORT: _write_teleport,
+}
 
 # ------------------------------------------------------------------------
 # Outcome Resolution
 # ------------------------------------------------------------------------
 
-def roll_for_outcome(
-        event_id, role_entities, difficulty=0.0, group_messages=True):
+def fold_modifiers(result_val, breakdown_str, modifiers, sides, attrib=None):
     """
-    Performs the random roll based on user-provided difficulty and Event rules.
-    Returns: (numeric_result, string_display, tier),
-        result None if a condition is not met
+    Applies calculated determinants to a starting value in order.
+    Returns (result_val, breakdown_str, unmet) where unmet is the first
+    comparison modifier that failed, or None.
     """
-    game_token = g.game_token
-    event = db.session.get(Event, (g.game_token, event_id))
-    sides, base_min, base_max = num_sides(event)
-
-    result_val = 0
-    choice_str = ''
-    attrib = None
-    if event.outcome_type == OutcomeType.DETERMINED:
-        # Determined events don't roll; they use the fixed_base as the start.
-        result_val = event.fixed_base
-        breakdown_parts = [format_for_display(result_val)]
-
-    elif event.outcome_type == OutcomeType.SELECT:
-        choice_str = "(No Choices)"
-        if event.selection_attrib_id:
-            attrib = db.session.get(
-                Attrib, (game_token, event.selection_attrib_id))
-            if attrib and attrib.enum_entries:
-                selected_entry = random.choice(attrib.enum_entries)
-                result_val = float(selected_entry.id)
-                choice_str = selected_entry.label
-        breakdown_parts = [f"Selection: <b>{choice_str}</b>"]
-
-    elif event.outcome_type == OutcomeType.COORDS:
-        loc_id = role_entities.get(Participant.AT)
-        result_val, coord_str = roll_coordinate(loc_id)
-        breakdown_parts = [coord_str]
-
-    else:
-        die_roll = random.randint(1, sides)
-        adjustment = f"{base_min - 1}" if base_min != 1 else ""
-        if adjustment and base_min >= 0:
-            adjustment = f"+{adjustment}"
-        result_val = float(die_roll + (base_min - 1))
-        breakdown_parts = [f"d{sides}(🎲{die_roll}){adjustment}"]
-
-    # 2. Resolve and Apply every Determinant individually
-    modifiers = calculate_determinants(event, role_entities)
-
     PRECEDENCE = {
         Operation.ASSIGN:     1,
         Operation.ADD:        2,
@@ -1281,20 +1795,13 @@ def roll_for_outcome(
         Operation.DIV:        3,
         Operation.MOD:        3,
     }
-    breakdown_str = breakdown_parts[0] # Start with the Die Roll/Base
     current_min_precedence = 99
     memory_val = 0.0
 
     for m in modifiers:
         if m['is_comparison']:
             if not m['is_met']:
-                subject_id = role_entities.get(Participant.SUBJECT)
-                subject = db.session.get(Entity, (game_token, subject_id))
-                subject_name = f"{subject.name} " if subject else ""
-                message_str = f"Requirements not met: {m['field_name']}" \
-                              f"{m['op_app_display']}{m['val_required']}"
-                message_str = f"{subject_name}{event.name}: {message_str}"
-                return None, message_str, None
+                return result_val, breakdown_str, m
             continue
 
         op = m['op_app']
@@ -1342,6 +1849,87 @@ def roll_for_outcome(
         # Update Total
         result_val = apply_operation(result_val, val, op, sides, attrib)
 
+    return result_val, breakdown_str, None
+
+def fourway_tier(die_roll, result_val, event, difficulty):
+    """Returns (label, SuccessTier) for a FOURWAY roll."""
+    sides, base_min, base_max = num_sides(event)
+    shift = round(sides * difficulty)
+
+    major_failure_max = base_min + math.floor(shift * 0.20)
+    minor_success_min = round(sides * 0.10) + shift
+    major_success_min = (
+        base_max - math.floor(sides * 0.15)) + math.floor(shift * 0.40)
+
+    if die_roll == sides:
+        return "Natural Max!", SuccessTier.SUCCESS_NAT_MAX
+    if die_roll == 1:
+        return "Natural Min!", SuccessTier.FAILURE_NAT_MIN
+    if result_val >= major_success_min:
+        return "Major Success", SuccessTier.SUCCESS_MAJOR
+    if result_val >= minor_success_min:
+        return "Minor Success", SuccessTier.SUCCESS_MINOR
+    if result_val <= major_failure_max:
+        return "Major Failure", SuccessTier.FAILURE_MAJOR
+    return "Minor Failure", SuccessTier.FAILURE_MINOR
+
+def roll_for_outcome(
+        event_id, role_entities, difficulty=0.0, group_messages=True,
+        ledger=None, log=True):
+    """
+    Performs the random roll based on user-provided difficulty and Event rules.
+    Returns: (numeric_result, string_display, tier),
+        result None if a condition is not met
+    """
+    game_token = g.game_token
+    event = db.session.get(Event, (g.game_token, event_id))
+    sides, base_min, _base_max = num_sides(event)
+
+    result_val = 0
+    choice_str = ''
+    attrib = None
+    if event.outcome_type == OutcomeType.DETERMINED:
+        # Determined events don't roll; they use the fixed_base as the start.
+        result_val = event.fixed_base
+        breakdown_parts = [format_for_display(result_val)]
+
+    elif event.outcome_type == OutcomeType.SELECT:
+        choice_str = "(No Choices)"
+        if event.selection_attrib_id:
+            attrib = db.session.get(
+                Attrib, (game_token, event.selection_attrib_id))
+            if attrib and attrib.enum_entries:
+                selected_entry = random.choice(attrib.enum_entries)
+                result_val = float(selected_entry.id)
+                choice_str = selected_entry.label
+        breakdown_parts = [f"Selection: <b>{choice_str}</b>"]
+
+    elif event.outcome_type == OutcomeType.COORDS:
+        loc_id = role_entities.get(Participant.AT)
+        result_val, coord_str = roll_coordinate(loc_id)
+        breakdown_parts = [coord_str]
+
+    else:
+        die_roll = random.randint(1, sides)
+        adjustment = f"{base_min - 1}" if base_min != 1 else ""
+        if adjustment and base_min >= 0:
+            adjustment = f"+{adjustment}"
+        result_val = float(die_roll + (base_min - 1))
+        breakdown_parts = [f"d{sides}(🎲{die_roll}){adjustment}"]
+
+    # 2. Resolve and Apply every Determinant individually
+    modifiers = calculate_determinants(event, role_entities, ledger)
+    result_val, breakdown_str, unmet = fold_modifiers(
+        result_val, breakdown_parts[0], modifiers, sides, attrib)
+    if unmet:
+        subject_id = role_entities.get(Participant.SUBJECT)
+        subject = db.session.get(Entity, (game_token, subject_id))
+        subject_name = f"{subject.name} " if subject else ""
+        message_str = f"Requirements not met: {unmet['field_name']}" \
+                      f"{unmet['op_app_display']}{unmet['val_required']}"
+        message_str = f"{subject_name}{event.name}: {message_str}"
+        return None, message_str, None
+
     # 3. Final Formatting
     if event.outcome_type not in (OutcomeType.SELECT, OutcomeType.COORDS):
         breakdown_str += \
@@ -1350,32 +1938,8 @@ def roll_for_outcome(
     display_str = ""
     tier = None
     if event.outcome_type == OutcomeType.FOURWAY:
-        shift = round(sides * difficulty)
-
-        major_failure_max = base_min + math.floor(shift * 0.20)
-        minor_success_min = round(sides * 0.10) + shift
-        major_success_min = (
-            base_max - math.floor(sides * 0.15)) + math.floor(shift * 0.40)
-
-        if die_roll == sides:
-            res = "Natural Max!"
-            tier = SuccessTier.SUCCESS_NAT_MAX
-        elif die_roll == 1:
-            res = "Natural Min!"
-            tier = SuccessTier.FAILURE_NAT_MIN
-        elif result_val >= major_success_min:
-            res = "Major Success"
-            tier = SuccessTier.SUCCESS_MAJOR
-        elif result_val >= minor_success_min:
-            res = "Minor Success"
-            tier = SuccessTier.SUCCESS_MINOR
-        elif result_val <= major_failure_max:
-            res = "Major Failure"
-            tier = SuccessTier.FAILURE_MAJOR
-        else:
-            res = "Minor Failure"
-            tier = SuccessTier.FAILURE_MINOR
-
+        res, tier = fourway_tier(
+            die_roll, result_val, event, difficulty)
         display_str = f"<b>{res}</b><br><small>{breakdown_str}</small>"
         message_str = f"{format_for_display(result_val)} — {res}"
     elif event.outcome_type == OutcomeType.SELECT:
@@ -1388,7 +1952,9 @@ def roll_for_outcome(
     subject_id = role_entities.get(Participant.SUBJECT)
     subject = db.session.get(Entity, (game_token, subject_id))
     subject_name = f"{subject.name} " if subject else ""
-    add_message(f"{subject_name}{event.name}: {message_str}", group_messages)
+    if log:
+        add_message(
+            f"{subject_name}{event.name}: {message_str}", group_messages)
     return result_val, display_str, tier
 
 def roll_coordinate(loc_id):
@@ -1437,7 +2003,8 @@ def roll_coordinate(loc_id):
     chosen_pos = random.choice(available)
     return chosen_pos, f"Coordinates: {chosen_pos}"
 
-def roll_for_system_outcome(event_id, num_dice=1, sides=20, bonus=0):
+def roll_for_system_outcome(
+        event_id, num_dice=1, sides=20, bonus=0, log=True):
     """
     Handles specific dice systems (D&D, Ironsworn) without
     any database determining factors.
@@ -1489,5 +2056,259 @@ def roll_for_system_outcome(event_id, num_dice=1, sides=20, bonus=0):
         )
         numeric_val = float(hits)
 
-    add_message(f"{event.name}: {res_text}")
+    if log:
+        add_message(f"{event.name}: {res_text}")
     return numeric_val, display_str, tier
+
+# ------------------------------------------------------------------------
+# Event Chains
+# ------------------------------------------------------------------------
+
+# Chains that can loop stop after this many links
+MAX_CHAIN_DEPTH = 5
+
+class LinkGraph:
+    """
+    Which events link to which for a whole game, read with one query,
+    and the events where following links can come back around.
+    """
+    def __init__(self, game_token):
+        self.children = {}  # parent event id -> child event ids
+        for parent_id, child_id in db.session.query(
+                EventLink.parent_id, EventLink.child_id).filter(
+                    EventLink.game_token == game_token
+                ).order_by(EventLink.id):
+            self.children.setdefault(parent_id, []).append(child_id)
+        self.looping = self._find_looping()
+
+    def _find_looping(self):
+        """
+        Walks the links depth first with an explicit stack.
+        An event loops if it links back to an event still being walked,
+        or to any event that loops.
+        """
+        ACTIVE, DONE = 1, 2
+        state = {}
+        looping = set()
+        for root in self.children:
+            if root in state:
+                continue
+            state[root] = ACTIVE
+            stack = [(root, iter(self.children.get(root, ())))]
+            while stack:
+                event_id, children = stack[-1]
+                child_id = next(children, None)
+                if child_id is None:
+                    state[event_id] = DONE
+                    stack.pop()
+                    if stack and event_id in looping:
+                        looping.add(stack[-1][0])
+                elif state.get(child_id) == ACTIVE:
+                    logger.warning(
+                        "Event link from %s back to %s makes a loop",
+                        event_id, child_id)
+                    looping.add(event_id)
+                elif child_id in state:
+                    if child_id in looping:
+                        looping.add(event_id)
+                else:
+                    state[child_id] = ACTIVE
+                    stack.append(
+                        (child_id, iter(self.children.get(child_id, ()))))
+        return looping
+
+def get_link_graph(game_token):
+    version = current_config_version(game_token)
+    graph = _link_graphs.get(game_token, version)
+    if graph is None:
+        graph = _link_graphs.put(game_token, version, LinkGraph(game_token))
+    return graph
+
+class ChainStats:
+    """Totals over the event chains that the system has run."""
+    def __init__(self):
+        self.chains = 0
+        self.events = 0
+        self.deepest = 0
+        self.cut_off = 0
+
+    def add(self, events, cut_off):
+        self.chains += 1
+        self.events += events
+        self.deepest = max(self.deepest, events)
+        self.cut_off += cut_off
+
+    def to_dict(self):
+        return {
+            'chains': self.chains,
+            'events': self.events,
+            'deepest': self.deepest,
+            'cut_off': self.cut_off,
+        }
+
+def run_event_step(event, role_entities, roll_val, tier, checks=None):
+    """
+    Everything after rolling an event: resolves its effects once, writes
+    them if the event is auto-applied, and finds the links that can follow.
+    Returns (resolved effects, ledger, chain options).
+    """
+    resolved, ledger = resolve_effects(event, role_entities, roll_val, tier)
+    apply_resolved_effects(event, role_entities, roll_val, resolved)
+    chain_options = get_chain_results(
+        event, role_entities, roll_val, tier, ledger, checks)
+    return resolved, ledger, chain_options
+
+def run_event_chain(
+        event_id, role_entities, stats=None, max_depth=MAX_CHAIN_DEPTH):
+    """
+    Rolls an event for the system, then keeps following one eligible
+    link at random until none is left. Only chains from events that the
+    link graph shows can loop are stopped after max_depth links.
+    Returns False if no event could be executed.
+    """
+    game_token = g.game_token
+    may_loop = event_id in get_link_graph(game_token).looping
+    checks = {}
+    events_run = 0
+    cut_off = False
+    while event_id is not None:
+        if may_loop and events_run > max_depth:
+            logger.warning(
+                "Event chain reached max depth at event %s", event_id)
+            cut_off = True
+            break
+        event = db.session.get(Event, (game_token, event_id))
+        if not event:
+            break
+
+        # For now, the system uses 'Normal' difficulty (0.5)
+        # for Four-Way rolls and 1d20 for rollers
+        if event.outcome_type == OutcomeType.ROLLER:
+            result_val, _result_str, tier = roll_for_system_outcome(
+                event_id)
+        else:
+            result_val, _result_str, tier = roll_for_outcome(
+                event_id, role_entities, difficulty=0.5,
+                group_messages=False)
+        if result_val is None:
+            break
+        events_run += 1
+
+        _resolved, _ledger, chain_options = run_event_step(
+            event, role_entities, result_val, tier, checks)
+        event_id = None
+        if chain_options:
+            # If multiple branches are eligible, pick one randomly
+            event_id = random.choice(chain_options)['child_id']
+
+    if stats is not None and events_run:
+        stats.add(events_run, cut_off)
+    return events_run > 0
+
+# ------------------------------------------------------------------------
+# Bulk Rolls
+# ------------------------------------------------------------------------
+
+MAX_BULK_ROLLS = 500
+
+TIER_NAMES = {
+    SuccessTier.SUCCESS_NAT_MAX: "Natural Max",
+    SuccessTier.SUCCESS_MAJOR: "Major Success",
+    SuccessTier.SUCCESS_MINOR: "Minor Success",
+    SuccessTier.FAILURE_MINOR: "Minor Failure",
+    SuccessTier.FAILURE_MAJOR: "Major Failure",
+    SuccessTier.FAILURE_NAT_MIN: "Natural Min",
+}
+
+def roll_many(
+        event, role_entities, count, difficulty=0.0,
+        num_dice=1, sides=20, bonus=0):
+    """
+    Rolls an event count times back to back without committing.
+    Auto-applied effects accumulate in one ledger so that each roll sees
+    the earlier ones, and the net change of each field is written once
+    at the end along with a single chronicle entry.
+    Stops early if a requirement is no longer met.
+    Returns (rolls, summary) where rolls are compact {'v', 't'} dicts.
+    """
+    count = max(1, min(count, MAX_BULK_ROLLS))
+    ledger = {} if event.auto_apply else None
+    writers = {}  # ledger key -> (first effect that changes it, start value)
+    effects = {eff.id: eff for eff in event.effects}
+    rolls = []
+    for _ in range(count):
+        if event.outcome_type == OutcomeType.ROLLER:
+            result_val, display, tier = roll_for_system_outcome(
+                event.id, num_dice, sides, bonus, log=False)
+        else:
+            result_val, display, tier = roll_for_outcome(
+                event.id, role_entities, difficulty,
+                ledger=ledger, log=False)
+        if result_val is None:
+            if not rolls:
+                return rolls, display
+            break
+        rolls.append({'v': result_val, 't': tier})
+        if ledger is None:
+            continue
+
+        resolved, _ledger = resolve_effects(
+            event, role_entities, result_val, tier, ledger)
+        for res in resolved:
+            eff = effects[res['effect_id']]
+            field_def = eff.outfield
+            target_id = resolve_anchor_id(
+                field_def.role, role_entities, field_def)
+            lkey = _ledger_key(target_id, field_def)
+            if lkey is None:
+                # Placement and movement don't add up, so apply each one
+                do_effect_change(
+                    eff, result_val, role_entities,
+                    impact=res['impact_value'])
+            elif lkey not in writers:
+                writers[lkey] = (eff, res['current_value'])
+
+    for lkey, (eff, start) in writers.items():
+        if eff.outfield.field_mode == Participant.QTY:
+            # The ledger counts one pile but items can be reached from
+            # several, so add the change instead of setting the total
+            do_effect_change(
+                eff, None, role_entities,
+                impact=ledger[lkey] - start, op=Operation.ADD)
+        else:
+            do_effect_change(
+                eff, None, role_entities,
+                impact=ledger[lkey], op=Operation.ASSIGN)
+
+    summary = _bulk_summary(event, rolls)
+    subject_id = role_entities.get(Participant.SUBJECT)
+    subject = db.session.get(Entity, (g.game_token, subject_id))
+    subject_name = f"{subject.name} " if subject else ""
+    add_message(
+        f"{subject_name}{event.name} ×{len(rolls)}: {summary}",
+        group_duplicates=False)
+    return rolls, summary
+
+def _bulk_summary(event, rolls):
+    """One line describing a set of rolls for the chronicle."""
+    if event.outcome_type == OutcomeType.FOURWAY or (
+            event.outcome_type == OutcomeType.ROLLER
+            and event.roller_type == RollerType.IRONSWORN):
+        counts = Counter(roll['t'] for roll in rolls)
+        return ", ".join(
+            f"{counts[tier]} {name}" for tier, name in TIER_NAMES.items()
+            if counts[tier])
+
+    if event.outcome_type == OutcomeType.SELECT:
+        attrib = db.session.get(
+            Attrib, (event.game_token, event.selection_attrib_id)) \
+            if event.selection_attrib_id else None
+        counts = Counter(roll['v'] for roll in rolls)
+        return ", ".join(
+            f"{counts[val]} {attrib.format_value(val) if attrib else val}"
+            for val in sorted(counts))
+
+    total = sum(roll['v'] for roll in rolls)
+    return (
+        f"total {format_for_display(total)}, "
+        f"average {format_for_display(total / len(rolls))}")
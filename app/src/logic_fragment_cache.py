@@ -0,0 +1,55 @@
+"""
+Rendered template fragments that depend only on scenario setup, such
+as the cells of a location grid, reused across requests.
+
+In a template:
+    {% cache 'loc-grid', location.id %} ... {% endcache %}
+
+Besides the given parts, the key holds the game, its configuration
+version and the number format. The body must not use anything else that
+varies between requests, such as quantities, URL arguments or
+link_letters, since it would be frozen into the cached HTML.
+"""
+from flask import g
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from app.utils import HtmlCache
+from .logic_metrics import FRAGMENT_CACHE_BYTES, FRAGMENT_CACHE_LOOKUPS
+
+FRAGMENT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+fragment_cache = HtmlCache(
+    FRAGMENT_CACHE_MAX_BYTES, FRAGMENT_CACHE_LOOKUPS, FRAGMENT_CACHE_BYTES)
+
+def fragment_key(parts):
+    return (
+        g.game_token, g.config_version, g.get('number_format', 'en_US'),
+        *parts)
+
+class FragmentCacheExtension(Extension):
+    """Adds the {% cache part, ... %} ... {% endcache %} tag."""
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        call = self.call_method('_render_cached', [nodes.List(parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, parts, caller):
+        if g.get('config_version') is None:
+            # Outside a game, so there's no version to check against
+            return Markup(caller())
+        key = fragment_key(parts)
+        html = fragment_cache.get(key)
+        if html is None:
+            html = Markup(caller())
+            fragment_cache.put(key, html)
+        return html
+
+def init_fragment_cache(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
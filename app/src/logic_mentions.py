@@ -0,0 +1,164 @@
+"""
+Inverted index of what each description mentions, for the configure
+lookup page.
+
+Descriptions mention an entity either by a link such as /item/12 or
+/play/event/46, or by its name. Per game, the index maps link targets
+and the words of descriptions to the entities and scenario whose
+descriptions contain them. It is built on first use and kept current as
+descriptions and names are flushed. It's built again when the stored
+configuration version shows another worker changed the game, or when a
+change is rolled back or the game is cleared.
+"""
+import re
+import threading
+from collections import defaultdict
+from itertools import chain
+from flask import g
+from sqlalchemy import event as sa_event, inspect as sa_inspect, select
+from sqlalchemy.orm import Session
+from app.models import db, Entity, Scenario
+from app.utils import VersionedCache
+from .logic_world_version import current_config_version
+
+_LINK = re.compile(r'/([a-z]+)/(\d+)\b')
+_WORD = re.compile(r'\w+')
+
+# Key under which the scenario description is indexed
+SCENARIO_KEY = ('scenario', 0)
+
+MAX_MENTION_INDEXES = 32
+
+class MentionIndex:
+    """Mentioners are keyed by (entity_type, id)."""
+    def __init__(self):
+        # Key: mentioner → (name, description)
+        self.texts = {}
+        # Key: (entity_type, id) linked to → mentioners
+        self.links = defaultdict(set)
+        # Key: casefolded word → mentioners
+        self.words = defaultdict(set)
+        self.lock = threading.RLock()
+
+    def add(self, key, name, description):
+        with self.lock:
+            self.remove(key)
+            if not description:
+                return
+            self.texts[key] = (name, description)
+            for ent_type, ent_id in _LINK.findall(description):
+                self.links[(ent_type, int(ent_id))].add(key)
+            for word in set(_WORD.findall(description.casefold())):
+                self.words[word].add(key)
+
+    def remove(self, key):
+        with self.lock:
+            entry = self.texts.pop(key, None)
+            if entry is None:
+                return
+            description = entry[1]
+            for ent_type, ent_id in _LINK.findall(description):
+                self.links[(ent_type, int(ent_id))].discard(key)
+            for word in set(_WORD.findall(description.casefold())):
+                self.words[word].discard(key)
+
+    def candidates(self, ent_type, ent_id, name):
+        """Every mentioner that might match; a superset of find()."""
+        found = set(self.links.get((ent_type, ent_id), ()))
+        name_words = set(_WORD.findall(name.casefold()))
+        if not name_words:
+            return set(self.texts)
+        by_name = set.intersection(
+            *(self.words.get(word, set()) for word in name_words))
+        return found | by_name
+
+    def find(self, ent_type, ent_id, name):
+        """
+        Mentioners whose description links to the entity or contains
+        its name as whole words, as (key, name), not including itself.
+        """
+        pattern = re.compile(
+            f"/{ent_type}/{ent_id}\\b|\\b{re.escape(name)}\\b")
+        with self.lock:
+            return [
+                (key, self.texts[key][0])
+                for key in self.candidates(ent_type, ent_id, name)
+                if key != (ent_type, ent_id)
+                and pattern.search(self.texts[key][1])]
+
+# Key: game_token → MentionIndex
+_indexes = VersionedCache(MAX_MENTION_INDEXES)
+
+def get_mention_index(game_token=None):
+    game_token = game_token or g.game_token
+    version = current_config_version(game_token)
+    index = _indexes.get(game_token, version)
+    if index is not None:
+        return index
+    index = MentionIndex()
+    rows = db.session.execute(
+        select(Entity.entity_type, Entity.id, Entity.name, Entity.description)
+        .where(Entity.game_token == game_token,
+               Entity.description.is_not(None))).all()
+    for ent_type, ent_id, name, description in rows:
+        index.add((ent_type, ent_id), name, description)
+    scenario = db.session.get(Scenario, game_token)
+    if scenario:
+        index.add(SCENARIO_KEY, scenario.title, scenario.description)
+    return _indexes.put(game_token, version, index)
+
+def clear_mention_index(game_token=None):
+    """Drops the index for a token, or for all of them."""
+    if game_token is None:
+        _indexes.clear()
+    else:
+        _indexes.discard(game_token)
+
+# ------------------------------------------------------------------------
+# Hooks
+# ------------------------------------------------------------------------
+
+def _mention_key(obj):
+    if isinstance(obj, Scenario):
+        return SCENARIO_KEY, obj.title
+    return (obj.entity_type, obj.id), obj.name
+
+def _text_changed(obj):
+    attrs = sa_inspect(obj).attrs
+    name_attr = attrs.title if isinstance(obj, Scenario) else attrs.name
+    return (name_attr.history.has_changes()
+            or attrs.description.history.has_changes())
+
+@sa_event.listens_for(Session, 'after_flush')
+def _update_changed_mentions(session_obj, _flush_context):
+    # Ticks change characters often, but rarely their names
+    changed = [
+        (obj, obj in session_obj.deleted)
+        for obj in chain(
+            session_obj.new, session_obj.dirty, session_obj.deleted)
+        if isinstance(obj, (Entity, Scenario))
+        and (obj not in session_obj.dirty or _text_changed(obj))]
+    pending = session_obj.info.setdefault('mention_changes', set())
+    for obj, deleted in changed:
+        # Even if stale, since this request may still use it
+        index = _indexes.peek(obj.game_token)
+        pending.add(obj.game_token)
+        if index is None:
+            continue
+        key, name = _mention_key(obj)
+        if deleted:
+            index.remove(key)
+        else:
+            index.add(key, name, obj.description)
+
+@sa_event.listens_for(Session, 'after_commit')
+def _forget_mention_changes(session_obj):
+    session_obj.info.pop('mention_changes', None)
+
+@sa_event.listens_for(Session, 'after_transaction_end')
+def _drop_rolled_back_mentions(session_obj, transaction):
+    # The index may hold descriptions that were never committed
+    if transaction.parent is not None:
+        return
+    for game_token in session_obj.info.pop('mention_changes', ()):
+        clear_mention_index(game_token)
@@ -0,0 +1,209 @@
+"""
+In-process metrics in the Prometheus text format, served at /metrics.
+
+A small registry instead of a client library, since everything lives in
+one process. Values reset when the server restarts, which Prometheus
+handles as a counter reset.
+"""
+import math
+import time
+import threading
+from contextlib import contextmanager
+from sqlalchemy import func
+from app.models import db, Entity, Progress
+
+# Seconds; suits both lock waits and whole ticks
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+_lock = threading.Lock()
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace(
+        '"', '\\"').replace('\n', '\\n')
+
+def _label_text(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    inner = ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return '{' + inner + '}'
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    TYPE = ''
+
+    def __init__(self, name, helptext, labels=()):
+        self.name = name
+        self.helptext = helptext
+        self.labels = tuple(labels)
+        self.values = {}  # label values -> value
+        if not self.labels:
+            self.values[()] = self._zero()
+        _registry.append(self)
+
+    def _zero(self):
+        return 0
+
+    def _key(self, label_values):
+        if len(label_values) != len(self.labels):
+            raise ValueError(
+                f"{self.name} expects labels {self.labels}")
+        return tuple(label_values)
+
+    def samples(self):
+        """(suffix, label text, value) for each line of output."""
+        with _lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield '', _label_text(self.labels, key), value
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.helptext}',
+            f'# TYPE {self.name} {self.TYPE}']
+        for suffix, labels, value in self.samples():
+            lines.append(
+                f'{self.name}{suffix}{labels} {_format_value(value)}')
+        return lines
+
+class Counter(Metric):
+    TYPE = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        key = self._key(label_values)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """A value set directly, or read by a callback at scrape time."""
+    TYPE = 'gauge'
+
+    def __init__(self, name, helptext, labels=(), collect=None):
+        super().__init__(name, helptext, labels)
+        self.collect = collect
+
+    def set(self, value, *label_values):
+        key = self._key(label_values)
+        with _lock:
+            self.values[key] = value
+
+    def samples(self):
+        if self.collect:
+            self.set(self.collect())
+        return super().samples()
+
+class Histogram(Metric):
+    TYPE = 'histogram'
+
+    def __init__(self, name, helptext, labels=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, helptext, labels)
+
+    def _zero(self):
+        return [0] * len(self.buckets), 0.0
+
+    def observe(self, value, *label_values):
+        key = self._key(label_values)
+        with _lock:
+            counts, total = self.values.get(key) or self._zero()
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self.values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def samples(self):
+        with _lock:
+            items = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self.values.items())
+        for key, (counts, total) in items:
+            for bound, count in zip(self.buckets, counts):
+                yield '_bucket', _label_text(
+                    self.labels, key, ('le', _format_value(bound))), count
+            yield '_sum', _label_text(self.labels, key), total
+            yield '_count', _label_text(self.labels, key), counts[-1]
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+# ------------------------------------------------------------------------
+# Metrics
+# ------------------------------------------------------------------------
+
+TICK_SECONDS = Histogram(
+    'team_progress_tick_seconds',
+    "Time to tick all active production in one game.")
+TICK_BATCHES = Counter(
+    'team_progress_tick_batches_total',
+    "Production batches processed by ticks.")
+LOCK_WAIT_SECONDS = Histogram(
+    'team_progress_lock_wait_seconds',
+    "Time spent waiting for the per-game write lock before a tick.",
+    labels=('lock',))
+MESSAGES_WRITTEN = Counter(
+    'team_progress_messages_written_total',
+    "Game log messages written, either as new rows or grouped into "
+    "a recent duplicate.",
+    labels=('kind',))
+HTMLIFY_CACHE_LOOKUPS = Counter(
+    'team_progress_htmlify_cache_lookups_total',
+    "Description renders, by whether the sanitized HTML was cached.",
+    labels=('result',))
+HTMLIFY_CACHE_BYTES = Gauge(
+    'team_progress_htmlify_cache_bytes',
+    "Size of the sanitized HTML held in the description cache.")
+FRAGMENT_CACHE_LOOKUPS = Counter(
+    'team_progress_fragment_cache_lookups_total',
+    "Cached template fragment renders, by whether the HTML was cached.",
+    labels=('result',))
+FRAGMENT_CACHE_BYTES = Gauge(
+    'team_progress_fragment_cache_bytes',
+    "Size of the HTML held in the template fragment cache.")
+SCENARIO_IMPORT_SECONDS = Histogram(
+    'team_progress_scenario_import_seconds',
+    "Time to import a scenario or saved game.",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+
+def _count_progress():
+    return db.session.query(func.count(Progress.id)).scalar()
+
+def _count_ticking_games():
+    return db.session.query(
+        func.count(func.distinct(Progress.game_token))).scalar()
+
+def _count_games():
+    return db.session.query(
+        func.count(func.distinct(Entity.game_token))).scalar()
+
+ACTIVE_PROGRESS = Gauge(
+    'team_progress_active_progress',
+    "Production records currently running in all games.",
+    collect=_count_progress)
+TICKING_GAMES = Gauge(
+    'team_progress_ticking_games',
+    "Games with at least one production record running.",
+    collect=_count_ticking_games)
+GAMES = Gauge(
+    'team_progress_games',
+    "Game tokens with any data in the database.",
+    collect=_count_games)
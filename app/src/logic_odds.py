@@ -0,0 +1,179 @@
+import random
+import logging
+from collections import Counter
+from app.models import (
+    db, Attrib, OutcomeType, RollerType, SuccessTier)
+from .logic_event import (
+    num_sides, calculate_determinants, fold_modifiers, fourway_tier)
+
+logger = logging.getLogger(__name__)
+
+# Dice with more faces than this are sampled instead of enumerated
+EXACT_FACE_LIMIT = 1000
+DEFAULT_SAMPLES = 20000
+# Previews of larger rolls count only this many dice
+MAX_DICE = 100
+
+# ------------------------------------------------------------------------
+# Pure Dice
+# ------------------------------------------------------------------------
+
+def die_distribution(sides, offset=0):
+    """Uniform distribution of one die: {face + offset: probability}."""
+    sides = max(1, sides)
+    prob = 1.0 / sides
+    return {face + offset: prob for face in range(1, sides + 1)}
+
+def convolve(dist_a, dist_b):
+    """Distribution of the sum of two independent values."""
+    result = {}
+    for val_a, prob_a in dist_a.items():
+        for val_b, prob_b in dist_b.items():
+            total = val_a + val_b
+            result[total] = result.get(total, 0.0) + prob_a * prob_b
+    return result
+
+def dnd_distribution(num_dice, sides, bonus=0):
+    """Exact distribution of NdS + bonus."""
+    dist = {bonus: 1.0}
+    single = die_distribution(sides)
+    for _ in range(num_dice):
+        dist = convolve(dist, single)
+    return dist
+
+def sampled_dnd_distribution(
+        num_dice, sides, bonus=0, samples=DEFAULT_SAMPLES):
+    """Distribution of NdS + bonus estimated from random rolls."""
+    faces = range(1, max(1, sides) + 1)
+    totals = Counter(
+        sum(random.choices(faces, k=num_dice)) + bonus
+        for _ in range(samples))
+    return {val: count / samples for val, count in totals.items()}
+
+def ironsworn_distribution(bonus=0):
+    """
+    Exact distribution of hits and tiers for an action die against two
+    challenge dice, matching roll_for_system_outcome.
+    Returns (hits_dist, tier_dist).
+    """
+    hits_dist = Counter()
+    tier_dist = Counter()
+    outcomes = 6 * 10 * 10
+    for action_die in range(1, 7):
+        total = action_die + bonus
+        for challenge_1 in range(1, 11):
+            for challenge_2 in range(1, 11):
+                hits = (total > challenge_1) + (total > challenge_2)
+                with_match = challenge_1 == challenge_2
+                if hits == 2:
+                    tier = SuccessTier.SUCCESS_NAT_MAX if with_match \
+                        else SuccessTier.SUCCESS_MAJOR
+                elif hits == 1:
+                    tier = SuccessTier.SUCCESS_MINOR
+                else:
+                    tier = SuccessTier.FAILURE_NAT_MIN if with_match \
+                        else SuccessTier.FAILURE_MAJOR
+                hits_dist[float(hits)] += 1
+                tier_dist[tier] += 1
+    return (
+        {k: v / outcomes for k, v in hits_dist.items()},
+        {k: v / outcomes for k, v in tier_dist.items()})
+
+# ------------------------------------------------------------------------
+# Events
+# ------------------------------------------------------------------------
+
+def event_odds(
+        event, role_entities, difficulty=0.0,
+        num_dice=1, sides=20, bonus=0, samples=DEFAULT_SAMPLES):
+    """
+    Computes the outcome distribution of an event for the given
+    participants without rolling, logging or writing anything.
+    """
+    if event.outcome_type == OutcomeType.ROLLER:
+        if event.roller_type == RollerType.IRONSWORN:
+            values, tiers = ironsworn_distribution(bonus)
+            return _odds_result(values, tiers, 'exact')
+        num_dice = min(max(num_dice, 0), MAX_DICE)
+        # DnD rolls always report a minor success
+        tiers = {SuccessTier.SUCCESS_MINOR: 1.0}
+        if num_dice * sides <= EXACT_FACE_LIMIT:
+            values = dnd_distribution(num_dice, sides, bonus)
+            return _odds_result(values, tiers, 'exact')
+        values = sampled_dnd_distribution(num_dice, sides, bonus, samples)
+        result = _odds_result(values, tiers, 'simulated')
+        result['samples'] = samples
+        return result
+
+    if event.outcome_type == OutcomeType.COORDS:
+        return {
+            'requirements_met': True,
+            'message': "Coordinate outcomes have no numeric odds."}
+
+    modifiers = calculate_determinants(event, role_entities)
+    unmet = next(
+        (m for m in modifiers if m['is_comparison'] and not m['is_met']),
+        None)
+    if unmet:
+        return {
+            'requirements_met': False,
+            'message':
+                f"Requirements not met: {unmet['field_name']}"
+                f"{unmet['op_app_display']}{unmet['val_required']}"}
+
+    die_sides, base_min, _base_max = num_sides(event)
+
+    def outcome(start_val, attrib=None):
+        val, _breakdown, _unmet = fold_modifiers(
+            start_val, '', modifiers, die_sides, attrib)
+        return float(val or 0.0)
+
+    values = Counter()
+    tiers = Counter()
+    method = 'exact'
+
+    if event.outcome_type == OutcomeType.DETERMINED:
+        values[round(outcome(event.fixed_base), 6)] = 1.0
+
+    elif event.outcome_type == OutcomeType.SELECT:
+        attrib = db.session.get(
+            Attrib, (event.game_token, event.selection_attrib_id)) \
+            if event.selection_attrib_id else None
+        entries = attrib.enum_entries if attrib else []
+        for entry in entries:
+            val = outcome(float(entry.id), attrib)
+            values[round(val, 6)] += 1.0 / len(entries)
+        if not entries:
+            values[round(outcome(0), 6)] = 1.0
+
+    else:
+        if die_sides <= EXACT_FACE_LIMIT:
+            faces = range(1, die_sides + 1)
+            weight = 1.0 / die_sides
+        else:
+            faces = [random.randint(1, die_sides) for _ in range(samples)]
+            weight = 1.0 / samples
+            method = 'simulated'
+        for die_roll in faces:
+            val = outcome(float(die_roll + (base_min - 1)))
+            values[round(val, 6)] += weight
+            if event.outcome_type == OutcomeType.FOURWAY:
+                _res, tier = fourway_tier(die_roll, val, event, difficulty)
+                tiers[tier] += weight
+
+    result = _odds_result(values, tiers, method)
+    if method == 'simulated':
+        result['samples'] = samples
+    return result
+
+def _odds_result(values, tiers, method):
+    distribution = [
+        {'value': val, 'probability': prob}
+        for val, prob in sorted(values.items())]
+    return {
+        'requirements_met': True,
+        'method': method,
+        'distribution': distribution,
+        'mean': sum(val * prob for val, prob in values.items()),
+        'tiers': dict(tiers),
+    }
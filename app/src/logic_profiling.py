@@ -0,0 +1,134 @@
+"""
+Profiles single requests on demand, for finding out why a page is slow
+on a live server.
+
+A request is profiled only if it carries the PROFILE_AUTH_TOKEN, either
+in an X-Profile header or in the cookie set from the profiles page, so
+other requests run as usual. Stats are saved in the standard .prof format,
+which tools like snakeviz or flameprof can turn into a flame graph.
+"""
+import os
+import re
+import hmac
+import cProfile
+import pstats
+import logging
+from datetime import datetime
+from flask import current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_COOKIE = 'profile_key'
+# Oldest files are deleted beyond this many
+MAX_PROFILES = 200
+
+_PROFILE_NAME = re.compile(r'^([\w.]+)_(\d{8}-\d{6}-\d{6})\.prof$')
+_TIME_FORMAT = '%Y%m%d-%H%M%S-%f'
+
+def profile_key():
+    """The configured admin token, or None if profiling is disabled."""
+    return os.environ.get('PROFILE_AUTH_TOKEN') or None
+
+def matches_profile_key(key):
+    """Whether the given key is the admin token, in constant time."""
+    expected = profile_key()
+    if not expected or not key:
+        return False
+    return hmac.compare_digest(key.encode(), expected.encode())
+
+def is_profile_admin():
+    return any(matches_profile_key(key) for key in (
+        request.headers.get(PROFILE_HEADER),
+        request.cookies.get(PROFILE_COOKIE)))
+
+def init_profiling(app):
+    """Registers handlers that profile requests from the admin."""
+
+    @app.before_request
+    def start_profile():
+        if not request.endpoint or request.endpoint.startswith('static') \
+                or request.endpoint.startswith('session.profile'):
+            return
+        if not is_profile_admin():
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one profiler can run at a time, so another request
+            # is already being profiled
+            logger.debug("Not profiling %s; another profile is running",
+                         request.endpoint)
+            return
+        g.profiler = profiler
+
+    @app.teardown_request
+    def finish_profile(_exception=None):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        try:
+            save_profile(profiler, request.endpoint)
+        except OSError as e:
+            logger.error("Failed to save profile: %s", e)
+
+def save_profile(profiler, endpoint):
+    profile_dir = current_app.config['PROFILE_DIR']
+    os.makedirs(profile_dir, exist_ok=True)
+    filename = f"{endpoint}_{datetime.now().strftime(_TIME_FORMAT)}.prof"
+    profiler.dump_stats(os.path.join(profile_dir, filename))
+    for old in list_profiles()[MAX_PROFILES:]:
+        os.remove(profile_path(old['filename']))
+    return filename
+
+def profile_path(filename):
+    """Full path of a saved profile, or None if the name is not one."""
+    if not _PROFILE_NAME.match(filename):
+        return None
+    path = os.path.join(current_app.config['PROFILE_DIR'], filename)
+    return path if os.path.isfile(path) else None
+
+def list_profiles():
+    """Saved profiles, newest first."""
+    profile_dir = current_app.config['PROFILE_DIR']
+    if not os.path.isdir(profile_dir):
+        return []
+    profiles = []
+    for filename in os.listdir(profile_dir):
+        match = _PROFILE_NAME.match(filename)
+        if not match:
+            continue
+        profiles.append({
+            'filename': filename,
+            'endpoint': match.group(1),
+            'time': datetime.strptime(match.group(2), _TIME_FORMAT),
+            'size': os.path.getsize(os.path.join(profile_dir, filename)),
+        })
+    profiles.sort(key=lambda prof: prof['time'], reverse=True)
+    return profiles
+
+def top_functions(path, limit=40, focus=None):
+    """
+    Functions by cumulative time, optionally only those whose name
+    contains the focus text, such as 'tick_all_active'.
+    Returns (total seconds, rows).
+    """
+    stats = pstats.Stats(path)
+    rows = []
+    for (filename, line, func), (
+            prim_calls, calls, tottime, cumtime, _callers) \
+            in stats.stats.items():
+        if focus and focus not in func:
+            continue
+        rows.append({
+            'function': func,
+            'location': f"{os.path.basename(filename)}:{line}",
+            'calls': calls if calls == prim_calls
+                else f"{calls}/{prim_calls}",
+            'tottime': tottime,
+            'cumtime': cumtime,
+        })
+    rows.sort(key=lambda row: row['cumtime'], reverse=True)
+    return stats.total_tt, rows[:limit]
@@ -1,4 +1,5 @@
 import math
+import time
 import logging
 from datetime import datetime, timezone
 import zlib
@@ -10,6 +11,7 @@ from app.utils import ContextIds
 from app.database import USE_SQLITE
 from .logic_production import can_perform_recipe, execute_production, STALLED
 from .logic_user_interaction import add_message
+from .logic_metrics import TICK_SECONDS, TICK_BATCHES, LOCK_WAIT_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -21,11 +23,13 @@ def tick_all_active(messages_host_id=None):
       reasons specifically for this host.
     """
     game_token = g.game_token
+    start = time.perf_counter()
 
     if USE_SQLITE:
         # Force a write lock immediately
         # This prevents Worker B from even READING the data until Worker A is done.
         db.session.execute(text("BEGIN IMMEDIATE"))
+        LOCK_WAIT_SECONDS.observe(time.perf_counter() - start, 'sqlite')
     else:
         # DB lock to prevent concurrent access to this game token
         lock_id = zlib.adler32(game_token.encode())
@@ -36,6 +40,7 @@ def tick_all_active(messages_host_id=None):
             )
         except Exception as e:
             logger.exception(e)
+        LOCK_WAIT_SECONDS.observe(time.perf_counter() - start, 'postgres')
 
     all_active_records = Progress.query.filter_by(game_token=game_token).all()
 
@@ -109,6 +114,7 @@ def tick_all_active(messages_host_id=None):
             # Update tracking
             work['total_remaining'] -= actual
             p.batches_processed += actual
+            TICK_BATCHES.inc(amount=actual)
 
             if actual > 0:
                 any_work_done_this_wave = True
@@ -157,6 +163,7 @@ def tick_all_active(messages_host_id=None):
 
     # Once commit is called, the advisory lock is automatically released.
     db.session.commit()
+    TICK_SECONDS.observe(time.perf_counter() - start)
     return halt_messages
 
 def get_elapsed_seconds(progress):
@@ -0,0 +1,140 @@
+"""
+Per-request SQL instrumentation for finding slow pages.
+
+Off unless the app is created with query_stats=True, in which case
+cursor hooks count each statement, time it, and group statements that
+only differ by the number of bound values. A statement repeated many
+times in one request is usually a query inside a loop (N+1).
+"""
+import re
+import time
+import threading
+from collections import Counter, deque
+from flask import g, has_app_context, request
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import Engine
+
+# A statement run at least this many times in one request is flagged
+REPEAT_THRESHOLD = 5
+# Requests kept per endpoint for the summary page
+ROLLING_WINDOW = 100
+
+_IN_LIST = re.compile(r'\((?:\?|%\(\w+\)s)(?:, (?:\?|%\(\w+\)s))+\)')
+_SPACES = re.compile(r'\s+')
+
+# Key: endpoint → deque of RequestQueries
+_endpoint_history: dict[str, deque] = {}
+_history_lock = threading.Lock()
+
+def fingerprint(statement):
+    """Same text for statements that differ only in bound values."""
+    return _IN_LIST.sub('(?…)', _SPACES.sub(' ', statement).strip())
+
+class RequestQueries:
+    """Statements issued while handling one request."""
+    __slots__ = ('count', 'seconds', 'statements', 'started')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        self.started = time.perf_counter()
+
+    def add(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[fingerprint(statement)] += 1
+
+    def repeated(self):
+        """(fingerprint, times) for likely N+1 statements, most first."""
+        return [
+            (statement, times)
+            for statement, times in self.statements.most_common()
+            if times >= REPEAT_THRESHOLD]
+
+    def server_timing(self):
+        total_ms = (time.perf_counter() - self.started) * 1000
+        return (
+            f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries", '
+            f'app;dur={total_ms:.1f}')
+
+# ------------------------------------------------------------------------
+# Hooks
+# ------------------------------------------------------------------------
+
+def _current():
+    return g.get('query_stats') if has_app_context() else None
+
+def _before_cursor_execute(conn, _cursor, _statement, _params, _context,
+                           _executemany):
+    conn.info['query_start'] = time.perf_counter()
+
+def _after_cursor_execute(conn, _cursor, statement, _params, _context,
+                          _executemany):
+    stats = _current()
+    if stats is not None:
+        stats.add(
+            statement, time.perf_counter() - conn.info['query_start'])
+
+def init_query_stats(app):
+    """
+    Registers the cursor hooks and request handlers.
+    Call before other before_request handlers so that they are counted.
+    """
+    if not sa_event.contains(
+            Engine, 'before_cursor_execute', _before_cursor_execute):
+        sa_event.listen(
+            Engine, 'before_cursor_execute', _before_cursor_execute)
+        sa_event.listen(
+            Engine, 'after_cursor_execute', _after_cursor_execute)
+    app.config['QUERY_STATS'] = True
+
+    @app.before_request
+    def start_query_stats():
+        if request.endpoint and not request.endpoint.startswith('static'):
+            g.query_stats = RequestQueries()
+
+    @app.after_request
+    def finish_query_stats(response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        response.headers['Server-Timing'] = stats.server_timing()
+        with _history_lock:
+            history = _endpoint_history.get(request.endpoint)
+            if history is None:
+                history = _endpoint_history[request.endpoint] = deque(
+                    maxlen=ROLLING_WINDOW)
+            history.append(stats)
+        return response
+
+# ------------------------------------------------------------------------
+# Summary
+# ------------------------------------------------------------------------
+
+def endpoint_summary():
+    """Averages over recent requests, slowest endpoints first."""
+    with _history_lock:
+        snapshot = {
+            endpoint: list(history)
+            for endpoint, history in _endpoint_history.items()}
+    rows = []
+    for endpoint, requests in snapshot.items():
+        repeats = Counter()
+        for stats in requests:
+            for statement, times in stats.repeated():
+                repeats[statement] = max(repeats[statement], times)
+        rows.append({
+            'endpoint': endpoint,
+            'requests': len(requests),
+            'avg_queries': sum(s.count for s in requests) / len(requests),
+            'max_queries': max(s.count for s in requests),
+            'avg_ms': sum(s.seconds for s in requests) * 1000 / len(requests),
+            'repeated': repeats.most_common(3),
+        })
+    rows.sort(key=lambda row: row['avg_ms'], reverse=True)
+    return rows
+
+def clear_query_history():
+    with _history_lock:
+        _endpoint_history.clear()
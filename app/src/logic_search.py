@@ -0,0 +1,222 @@
+"""
+Full-text search over entity names and descriptions.
+
+SQLite keeps an FTS5 table holding its own copy of the text, kept
+current by triggers, so saves, imports and deletes (including the bulk
+delete when a game is cleared) all update it. Its rows are found by
+(game_token, id) through a key table, since the entities table has no
+rowid that VACUUM is bound to keep. PostgreSQL uses a GIN index on a
+tsvector expression, which it maintains itself. Either one is created
+along with the tables, or on first search for a database that was set
+up before search existed or with an older layout.
+"""
+import re
+from markupsafe import Markup, escape
+from flask import g
+from sqlalchemy import event as sa_event, text
+from app.models import db, Entity
+
+SEARCH_TABLE = 'entity_search'
+# Key: rowid in SEARCH_TABLE → (game_token, entity_id)
+SEARCH_KEYS_TABLE = f'{SEARCH_TABLE}_keys'
+# Marks matched words in snippets; private use characters, which won't
+# occur in descriptions, so the text can be escaped before they become
+# tags
+MARK_OPEN = '\ue000'
+MARK_CLOSE = '\ue001'
+SNIPPET_WORDS = 12
+# bm25 weights for name and description
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_WORD = re.compile(r'\w+')
+
+_TRIGGERS = ('insert', 'delete', 'update')
+
+# The search rowid of an entity row
+_SEARCH_ROWID = f"""(SELECT rowid FROM {SEARCH_KEYS_TABLE}
+    WHERE game_token = {{0}}.game_token AND entity_id = {{0}}.id)"""
+
+_SQLITE_DDL = [
+    # An INTEGER PRIMARY KEY, so VACUUM keeps it
+    f"""CREATE TABLE IF NOT EXISTS {SEARCH_KEYS_TABLE} (
+        rowid INTEGER PRIMARY KEY,
+        game_token VARCHAR(50) NOT NULL,
+        entity_id INTEGER NOT NULL,
+        UNIQUE (game_token, entity_id))""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        name, description,
+        tokenize='unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert
+        AFTER INSERT ON {Entity.__tablename__} BEGIN
+        INSERT INTO {SEARCH_KEYS_TABLE}(game_token, entity_id)
+        VALUES (new.game_token, new.id);
+        INSERT INTO {SEARCH_TABLE}(rowid, name, description)
+        VALUES ({_SEARCH_ROWID.format('new')}, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete
+        AFTER DELETE ON {Entity.__tablename__} BEGIN
+        DELETE FROM {SEARCH_TABLE}
+        WHERE rowid = {_SEARCH_ROWID.format('old')};
+        DELETE FROM {SEARCH_KEYS_TABLE}
+        WHERE game_token = old.game_token AND entity_id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update
+        AFTER UPDATE OF name, description ON {Entity.__tablename__} BEGIN
+        UPDATE {SEARCH_TABLE}
+        SET name = new.name, description = new.description
+        WHERE rowid = {_SEARCH_ROWID.format('new')};
+    END""",
+]
+
+_SQLITE_FILL = [
+    f"""INSERT INTO {SEARCH_KEYS_TABLE}(game_token, entity_id)
+        SELECT game_token, id FROM {Entity.__tablename__}""",
+    f"""INSERT INTO {SEARCH_TABLE}(rowid, name, description)
+        SELECT k.rowid, e.name, e.description
+        FROM {SEARCH_KEYS_TABLE} k
+        JOIN {Entity.__tablename__} e
+            ON e.game_token = k.game_token AND e.id = k.entity_id""",
+]
+
+# Must match the WHERE clause in _POSTGRES_SEARCH for the index to be used
+_TSVECTOR = (
+    "to_tsvector('simple', {0}name || ' ' || coalesce({0}description, ''))")
+_POSTGRES_DDL = [
+    f"""CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}
+        ON {Entity.__tablename__} USING GIN ({_TSVECTOR.format('')})""",
+]
+
+_SQLITE_SEARCH = f"""
+    SELECT e.entity_type, e.id, e.name,
+        highlight({SEARCH_TABLE}, 0, :open, :close) AS name_marked,
+        snippet({SEARCH_TABLE}, 1, :open, :close, '…', :words) AS snippet
+    FROM {SEARCH_TABLE}
+    JOIN {SEARCH_KEYS_TABLE} k ON k.rowid = {SEARCH_TABLE}.rowid
+    JOIN {Entity.__tablename__} e
+        ON e.game_token = k.game_token AND e.id = k.entity_id
+    WHERE {SEARCH_TABLE} MATCH :query
+        AND k.game_token = :game_token
+        AND e.entity_type != :base_type
+    ORDER BY bm25({SEARCH_TABLE}, {NAME_WEIGHT}, {DESCRIPTION_WEIGHT})
+    LIMIT :limit"""
+
+_POSTGRES_SEARCH = f"""
+    SELECT e.entity_type, e.id, e.name,
+        ts_headline('simple', e.name, q.query,
+            'HighlightAll=true, StartSel=' || :open || ', StopSel=' || :close)
+            AS name_marked,
+        ts_headline('simple', coalesce(e.description, ''), q.query,
+            'MaxWords=' || :words || ', MinWords=' || (:words / 2)
+            || ', StartSel=' || :open || ', StopSel=' || :close) AS snippet
+    FROM {Entity.__tablename__} e,
+        (SELECT to_tsquery('simple', :query) AS query) q
+    WHERE e.game_token = :game_token
+        AND e.entity_type != :base_type
+        AND {_TSVECTOR.format('e.')} @@ q.query
+    ORDER BY ts_rank(
+        setweight(to_tsvector('simple', e.name), 'A')
+        || setweight(to_tsvector('simple', coalesce(e.description, '')), 'B'),
+        q.query) DESC
+    LIMIT :limit"""
+
+# ------------------------------------------------------------------------
+# Schema
+# ------------------------------------------------------------------------
+
+def _sqlite_index_exists(connection):
+    # Older layouts read the text by the entities rowid and had no keys
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+        {'name': SEARCH_KEYS_TABLE}).first() is not None
+
+def _drop_sqlite_index(connection):
+    for trigger in _TRIGGERS:
+        connection.execute(text(
+            f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{trigger}"))
+    connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+    connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_KEYS_TABLE}"))
+
+def create_search_index(connection):
+    """Idempotent; fills the FTS5 table if it is new."""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        existed = _sqlite_index_exists(connection)
+        if not existed:
+            _drop_sqlite_index(connection)
+        for statement in _SQLITE_DDL:
+            connection.execute(text(statement))
+        if not existed:
+            for statement in _SQLITE_FILL:
+                connection.execute(text(statement))
+    elif dialect == 'postgresql':
+        for statement in _POSTGRES_DDL:
+            connection.execute(text(statement))
+
+@sa_event.listens_for(db.metadata, 'after_create')
+def _create_with_tables(_target, connection, **_kw):
+    create_search_index(connection)
+
+@sa_event.listens_for(db.metadata, 'before_drop')
+def _drop_with_tables(_target, connection, **_kw):
+    # Not in the metadata, so drop_all wouldn't remove it otherwise
+    if connection.dialect.name == 'sqlite':
+        _drop_sqlite_index(connection)
+
+# Engine URLs whose index is known to exist
+_ensured = set()
+
+def ensure_search_index():
+    url = str(db.engine.url)
+    if url in _ensured:
+        return
+    with db.engine.begin() as connection:
+        create_search_index(connection)
+    _ensured.add(url)
+
+# ------------------------------------------------------------------------
+# Queries
+# ------------------------------------------------------------------------
+
+def build_query(user_text, dialect):
+    """
+    Every word must match, as a prefix so that partial words typed in
+    the search box find results. None if there are no words.
+    """
+    words = _WORD.findall(user_text)
+    if not words:
+        return None
+    if dialect == 'postgresql':
+        return ' & '.join(f"{word}:*" for word in words)
+    return ' '.join(f'"{word}"*' for word in words)
+
+def marked_html(marked):
+    """Escapes the text, then turns the match markers into tags."""
+    return Markup(
+        str(escape(marked or ''))
+        .replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>'))
+
+def search_entities(user_text, limit=20, game_token=None):
+    """
+    Best matches first, as dicts with entity_type, id, name, and
+    name_html and snippet with <mark> around matched words.
+    """
+    game_token = game_token or g.game_token
+    dialect = db.engine.dialect.name
+    query = build_query(user_text, dialect)
+    if query is None:
+        return []
+    ensure_search_index()
+    sql = _POSTGRES_SEARCH if dialect == 'postgresql' else _SQLITE_SEARCH
+    rows = db.session.execute(text(sql), {
+        'query': query, 'game_token': game_token,
+        'base_type': Entity.TYPENAME, 'limit': limit,
+        'open': MARK_OPEN, 'close': MARK_CLOSE, 'words': SNIPPET_WORDS,
+    }).all()
+    return [{
+        'entity_type': row.entity_type,
+        'id': row.id,
+        'name': row.name,
+        'name_html': marked_html(row.name_marked),
+        'snippet': marked_html(row.snippet),
+    } for row in rows]
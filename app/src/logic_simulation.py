@@ -0,0 +1,172 @@
+"""
+Headless autobattle simulation for balance testing.
+
+Each worker process builds the app on its own in-memory SQLite database,
+imports a snapshot of the game once, and keeps a serialized image of that
+database. Every battle starts by restoring the image, so battles run the
+real round logic without touching the shared database or each other.
+"""
+import os
+import time
+import random
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from flask import g
+from app import create_app
+from app.models import db, JsonKeys
+from app.serialization import import_from_dict
+from .logic_autobattle import (
+    CombatState, resolve_battle, run_battle_reset, MAX_BATTLE_ROUNDS)
+from .logic_event import clear_event_plans
+
+logger = logging.getLogger(__name__)
+
+SIM_TOKEN = 'simulation'
+DEFAULT_MAX_ROUNDS = MAX_BATTLE_ROUNDS
+DEFAULT_BATTLES = 1000
+DRAW = None
+
+# ------------------------------------------------------------------------
+# Battles
+# ------------------------------------------------------------------------
+
+def simulate_battle(loc_id, max_rounds=DEFAULT_MAX_ROUNDS, reset=True):
+    """
+    Runs rounds until at most one party is standing, after the 'reset'
+    stage events unless reset is False.
+    Returns (winner or DRAW, rounds, damage by event id).
+    """
+    if reset:
+        run_battle_reset(loc_id)
+    state = CombatState(loc_id)
+    timeline = resolve_battle(loc_id, max_rounds, state)
+    alive = state.alive_parties()
+    winner = alive[0] if len(alive) == 1 else DRAW
+    return winner, len(timeline), state.damage
+
+class BattleStats:
+    """Totals over many battles; merged across workers."""
+    def __init__(self):
+        self.battles = 0
+        self.rounds = 0
+        self.wins = Counter()
+        self.damage = Counter()
+
+    def add(self, winner, rounds, damage):
+        self.battles += 1
+        self.rounds += rounds
+        self.wins[winner] += 1
+        self.damage.update(damage)
+
+    def merge(self, other):
+        self.battles += other.battles
+        self.rounds += other.rounds
+        self.wins.update(other.wins)
+        self.damage.update(other.damage)
+
+    def to_dict(self, event_names):
+        battles = self.battles or 1
+        return {
+            'battles': self.battles,
+            'win_rates': {
+                party: count / battles
+                for party, count in self.wins.most_common()
+                if party is not DRAW},
+            'draw_rate': self.wins[DRAW] / battles,
+            'average_rounds': self.rounds / battles,
+            'damage_per_ability': [
+                {
+                    'event_id': event_id,
+                    'name': event_names.get(event_id, '?'),
+                    'total': total,
+                    'per_battle': total / battles,
+                }
+                for event_id, total in self.damage.most_common()],
+        }
+
+# ------------------------------------------------------------------------
+# Workers
+# ------------------------------------------------------------------------
+
+_worker = {}
+
+def _init_worker(snapshot, loc_id, reset):
+    """Builds a private in-memory copy of the game in this process."""
+    app = create_app(db_uri='sqlite://')
+    ctx = app.test_request_context()
+    ctx.push()
+    g.game_token = SIM_TOKEN
+    db.create_all()
+    import_from_dict(snapshot)
+
+    raw = db.engine.raw_connection()
+    _worker.update({
+        'ctx': ctx,
+        'loc_id': loc_id,
+        'reset': reset,
+        'conn': raw.driver_connection,
+        'image': raw.driver_connection.serialize(),
+    })
+    raw.close()
+
+def _restore():
+    """Puts the database back to how it was after importing."""
+    db.session.remove()
+    _worker['conn'].deserialize(_worker['image'])
+    clear_event_plans(SIM_TOKEN)
+
+def _run_batch(first, count, seed, max_rounds):
+    """Runs battles first..first+count, each seeded on its own."""
+    stats = BattleStats()
+    for index in range(first, first + count):
+        _restore()
+        random.seed(seed + index)
+        stats.add(*simulate_battle(
+            _worker['loc_id'], max_rounds, _worker['reset']))
+    db.session.remove()
+    return stats
+
+def _batches(battles, workers):
+    size = max(1, -(-battles // (workers * 4)))
+    for first in range(0, battles, size):
+        yield first, min(size, battles - first)
+
+def run_simulation(
+        snapshot, loc_id, battles=DEFAULT_BATTLES, workers=None,
+        seed=0, max_rounds=DEFAULT_MAX_ROUNDS, reset=True):
+    """
+    Simulates complete battles at a location from an exported game
+    snapshot (see export_to_dict). Returns a report dictionary.
+    """
+    start = time.perf_counter()
+    stats = BattleStats()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(snapshot, loc_id, reset)
+        for first, count in _batches(battles, 1):
+            stats.merge(_run_batch(first, count, seed, max_rounds))
+    else:
+        with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(snapshot, loc_id, reset)) as pool:
+            futures = [
+                pool.submit(_run_batch, first, count, seed, max_rounds)
+                for first, count in _batches(battles, workers)]
+            for future in futures:
+                stats.merge(future.result())
+
+    entities = snapshot.get(JsonKeys.ENTITIES, {})
+    names = {event['id']: event['name'] for event in entities.get('events', [])}
+    loc_name = next((
+        loc['name'] for loc in entities.get('locations', [])
+        if loc['id'] == loc_id), '?')
+    report = {
+        'location': {'id': loc_id, 'name': loc_name},
+        'seed': seed,
+        'max_rounds': max_rounds,
+        'workers': workers,
+    }
+    report.update(stats.to_dict(names))
+    report['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+    return report
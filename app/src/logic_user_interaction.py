@@ -2,11 +2,14 @@ from datetime import datetime, timedelta, timezone
 import logging
 import random
 import string
-from flask import g, session
+from flask import current_app, g, has_app_context, session
 from sqlalchemy import desc, delete, select, func
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
 from app.models import (
     db, GameMessage, UserInteraction,
-    Scenario, IdSequence, Entity, UserInteraction)
+    Scenario, IdSequence, Entity, GameVersion, UserInteraction)
+from .logic_metrics import MESSAGES_WRITTEN
 
 logger = logging.getLogger(__name__)
 
@@ -54,53 +57,204 @@ def log_activity(endpoint, entity_id=None):
 # Game Log
 # ------------------------------------------------------------------------
 
+DUPLICATE_WINDOW = timedelta(minutes=2)
+
+# Oldest messages beyond this many per token are dropped on write.
+# Override with the CHRONICLE_MAX_MESSAGES config setting.
+DEFAULT_MAX_MESSAGES = 500
+
+def get_max_messages():
+    if has_app_context():
+        return current_app.config.get(
+            'CHRONICLE_MAX_MESSAGES', DEFAULT_MAX_MESSAGES)
+    return DEFAULT_MAX_MESSAGES
+
+class MessageSink:
+    """
+    Collects game log messages in memory for the life of a transaction.
+    Duplicates are merged locally and the final set is written once,
+    just before the session commits.
+    """
+    def __init__(self):
+        self.entries = []
+        self.latest_by_text = {}
+
+    def add(self, game_token, text, group_duplicates):
+        key = (game_token, text)
+        latest = self.latest_by_text.get(key)
+        if group_duplicates and latest is not None:
+            latest['count'] += 1
+            return
+        entry = {
+            'game_token': game_token,
+            'message': text,
+            'count': 1,
+            # Only the first grouped entry may merge into an existing row
+            'probe_db': group_duplicates,
+        }
+        self.entries.append(entry)
+        self.latest_by_text[key] = entry
+
+    def write(self, session_obj):
+        """Write all pending entries with one probe and one bulk add."""
+        entries, self.entries = self.entries, []
+        self.latest_by_text = {}
+        if not entries:
+            return
+
+        existing = {}
+        probes = [e for e in entries if e['probe_db']]
+        if probes:
+            threshold = datetime.now(timezone.utc) - DUPLICATE_WINDOW
+            rows = session_obj.execute(
+                select(GameMessage)
+                .where(
+                    GameMessage.game_token.in_(
+                        {e['game_token'] for e in probes}),
+                    GameMessage.message_hash.in_(
+                        {GameMessage.hash_text(e['message']) for e in probes}),
+                    GameMessage.timestamp >= threshold)
+                .order_by(desc(GameMessage.timestamp))
+            ).scalars().all()
+            for row in rows:
+                # The hash narrows the search; the text decides
+                existing.setdefault((row.game_token, row.message), row)
+
+        # Set here rather than by the database, so that grouped and new
+        # rows store their times in the same format and order correctly
+        now = datetime.now(timezone.utc)
+        new_rows = []
+        for entry in entries:
+            key = (entry['game_token'], entry['message'])
+            duplicate = existing.get(key) if entry['probe_db'] else None
+            if duplicate:
+                duplicate.count += entry['count']
+                duplicate.timestamp = now
+                MESSAGES_WRITTEN.inc('grouped')
+            else:
+                MESSAGES_WRITTEN.inc('new')
+                new_rows.append(GameMessage(
+                    game_token=entry['game_token'],
+                    message=entry['message'],
+                    message_hash=GameMessage.hash_text(entry['message']),
+                    count=entry['count'],
+                    timestamp=now))
+        session_obj.add_all(new_rows)
+        if new_rows:
+            session_obj.flush()
+            for game_token in {r.game_token for r in new_rows}:
+                enforce_message_cap(session_obj, game_token)
+
+def _older_than(game_token, msg_id):
+    """
+    Condition for messages before the given one in chronicle order,
+    which is by time and then id.
+    """
+    # Compare against the stored column value rather than a bound
+    # datetime so SQLite text timestamps order consistently
+    anchor = (
+        select(GameMessage.timestamp)
+        .where(GameMessage.game_token == game_token,
+               GameMessage.id == msg_id)
+        .scalar_subquery())
+    return (GameMessage.timestamp < anchor) | (
+        (GameMessage.timestamp == anchor) & (GameMessage.id < msg_id))
+
+def enforce_message_cap(session_obj, game_token, cap=None):
+    """Deletes the oldest messages beyond the per-token cap."""
+    cap = get_max_messages() if cap is None else cap
+    if not cap or cap <= 0:
+        return 0
+    # Oldest in the same order that the chronicle pages through, so a
+    # duplicate that was just grouped is kept
+    msg_id = session_obj.execute(
+        select(GameMessage.id)
+        .where(GameMessage.game_token == game_token)
+        .order_by(desc(GameMessage.timestamp), desc(GameMessage.id))
+        .offset(cap - 1)
+        .limit(1)
+    ).scalar()
+    if msg_id is None:
+        return 0
+    result = session_obj.execute(
+        delete(GameMessage)
+        .where(GameMessage.game_token == game_token)
+        .where(_older_than(game_token, msg_id))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+def _get_sink(session_obj, create=True):
+    sink = session_obj.info.get('message_sink')
+    if sink is None and create:
+        # Tie the buffer to a transaction so a rollback discards it
+        if not session_obj.in_transaction():
+            session_obj.begin()
+        sink = session_obj.info['message_sink'] = MessageSink()
+    return sink
+
+@sa_event.listens_for(Session, 'before_commit')
+def _write_pending_messages(session_obj):
+    sink = session_obj.info.pop('message_sink', None)
+    if sink:
+        sink.write(session_obj)
+
+@sa_event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending_messages(session_obj, _previous_transaction):
+    session_obj.info.pop('message_sink', None)
+
 def add_message(text, group_duplicates=True, commit=False):
     """
     Adds a message to the game log.
     If the exact same message was sent recently, increments the count
     instead of spamming the list.
+    Messages are buffered until the session commits.
     """
-    game_token = g.game_token
     if not text:
         return
-
-    duplicate = False
-    if group_duplicates:
-        # 1. Check for a very recent duplicate (within the last 2 minutes)
-        recent_threshold = datetime.now(timezone.utc) - timedelta(minutes=2)
-
-        duplicate = GameMessage.query.filter(
-            GameMessage.game_token == game_token,
-            GameMessage.message == text,
-            GameMessage.timestamp >= recent_threshold
-        ).order_by(desc(GameMessage.timestamp)).first()
-
-    if duplicate:
-        duplicate.count += 1
-        duplicate.timestamp = datetime.now(timezone.utc) # Refresh time
-    else:
-        # 2. Create new message
-        msg = GameMessage(
-            game_token=game_token,
-            message=text,
-            count=1
-        )
-        db.session.add(msg)
-
-    db.session.flush()
+    _get_sink(db.session()).add(g.game_token, text, group_duplicates)
     if commit:
         db.session.commit()
 
-def get_chronicle(limit=50):
-    """Fetches the most recent messages."""
+def flush_messages():
+    """Write buffered messages now instead of waiting for commit."""
+    sink = _get_sink(db.session(), create=False)
+    if sink:
+        sink.write(db.session())
+        db.session.flush()
+
+def get_chronicle(limit=50, before=None, since=None):
+    """
+    Fetches the most recent messages, oldest first. Grouping a
+    duplicate refreshes its time, which moves it to the newest place.
+    Pass the id of the oldest message already shown as 'before'
+    to page further back in history. If the cap has since deleted it,
+    it has deleted everything older too.
+    Pass the id of the newest message shown as 'since' to get only that
+    message and later ones, including older ones grouped since then,
+    which come back with their new count.
+    """
     game_token = g.game_token
+    flush_messages()
 
-    messages = db.session.execute(
+    query = (
         db.select(GameMessage)
         .filter_by(game_token=game_token)
-        .order_by(GameMessage.timestamp.desc())
-        .limit(limit)
-    ).scalars().all()
+        .order_by(GameMessage.timestamp.desc(), GameMessage.id.desc())
+        .limit(limit))
+    if before is not None:
+        query = query.where(_older_than(game_token, before))
+    if since is not None:
+        # Compare against the stored column value rather than a bound
+        # datetime so SQLite text timestamps order consistently
+        anchor = (
+            db.select(GameMessage.timestamp)
+            .filter_by(game_token=game_token, id=since)
+            .scalar_subquery())
+        query = query.where(
+            (GameMessage.id >= since) | (GameMessage.timestamp > anchor))
+
+    messages = db.session.execute(query).scalars().all()
 
     # Query gets newest messages; reverse for display order
     messages.reverse()
@@ -180,6 +334,7 @@ def purge_tokens(tokens):
     db.session.execute(delete(IdSequence).where(IdSequence.game_token.in_(tokens)))
     db.session.execute(delete(Entity).where(Entity.game_token.in_(tokens)))
     db.session.execute(delete(UserInteraction).where(UserInteraction.game_token.in_(tokens)))
+    db.session.execute(delete(GameVersion).where(GameVersion.game_token.in_(tokens)))
 
 def run_purge(now=None):
     """
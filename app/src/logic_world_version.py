@@ -0,0 +1,254 @@
+"""
+Per-game version numbers, so that play pages and heartbeats can answer
+a repeat request with 304 Not Modified instead of rendering again.
+
+Every commit that adds, changes or deletes rows of a game bumps that
+game's version, other than presence tracking. Bulk statements bump the
+games their WHERE clause limits them to, or a shared epoch if it
+doesn't limit them by game_token. Versions are
+stored in the game_versions table and bumped in the same transaction as
+the changes, so every worker sees them as soon as it sees the data.
+
+A separate configuration version changes only when the scenario setup
+does, which is any change other than the play state listed below, such
+as saving on a configure page, loading a scenario, or unmasking an
+entity in play. Cached template fragments are keyed by it.
+"""
+import json
+import hashlib
+from http import HTTPStatus
+from itertools import chain
+from flask import current_app, g, request, session
+from sqlalchemy import event as sa_event, inspect as sa_inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import (
+    BinaryExpression, BindParameter, BooleanClauseList)
+from app.models import (
+    db, AttribVal, Character, GameMessage, GameVersion, IdSequence, Item,
+    Pile, Progress, UserInteraction)
+
+# Changes to these never show on the pages that use versions
+UNTRACKED_MODELS = (UserInteraction, GameVersion)
+
+# What playing changes, which configuration-only fragments never show.
+# Key: model → changed columns that don't count, or None for all of them
+PLAY_STATE = {
+    Pile: None,
+    AttribVal: None,
+    Progress: None,
+    GameMessage: None,
+    IdSequence: None,
+    Character: {'location_id', 'position'},
+    Item: {'counted_for_unmasking'},
+}
+
+# The game_versions row counting bulk statements
+EPOCH_KEY = ''
+
+def _read_versions(column, game_token):
+    counts = dict(db.session.execute(
+        select(GameVersion.game_token, column).where(
+            GameVersion.game_token.in_((EPOCH_KEY, game_token)))).all())
+    return counts.get(EPOCH_KEY, 0), counts.get(game_token, 0)
+
+def world_version(game_token):
+    """(epoch, version); either one changing means the world changed."""
+    return _read_versions(GameVersion.world, game_token)
+
+def config_version(game_token):
+    """(epoch, version) of the scenario setup, like world_version."""
+    return _read_versions(GameVersion.config, game_token)
+
+def current_config_version(game_token):
+    """
+    config_version() as read at the start of the request, or the first
+    time it's needed in other app contexts. What the request loads is
+    never older, so it can key values built from that data.
+    """
+    versions = g.setdefault('config_versions', {})
+    if game_token not in versions:
+        versions[game_token] = config_version(game_token)
+    return versions[game_token]
+
+def _bump_versions(session_obj, game_tokens, config_tokens):
+    """Bumps the stored versions in the session's transaction.
+    Include EPOCH_KEY to bump all games."""
+    dialect = session_obj.get_bind().dialect.name
+    insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    table = GameVersion.__table__
+    # Straight to the connection, so it isn't noted as a bulk change
+    connection = session_obj.connection()
+    # Same order in every transaction, so they can't deadlock
+    for game_token in sorted(game_tokens | config_tokens):
+        world = int(game_token in game_tokens)
+        config = int(game_token in config_tokens)
+        stmt = insert(table).values(
+            game_token=game_token, world=world, config=config)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.game_token],
+            set_={'world': table.c.world + world,
+                  'config': table.c.config + config}))
+
+# ------------------------------------------------------------------------
+# Hooks
+# ------------------------------------------------------------------------
+
+def _pending_changes(session_obj, key='world_changes'):
+    return session_obj.info.setdefault(key, set())
+
+def _play_columns(model):
+    """Columns of the model that only play changes, or None for all."""
+    for play_model, columns in PLAY_STATE.items():
+        if issubclass(model, play_model):
+            return columns
+    return set()
+
+def _changes_config(obj, is_dirty):
+    columns = _play_columns(type(obj))
+    if columns is None:
+        return False
+    if not is_dirty or not columns:
+        return True
+    state = sa_inspect(obj)
+    return any(
+        state.attrs[prop.key].history.has_changes()
+        for prop in state.mapper.column_attrs
+        if prop.key not in columns)
+
+@sa_event.listens_for(Session, 'after_flush')
+def _note_changed_games(session_obj, _flush_context):
+    tokens = set()
+    config_tokens = set()
+    changed = chain(
+        ((obj, False) for obj in chain(session_obj.new, session_obj.deleted)),
+        # Setting an attribute to the value it already has isn't a change
+        ((obj, True) for obj in session_obj.dirty
+         if session_obj.is_modified(obj)))
+    for obj, is_dirty in changed:
+        if isinstance(obj, UNTRACKED_MODELS):
+            continue
+        game_token = getattr(obj, 'game_token', None) or EPOCH_KEY
+        tokens.add(game_token)
+        if _changes_config(obj, is_dirty):
+            config_tokens.add(game_token)
+    if tokens:
+        _pending_changes(session_obj).update(tokens)
+    if config_tokens:
+        _pending_changes(session_obj, 'config_changes').update(config_tokens)
+
+def _statement_tokens(orm_execute_state):
+    """
+    Games that a bulk statement is limited to, from a game_token
+    condition at the top level of its WHERE clause or from the rows it
+    inserts. None if it could change any game.
+    """
+    if orm_execute_state.is_insert:
+        params = orm_execute_state.parameters
+        rows = params if isinstance(params, (list, tuple)) else [params]
+        tokens = {row.get('game_token') for row in rows if row}
+        return None if not tokens or None in tokens else tokens
+    clause = orm_execute_state.statement.whereclause
+    if isinstance(clause, BooleanClauseList) \
+            and clause.operator is operators.and_:
+        conditions = clause.clauses
+    else:
+        conditions = [clause]
+    for condition in conditions:
+        if not (isinstance(condition, BinaryExpression)
+                and getattr(condition.left, 'key', None) == 'game_token'
+                and isinstance(condition.right, BindParameter)):
+            continue
+        value = condition.right.effective_value
+        if condition.operator is operators.eq:
+            return {value}
+        if condition.operator is operators.in_op:
+            return set(value)
+    return None
+
+@sa_event.listens_for(Session, 'do_orm_execute')
+def _note_bulk_changes(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update
+            or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, UNTRACKED_MODELS):
+        return
+    session_obj = orm_execute_state.session
+    tokens = _statement_tokens(orm_execute_state) or {EPOCH_KEY}
+    _pending_changes(session_obj).update(tokens)
+    if mapper is None or _play_columns(mapper.class_) is not None:
+        _pending_changes(session_obj, 'config_changes').update(tokens)
+
+@sa_event.listens_for(Session, 'before_commit')
+def _store_changed_games(session_obj):
+    # Flush first, since what it writes is only noted afterwards
+    session_obj.flush()
+    changes = session_obj.info.pop('world_changes', set())
+    config_changes = session_obj.info.pop('config_changes', set())
+    if changes or config_changes:
+        _bump_versions(session_obj, changes, config_changes)
+
+@sa_event.listens_for(Session, 'after_rollback')
+def _discard_changed_games(session_obj):
+    session_obj.info.pop('world_changes', None)
+    session_obj.info.pop('config_changes', None)
+
+# ------------------------------------------------------------------------
+# ETags
+# ------------------------------------------------------------------------
+
+def world_etag():
+    """
+    Changes with the world version and with anything else a page can
+    depend on: the URL, posted form values and the user's session,
+    which holds settings such as username and number_format.
+    """
+    epoch, version = world_version(g.game_token)
+    state = json.dumps(
+        [request.full_path, sorted(request.form.items(multi=True)),
+         dict(session)],
+        sort_keys=True, default=str)
+    digest = hashlib.blake2b(state.encode('utf-8'), digest_size=8).hexdigest()
+    return f"{epoch}-{version}-{digest}"
+
+def not_modified():
+    """
+    A 304 response if the client already has this version of the page,
+    otherwise None. Call after any session changes the view makes and
+    before the expensive work. The version is read first, so a commit
+    by another request while this one renders makes the ETag stale
+    rather than the page.
+    """
+    etag = world_etag()
+    g.world_etag = etag
+    # Weak match, since compression marks the ETag weak
+    if request.if_none_match.contains_weak(etag):
+        return current_app.response_class(status=HTTPStatus.NOT_MODIFIED)
+    return None
+
+def init_world_version(app):
+    """
+    Adds ETags to responses from views that called not_modified(), and
+    reads the configuration version for the request.
+    """
+
+    @app.before_request
+    def read_config_version():
+        # Before any queries, so what the request loads is never older
+        # than the version its cached fragments are stored under
+        g.pop('config_versions', None)
+        game_token = session.get('game_token')
+        if game_token and request.endpoint != 'static':
+            g.config_version = current_config_version(game_token)
+
+    @app.after_request
+    def add_world_etag(response):
+        etag = g.pop('world_etag', None)
+        if etag and response.status_code in (
+                HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
+            response.set_etag(etag)
+            # Cache, but check back every time
+            response.headers['Cache-Control'] = 'private, no-cache'
+        return response
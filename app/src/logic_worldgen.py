@@ -0,0 +1,290 @@
+"""
+Synthetic scenarios far larger than the bundled ones, for measuring how
+ticks, navigation and event pages scale with world size.
+
+Output is a scenario dict in the same schema as export_to_dict, so it
+loads through the usual import path. The same seed and counts always
+produce the same world.
+"""
+import random
+from app.models import (
+    HIGHEST_RESERVED_ID, EQUIPMENT_SLOTS_ID, JsonKeys, StorageType)
+
+DEFAULT_COUNTS = {
+    'items': 2000,
+    'recipe_depth': 8,
+    'attribs': 20,
+    'characters': 200,
+    'locations': 40,
+    'grid': 200,
+    'local_piles': 50,
+    'events': 300,
+}
+SLOTS = ['Main Hand', 'Off Hand', 'Body Armor', 'Head', 'Feet']
+PARTIES = ['Heroes', 'Enemies', 'Traders']
+# Fraction of items by storage type; the rest are universal
+LOCAL_SHARE = 0.2
+CARRIED_SHARE = 0.2
+BYPRODUCT_CHANCE = 0.2
+ATTRIB_REQ_CHANCE = 0.15
+CHAIN_CHANCE = 0.4
+# Chained events are picked from this many events after the parent
+CHAIN_SPAN = 10
+
+class WorldGenerator:
+    """Builds one world. IDs are handed out in order, as on export."""
+    def __init__(self, seed=0, **counts):
+        unknown = set(counts) - set(DEFAULT_COUNTS)
+        if unknown:
+            raise ValueError(f"Unknown counts: {sorted(unknown)}")
+        self.counts = {**DEFAULT_COUNTS, **counts}
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.next_id = HIGHEST_RESERVED_ID + 1
+        self.attribs = []
+        self.items = []
+        self.tiers = []  # item dicts by recipe depth
+        self.locations = []
+        self.events = []
+        self.characters = []
+
+    def new_id(self):
+        new_id = self.next_id
+        self.next_id += 1
+        return new_id
+
+    def position(self):
+        grid = self.counts['grid']
+        return [self.rng.randint(1, grid), self.rng.randint(1, grid)]
+
+    # --------------------------------------------------------------------
+    # Entities
+    # --------------------------------------------------------------------
+
+    def make_attribs(self):
+        self.attribs = [
+            {"id": self.new_id(), "name": f"Stat {num}"}
+            for num in range(1, self.counts['attribs'] + 1)]
+
+    def make_items(self):
+        total = self.counts['items']
+        depth = max(1, min(self.counts['recipe_depth'], total))
+        self.tiers = [[] for _ in range(depth)]
+        for num in range(total):
+            tier = num * depth // total
+            item = {"id": self.new_id(), "name": f"Item {num + 1}"}
+            roll = self.rng.random()
+            if roll < LOCAL_SHARE:
+                item['storage_type'] = StorageType.LOCAL
+            elif roll < LOCAL_SHARE + CARRIED_SHARE:
+                item['storage_type'] = StorageType.CARRIED
+                if self.rng.random() < 0.3:
+                    item['slot'] = self.rng.choice(SLOTS)
+            else:
+                item['storage_type'] = StorageType.UNIVERSAL
+            self.tiers[tier].append(item)
+            self.items.append(item)
+        for tier, tier_items in enumerate(self.tiers):
+            for item in tier_items:
+                item['recipes'] = [
+                    self.make_recipe(item, tier)
+                    for _ in range(self.rng.randint(1, 2))]
+
+    def make_recipe(self, item, tier):
+        """Sources always include one item from the tier just below."""
+        rng = self.rng
+        recipe = {
+            "id": self.new_id(),
+            "rate_amount": float(rng.randint(1, 5)),
+            "rate_duration": rng.choice([1, 3, 5, 10, 30]),
+        }
+        if tier > 0:
+            sources = {rng.choice(self.tiers[tier - 1])['id']}
+            for _ in range(rng.randint(0, 2)):
+                sources.add(rng.choice(self.tiers[rng.randrange(tier)])['id'])
+            recipe['sources'] = [
+                {"item_id": source_id,
+                 "q_required": float(rng.randint(1, 4)),
+                 "preserve": rng.random() < 0.1}
+                for source_id in sorted(sources)]
+        if rng.random() < BYPRODUCT_CHANCE:
+            candidates = self.tiers[rng.randrange(tier + 1)]
+            byproduct_ids = {
+                rng.choice(candidates)['id'] for _ in range(rng.randint(1, 2))}
+            byproduct_ids.discard(item['id'])
+            recipe['byproducts'] = [
+                {"item_id": byproduct_id,
+                 "rate_amount": float(rng.randint(1, 3))}
+                for byproduct_id in sorted(byproduct_ids)]
+        if self.attribs and rng.random() < ATTRIB_REQ_CHANCE:
+            recipe['attrib_reqs'] = [{
+                "attrib_id": rng.choice(self.attribs)['id'],
+                "op_compare": ">=",
+                "val_required": float(rng.randint(1, 10)),
+            }]
+        return recipe
+
+    def make_locations(self):
+        rng = self.rng
+        grid = self.counts['grid']
+        local_items = [
+            item for item in self.items
+            if item['storage_type'] == StorageType.LOCAL]
+        for num in range(self.counts['locations']):
+            loc = {
+                "id": self.new_id(),
+                "name": f"Location {num + 1}",
+                "dimensions": [grid, grid],
+                "zones": [],
+                "items": [],
+                "destinations": [],
+            }
+            for _ in range(rng.randint(1, 5)):
+                left, top = self.position()
+                loc['zones'].append({"coords": [
+                    left, top,
+                    min(grid, left + rng.randint(0, grid // 4)),
+                    min(grid, top + rng.randint(0, grid // 4))]})
+            placed = set()
+            for _ in range(self.counts['local_piles'] if local_items else 0):
+                item_id = rng.choice(local_items)['id']
+                position = self.position()
+                if (item_id, *position) in placed:
+                    continue
+                placed.add((item_id, *position))
+                loc['items'].append({
+                    "item_id": item_id,
+                    "quantity": float(rng.randint(1, 20)),
+                    "position": position})
+            self.locations.append(loc)
+        self.connect_locations()
+
+    def connect_locations(self):
+        """A path through every location plus some shortcuts."""
+        pairs = set()
+        for index in range(1, len(self.locations)):
+            pairs.add((index - 1, index))
+        for _ in range(len(self.locations) // 2):
+            first, second = sorted(
+                self.rng.sample(range(len(self.locations)), 2))
+            pairs.add((first, second))
+        for first, second in sorted(pairs):
+            self.locations[first]['destinations'].append({
+                "loc2_id": self.locations[second]['id'],
+                "door1": self.position(),
+                "door2": self.position()})
+
+    def make_events(self):
+        rng = self.rng
+        for num in range(self.counts['events']):
+            event = {
+                "id": self.new_id(),
+                "name": f"Event {num + 1}",
+                "numeric_range": [1, 20],
+                "determinants": [],
+                "effects": [],
+            }
+            if self.attribs:
+                event['determinants'] = [
+                    {"infield": {"attrib_id": rng.choice(self.attribs)['id']},
+                     "op_transform": "/", "val_transform": 3.5}
+                    for _ in range(rng.randint(1, 2))]
+                event['effects'] = [
+                    {"infield": {"attrib_id": rng.choice(self.attribs)['id']},
+                     "outfield": {"attrib_id": rng.choice(self.attribs)['id']},
+                     "outcome_success": "success_any"}
+                    for _ in range(rng.randint(1, 2))]
+            self.events.append(event)
+        # Children always come later, so chains can be long but not loop
+        for index, event in enumerate(self.events):
+            later = self.events[index + 1:index + 1 + CHAIN_SPAN]
+            if not later or rng.random() >= CHAIN_CHANCE:
+                continue
+            children = rng.sample(later, min(len(later), rng.randint(1, 2)))
+            event['chained'] = [
+                {"child_id": child['id'],
+                 "req": {"outcome_success": rng.choice(
+                     ["success_any", "failure_any"])}}
+                for child in sorted(children, key=lambda ev: ev['id'])]
+
+    def make_characters(self):
+        rng = self.rng
+        carried = [
+            item for item in self.items
+            if item['storage_type'] == StorageType.CARRIED]
+        for num in range(self.counts['characters']):
+            char = {
+                "id": self.new_id(),
+                "name": f"Character {num + 1}",
+                "party": rng.choice(PARTIES),
+                "attribs": [
+                    [attrib['id'], float(rng.randint(1, 20))]
+                    for attrib in self.attribs],
+                "abilities": sorted(
+                    ev['id'] for ev in rng.sample(
+                        self.events, min(len(self.events), rng.randint(0, 4)))),
+                "items": [],
+            }
+            if self.locations:
+                char['location_id'] = rng.choice(self.locations)['id']
+                char['position'] = self.position()
+            used_slots = set()
+            for item in rng.sample(
+                    carried, min(len(carried), rng.randint(0, 5))):
+                entry = {
+                    "item_id": item['id'],
+                    "quantity": float(rng.randint(1, 10))}
+                slot = item.get('slot')
+                if slot and slot not in used_slots:
+                    used_slots.add(slot)
+                    entry['slot'] = slot
+                char['items'].append(entry)
+            self.characters.append(char)
+
+    # --------------------------------------------------------------------
+    # Output
+    # --------------------------------------------------------------------
+
+    def generate(self):
+        self.make_attribs()
+        self.make_items()
+        self.make_locations()
+        self.make_events()
+        self.make_characters()
+        slots_attrib = {
+            "id": EQUIPMENT_SLOTS_ID,
+            "name": "Equipment Slots",
+            "enum_list": SLOTS}
+        raw_items = self.tiers[0] if self.tiers else []
+        return {
+            JsonKeys.OVERALL: {
+                "title": f"Generated World {self.seed}",
+                "description": (
+                    "Generated for scaling tests with "
+                    + ", ".join(
+                        f"{key} {value}"
+                        for key, value in self.counts.items()) + "."),
+            },
+            JsonKeys.ENTITIES: {
+                "attribs": [slots_attrib] + self.attribs,
+                "items": self.items,
+                "locations": self.locations,
+                "characters": self.characters,
+                "events": self.events,
+            },
+            JsonKeys.GENERAL: {
+                "piles": [
+                    {"item_id": item['id'], "quantity": 100.0}
+                    for item in raw_items
+                    if item['storage_type'] == StorageType.UNIVERSAL],
+            },
+            "progress": [],
+        }
+
+def generate_world(seed=0, **counts):
+    """
+    Scenario data with DEFAULT_COUNTS, overridden by any counts given.
+    Items are split evenly into recipe_depth tiers, and each recipe uses
+    items from lower tiers, so the recipe graph is that deep.
+    """
+    return WorldGenerator(seed, **counts).generate()
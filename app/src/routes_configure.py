@@ -1,8 +1,8 @@
 from http import HTTPStatus
 import logging
-import re
 from flask import (
-    g, Blueprint, request, flash, redirect, url_for, render_template)
+    g, Blueprint, request, flash, redirect, url_for, render_template,
+    jsonify)
 from sqlalchemy import select, delete, or_
 from app.models import (
     GENERAL_ID, EQUIPMENT_SLOTS_ID, StorageType, ENTITIES, db,
@@ -21,6 +21,8 @@ from app.utils import (
 from .logic_discovery import run_discovery_scan
 from .logic_navigation import all_parties
 from .logic_autobattle import is_autobattle_enabled
+from .logic_mentions import SCENARIO_KEY, get_mention_index
+from .logic_search import search_entities
 
 logger = logging.getLogger(__name__)
 configure_bp = Blueprint('configure', __name__, url_prefix='/configure')
@@ -979,11 +981,15 @@ def lookup(ent_type, id):
 
     if ent_type == Item.TYPENAME:
         # Who has this item
-        piles = Pile.query.filter_by(game_token=game_token, item_id=id).all()
+        rows = db.session.execute(
+            select(Pile, Entity)
+            .join(Entity, (Entity.game_token == Pile.game_token) &
+                          (Entity.id == Pile.owner_id))
+            .where(Pile.game_token == game_token, Pile.item_id == id)
+        ).all()
         key_name = 'Stored At'
         results[key_name] = []
-        for p in piles:
-            owner = db.session.get(Entity, (game_token, p.owner_id))
+        for p, owner in rows:
             label = "" if owner.id == GENERAL_ID \
                 else f"Stored at ({owner.entity_type})"
             results[key_name].append({
@@ -995,12 +1001,18 @@ def lookup(ent_type, id):
         sort_results(results[key_name])
 
         # Recipe dependencies
-        sources = RecipeSource.query.filter_by(game_token=game_token, item_id=id).all()
+        rows = db.session.execute(
+            select(RecipeSource, Item)
+            .join(Recipe, (Recipe.game_token == RecipeSource.game_token) &
+                          (Recipe.id == RecipeSource.recipe_id))
+            .join(Item, (Item.game_token == Recipe.game_token) &
+                        (Item.id == Recipe.product_id))
+            .where(RecipeSource.game_token == game_token,
+                   RecipeSource.item_id == id)
+        ).all()
         key_name = 'Required To Produce'
         results[key_name] = []
-        for s in sources:
-            recipe = db.session.get(Recipe, (game_token, s.recipe_id))
-            prod = db.session.get(Item, (game_token, recipe.product_id))
+        for s, prod in rows:
             results[key_name].append({
                 'name': prod.name,
                 'link': url_for('play.play_item', id=prod.id),
@@ -1010,12 +1022,16 @@ def lookup(ent_type, id):
 
     elif ent_type == Attrib.TYPENAME:
         # Who uses this attribute
-        stmt = select(AttribVal).filter_by(game_token=game_token, attrib_id=id)
-        attrib_vals = db.session.execute(stmt).scalars().all()
+        rows = db.session.execute(
+            select(AttribVal, Entity)
+            .join(Entity, (Entity.game_token == AttribVal.game_token) &
+                          (Entity.id == AttribVal.subject_id))
+            .where(AttribVal.game_token == game_token,
+                   AttribVal.attrib_id == id)
+        ).all()
         key_name = 'Stat of Entities'
         results[key_name] = []
-        for av in attrib_vals:
-            subject = db.session.get(Entity, (game_token, av.subject_id))
+        for av, subject in rows:
             results[key_name].append({
                 'label': subject.entity_type.capitalize(),
                 'name': subject.name,
@@ -1055,9 +1071,12 @@ def lookup(ent_type, id):
         ).all()
         key_name = 'Destinations'
         results[key_name] = []
-        for d in dests:
-            other_id = d.loc2_id if d.loc1_id == id else d.loc1_id
-            other = db.session.get(Location, (game_token, other_id))
+        other_ids = {d.loc2_id if d.loc1_id == id else d.loc1_id for d in dests}
+        others = Location.query.filter(
+            Location.game_token == game_token,
+            Location.id.in_(other_ids)
+        ).all() if other_ids else []
+        for other in others:
             results[key_name].append({
                 'name': other.name,
                 'link': url_for('play.play_location', id=other.id)
@@ -1088,35 +1107,28 @@ def lookup(ent_type, id):
                 })
             sort_results(results[key_name])
 
-    # --- GLOBAL DESCRIPTION SCAN (For Markdown Links) ---
+    # --- DESCRIPTION MENTIONS (For Markdown Links) ---
     # This handles things like [Red Bar Rate](/play/event/46)
     mention_key = 'Mentioned in Descriptions'
-    pattern = f"/{ent_type}/{id}\\b|\\b{re.escape(entity.name)}\\b"
-
-    # Check Scenario description
-    ov = db.session.get(Scenario, game_token)
-    if ov.description and re.search(pattern, ov.description):
-        results.setdefault(mention_key, []).append({
-            'label': 'Scenario Settings',
-            'name': ov.title,
-            'link': url_for('configure.edit_scenario'),
-        })
-
-    # Check all Entity descriptions
-    all_ents = Entity.query.filter_by(game_token=game_token).all()
-    for ent in all_ents:
-        if ent.id == id and ent.entity_type == ent_type:
-            continue # Don't list self
-        if ent.description and re.search(pattern, ent.description):
-            if ent.entity_type == Attrib.TYPENAME:
-                link = url_for('configure.edit_attrib', id=ent.id)
-            else:
-                link = url_for(f'play.play_{ent.entity_type}', id=ent.id)
-            results.setdefault(mention_key, []).append({
-                'label': f'{ent.entity_type.capitalize()} Desc',
-                'name': ent.name,
-                'link': link
-            })
+    mentions = get_mention_index(game_token).find(ent_type, id, entity.name)
+    for (men_type, men_id), men_name in mentions:
+        if (men_type, men_id) == SCENARIO_KEY:
+            usage = {
+                'label': 'Scenario Settings',
+                'link': url_for('configure.edit_scenario'),
+            }
+        elif men_type == Attrib.TYPENAME:
+            usage = {
+                'label': 'Attrib Desc',
+                'link': url_for('configure.edit_attrib', id=men_id),
+            }
+        else:
+            usage = {
+                'label': f'{men_type.capitalize()} Desc',
+                'link': url_for(f'play.play_{men_type}', id=men_id),
+            }
+        results.setdefault(mention_key, []).append(
+            {**usage, 'name': men_name})
     if mention_key in results:
         sort_results(results[mention_key])
 
@@ -1125,6 +1137,40 @@ def lookup(ent_type, id):
         entity=entity,
         results=results)
 
+# ------------------------------------------------------------------------
+# Search
+# ------------------------------------------------------------------------
+
+SEARCH_PAGE_LIMIT = 50
+SEARCH_SUGGEST_LIMIT = 8
+
+def _search_hits(limit):
+    query = request.args.get('q', '').strip()
+    hits = search_entities(query, limit=limit)
+    for hit in hits:
+        hit['link'] = url_for(
+            f"configure.edit_{hit['entity_type']}", id=hit['id'])
+        hit['lookup'] = url_for(
+            'configure.lookup', ent_type=hit['entity_type'], id=hit['id'])
+    return query, hits
+
+@configure_bp.route('/search')
+def search():
+    query, hits = _search_hits(SEARCH_PAGE_LIMIT)
+    return render_template(
+        'configure/search.html',
+        query=query,
+        hits=hits)
+
+@configure_bp.route('/search.json')
+def search_suggest():
+    """Fewer results, for autocomplete as the user types."""
+    _query, hits = _search_hits(SEARCH_SUGGEST_LIMIT)
+    return jsonify([
+        {**hit, 'name_html': str(hit['name_html']),
+         'snippet': str(hit['snippet'])}
+        for hit in hits])
+
 # ------------------------------------------------------------------------
 # Helpers
 # ------------------------------------------------------------------------
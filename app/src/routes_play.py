@@ -1,27 +1,29 @@
 from datetime import datetime, timezone
 from http import HTTPStatus
+import hashlib
+import json
 import logging
 from flask import (
     Blueprint, render_template, request, redirect, jsonify, g, session)
 from sqlalchemy import select, or_, and_
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import aliased, joinedload
 from app.models import (
     db, Entity, Item, Character, Location, Attrib, Event,
     Pile, AttribVal, Recipe, RecipeAttribReq,
     Operation, OutcomeType, SuccessTier, EventFactor, PartyTarget,
     DestExit, LocDest, EventLink, EntityAbility, EventField,
-    Progress, Scenario, AutobattleStage,
+    Progress, Scenario, GameMessage, AutobattleStage, AutobattleField,
     GENERAL_ID, StorageType, Participant)
 from app.utils import (
-    RequestHelper, ContextIds, format_num, parse_coords, LinkLetters,
-    capture_origin, name_stripped, sort_by_name_stripped,
+    RequestHelper, ContextIds, format_num, format_many, parse_coords,
+    LinkLetters, capture_origin, name_stripped, sort_by_name_stripped,
     maskable_name)
 from .logic_piles import transfer_item
 from .logic_event import (
-    roll_for_outcome, roll_for_system_outcome,
-    calculate_determinants, get_chain_results,
-    preview_effects, resolve_effects, is_factor_met,
-    do_effect_change, process_all_auto_effects, format_for_display,
+    roll_for_outcome, roll_for_system_outcome, roll_many,
+    calculate_determinants, run_event_step,
+    preview_effects, filter_candidates,
+    do_effect_change, format_for_display,
     apply_operation)
 from .logic_progress import (
     tick_all_active, start_production, stop_production)
@@ -34,9 +36,11 @@ from .logic_navigation import (
     is_in_grid, blocked_by_local_item, find_nearest_available_pos, is_adjacent,
     get_party_set, is_in_same_party, assign_parties_and_sort)
 from .logic_objectives import validate_requirements
+from .logic_odds import event_odds
 from .logic_autobattle import (
-    run_battle_round, run_battle_reset, get_battle_participants, get_char_stat)
+    run_battle_round, run_battle_reset, resolve_battle, CombatState)
 from .logic_user_interaction import add_message, get_chronicle
+from .logic_world_version import not_modified
 from .presenters import ItemPlayPresenter
 
 logger = logging.getLogger(__name__)
@@ -50,6 +54,12 @@ play_bp = Blueprint('play', __name__)
 def overview():
     game_token = g.game_token
 
+    # Catch up first, since that can change what the page shows
+    tick_all_active()
+    response = not_modified()
+    if response:
+        return response
+
     # Fetch Top-Level Entities
     chars = Character.query.filter_by(
         game_token=game_token, toplevel=True).order_by(name_stripped()).all()
@@ -61,7 +71,6 @@ def overview():
         game_token=game_token, toplevel=True).order_by(name_stripped()).all()
 
     # Items currently being produced
-    tick_all_active()
     items_in_production = {
         p.product_id for p in Progress.query.filter_by(
             game_token=game_token
@@ -86,9 +95,107 @@ def overview():
         win_reqs=enriched_win_reqs,
         all_requirements_met=all_met,
         link_letters=LinkLetters(excluded='u'),
-        messages=messages
+        messages=messages,
+        layout=_overview_layout(game_token)
     )
 
+def _overview_layout(game_token):
+    """
+    Fingerprint of what the overview lays out rather than counts: pinned
+    entities, their names and where key characters are. The client
+    reloads the whole page when this changes.
+    """
+    char_loc = aliased(Location, flat=True)
+    chars = db.session.execute(
+        select(Character.id, Character.name, char_loc.name)
+        .outerjoin(char_loc, and_(
+            char_loc.game_token == Character.game_token,
+            char_loc.id == Character.location_id))
+        .where(Character.game_token == game_token,
+               Character.toplevel.is_(True))
+        .order_by(Character.id)).all()
+    pinned = [
+        db.session.execute(
+            select(model.id, model.name, model.masked)
+            .where(model.game_token == game_token, model.toplevel.is_(True))
+            .order_by(model.id)).all()
+        for model in (Location, Item)]
+    scenario = db.session.get(Scenario, game_token)
+    state = json.dumps([
+        [list(row) for row in rows] for rows in [chars, *pinned]] + (
+        [scenario.title, scenario.description] if scenario else []))
+    return hashlib.blake2b(state.encode('utf-8'), digest_size=8).hexdigest()
+
+@play_bp.route('/overview/delta')
+def overview_delta():
+    """
+    The parts of the overview that change while it stays open, for
+    refreshing it without a reload.
+    - since: id of the newest log message the page shows
+    """
+    game_token = g.game_token
+    tick_all_active()
+    response = not_modified()
+    if response:
+        return response
+    since = RequestHelper('args').get_int('since', None)
+
+    rows = db.session.execute(
+        select(Item.id, Pile.quantity)
+        .outerjoin(Pile, and_(
+            Pile.game_token == Item.game_token,
+            Pile.item_id == Item.id,
+            Pile.owner_id == GENERAL_ID))
+        .where(Item.game_token == game_token, Item.toplevel.is_(True))
+    ).all()
+    in_production = set(db.session.scalars(
+        select(Progress.product_id).where(Progress.game_token == game_token)))
+    quantities = format_many(
+        (qty or 0 for _id, qty in rows), g.get('number_format', 'en_US'))
+
+    scenario = db.session.get(Scenario, game_token)
+    win_reqs, all_met = validate_requirements(scenario)
+
+    # The newest message shown may since have been dropped by the cap
+    newest = db.session.get(GameMessage, since) if since else None
+    log_replaced = newest is None or newest.game_token != game_token
+    messages = get_chronicle() if log_replaced else get_chronicle(
+        since=since)
+
+    return jsonify({
+        "layout": _overview_layout(game_token),
+        "items": [
+            {"id": item_id, "quantity": qty_text,
+             "producing": item_id in in_production}
+            for (item_id, _qty), qty_text in zip(rows, quantities)],
+        "win_reqs": win_reqs,
+        "all_met": all_met,
+        "log": [{
+            "id": m.id,
+            "time": m.timestamp.strftime('%H:%M'),
+            "text": m.message,
+            "count": m.count
+        } for m in messages],
+        "log_replaced": log_replaced,
+    })
+
+@play_bp.route('/play/chronicle')
+def chronicle():
+    """Older log history, paged by the id of the oldest shown message."""
+    req = RequestHelper('args')
+    before = req.get_int('before', None)
+    limit = max(1, min(req.get_int('limit', 50), 200))
+    messages = get_chronicle(limit, before=before)
+    return jsonify({
+        "log": [{
+            "id": m.id,
+            "time": m.timestamp.strftime('%H:%M'),
+            "text": m.message,
+            "count": m.count
+        } for m in messages],
+        "has_more": len(messages) == limit
+    })
+
 # ------------------------------------------------------------------------
 # Location & Character Routes
 # ------------------------------------------------------------------------
@@ -175,6 +282,10 @@ def play_location(id):
                 game_token=game_token, owner_id=id
             ).all()
 
+    response = not_modified()
+    if response:
+        return response
+
     # 3. Fetch Exits In Grid
     stmt = (
         select(LocDest)
@@ -270,6 +381,9 @@ def play_character(id):
     session['old_char_id'] = id
     session['grid_driver_id'] = id
     session.pop('old_loc_id', None)
+    response = not_modified()
+    if response:
+        return response
 
     # Identify other party members at this location
     party_members = []
@@ -555,6 +669,9 @@ def sync_session():
 @play_bp.route('/play/item/<int:id>')
 def play_item(id):
     presenter = ItemPlayPresenter(id, RequestHelper('args'))
+    response = not_modified()
+    if response:
+        return response
     return render_template(
         'play/item.html',
         **presenter.get_template_context())
@@ -587,6 +704,9 @@ def item_production_status(item_id, owner_id):
 
     # 1. Tick the world
     tick_all_active()
+    response = not_modified()
+    if response:
+        return response
 
     # 2. Gather data for the specific pile we are viewing
     main_item = db.session.get(Item, (game_token, item_id))
@@ -636,7 +756,7 @@ def item_production_status(item_id, owner_id):
             host_id, r, ctx)
         for res in resolved:
             s_item = res['item']
-            source_quantities[s_item.id] = format_num(res['total_available'])
+            source_quantities[s_item.id] = res['total_available']
 
         # Collect attribute values used in these recipes
         for req_attr in r.attrib_reqs:
@@ -649,9 +769,13 @@ def item_production_status(item_id, owner_id):
                     attrib_data.append({
                         "attrib_id": av.attrib_id,
                         "subject_id": av.subject_id,
-                        "value": format_num(av.value)
+                        "value": av.value
                     })
 
+    for attr, value in zip(
+            attrib_data, format_many(a['value'] for a in attrib_data)):
+        attr['value'] = value
+
     # 5. Gather "used to produce" data
     # Assume same owner/context as current page.
     used_for_data = []
@@ -677,7 +801,9 @@ def item_production_status(item_id, owner_id):
         },
         "sources": [
             {"id": sid, "quantity": sqty}
-            for sid, sqty in source_quantities.items()],
+            for sid, sqty in zip(
+                source_quantities,
+                format_many(source_quantities.values()))],
         "used_for": used_for_data,
         "attribs": attrib_data,
         "recipes": recipe_data,
@@ -984,16 +1110,9 @@ def play_event(id):
         factors = [
             f for f in event.factors
             if f.infield and f.infield.role == role]
-        cand_failures = {}
-        for ent in role_candidates:
-            fails = [
-                f for f in factors
-                if not is_factor_met(
-                    f, ent, subject_id=subject_id,
-                    require_comparison=(f.usage_type == Participant.DET)
-                )
-            ]
-            cand_failures[ent] = fails
+        cand_failures = filter_candidates(
+            factors, role_candidates, subject_id=subject_id,
+            require_comparison=lambda f: f.usage_type == Participant.DET)
 
         eligible = {ent for ent, fails in cand_failures.items() if not fails}
         if eligible:
@@ -1134,6 +1253,29 @@ def event_preview(id):
         "effect_previews": effect_previews
     })
 
+@play_bp.route('/event/odds/<int:id>', methods=['POST'])
+def event_odds_preview(id):
+    """Outcome distribution for the current selections.
+    Read-only: nothing is rolled, logged or saved.
+    """
+    game_token = g.game_token
+    event = db.get_or_404(Event, (game_token, id))
+    req = RequestHelper('form')
+
+    role_entities = {}
+    for key in req:
+        if key.endswith(Participant.ROLE_SUFFIX):
+            role_name = Participant.formkey_to_role(key)
+            role_entities[role_name] = req.get_int(key)
+
+    odds = event_odds(
+        event, role_entities,
+        difficulty=req.get_float('difficulty', 0.55),
+        num_dice=req.get_int('num_dice', 1),
+        sides=req.get_int('sides', 20),
+        bonus=req.get_int('bonus', 0))
+    return jsonify(odds)
+
 @play_bp.route('/event/roll/<int:id>', methods=['POST'])
 def roll_event(id):
     game_token = g.game_token
@@ -1157,14 +1299,10 @@ def roll_event(id):
         result_val, result_str, tier = roll_for_outcome(
             id, role_entities, difficulty)
 
-    resolved_effects, ledger = resolve_effects(
+    resolved_effects, _ledger, chain_results = run_event_step(
         event, role_entities, result_val, tier)
-    process_all_auto_effects(event, role_entities, result_val, tier)
     db.session.commit()
 
-    chain_results = get_chain_results(
-        event, role_entities, result_val, tier, ledger)
-
     return jsonify({
         "result_value": result_val,
         "result_val_display": format_for_display(result_val),
@@ -1174,6 +1312,39 @@ def roll_event(id):
         "resolved_effects": resolved_effects
     })
 
+@play_bp.route('/event/roll-many/<int:id>', methods=['POST'])
+def roll_event_many(id):
+    """Roll the same event several times and save the net result once."""
+    game_token = g.game_token
+    event = db.get_or_404(Event, (game_token, id))
+    req = RequestHelper('form')
+    if event.outcome_type == OutcomeType.COORDS:
+        return jsonify({"message": "Coordinate events roll one at a time."}), \
+            HTTPStatus.BAD_REQUEST
+
+    role_entities = {}
+    for key in req:
+        if key.endswith(Participant.ROLE_SUFFIX):
+            role_name = Participant.formkey_to_role(key)
+            role_entities[role_name] = req.get_int(key)
+
+    rolls, summary = roll_many(
+        event, role_entities, req.get_int('count', 10),
+        difficulty=req.get_float('difficulty', 0.55),
+        num_dice=req.get_int('num_dice', 1),
+        sides=req.get_int('sides', 20),
+        bonus=req.get_int('bonus', 0))
+    if not rolls:
+        db.session.rollback()
+        return jsonify({"message": summary}), HTTPStatus.BAD_REQUEST
+    db.session.commit()
+
+    return jsonify({
+        "count": len(rolls),
+        "rolls": rolls,
+        "summary": summary
+    })
+
 @play_bp.route('/event/apply-effect/<int:factor_id>', methods=['POST'])
 def apply_single_effect(factor_id):
     req = RequestHelper('form')
@@ -1203,90 +1374,109 @@ def play_autobattle(loc_id):
     capture_origin(name=location.name)
     session['old_loc_id'] = loc_id
 
-    parties = get_battle_participants(loc_id)
+    state = CombatState(loc_id)
+    parties = state.parties
 
     # Enrich the character objects with HP for the template
-    for _party_name, members in parties.items():
-        for c in members:
-            c.hp = get_char_stat(c, 'hp')
-            c.max_hp = get_char_stat(c, 'max_hp')
+    for c in state.chars:
+        c.hp = state.hp(c)
+        c.max_hp = state.stat(c, AutobattleField.MAX_HP)
 
     return render_template(
         'play/autobattle.html',
         location=location,
         parties=parties,
         messages=get_chronicle(12),
-        link_letters=LinkLetters(excluded='ouesr'),
+        link_letters=LinkLetters(excluded='ouesrf'),
         AutobattleStage=AutobattleStage
     )
 
-@play_bp.route('/play/autobattle/<int:loc_id>/step', methods=['POST'])
-def autobattle_step(loc_id):
-    # 1. Run the round logic
-    success, _msg = run_battle_round(loc_id)
-
-    # 2. Fetch the latest state
-    parties = get_battle_participants(loc_id)
+def _battle_stats(summary):
+    """char_stats for the client and the parties still standing."""
     char_stats = {}
     active_parties = []
-
-    for party_name, members in parties.items():
-        alive_in_party = 0
-        for c in members:
-            hp = get_char_stat(c, 'hp')
-            max_hp = get_char_stat(c, 'max_hp')
-            char_stats[c.id] = {
-                "hp": format_num(hp),
-                "max_hp": format_num(max_hp),
-                "is_dead": hp <= 0
-            }
-            if hp >= 1:
-                alive_in_party += 1
-        if alive_in_party > 0:
+    hp_texts = format_many(row[2] for row in summary)
+    max_hp_texts = format_many(row[3] for row in summary)
+    for (char_id, party_name, hp, _max_hp), hp_text, max_hp_text in zip(
+            summary, hp_texts, max_hp_texts):
+        char_stats[char_id] = {
+            "hp": hp_text,
+            "max_hp": max_hp_text,
+            "is_dead": hp <= 0
+        }
+        if hp >= 1 and party_name not in active_parties:
             active_parties.append(party_name)
+    return char_stats, active_parties
 
-    battle_continues = len(active_parties) > 1
-    if not battle_continues:
-        if len(active_parties) == 1:
-            pname = active_parties[0]
-            s = '' if pname[-1:] == 's' else 's'
-            add_message(
-                f"-- {pname} Win{s} Round --",
-                group_duplicates=False, commit=True)
-
-    # 3. Fetch recent messages formatted for the log
-    messages = [{
+def _announce_winner(active_parties):
+    if len(active_parties) == 1:
+        pname = active_parties[0]
+        s = '' if pname[-1:] == 's' else 's'
+        add_message(
+            f"-- {pname} Win{s} Round --",
+            group_duplicates=False, commit=True)
+
+def _battle_log():
+    """Recent messages formatted for the log."""
+    return [{
+        "id": m.id,
         "time": m.timestamp.strftime('%H:%M'),
         "text": m.message,
         "count": m.count
     } for m in get_chronicle(12)]
 
+@play_bp.route('/play/autobattle/<int:loc_id>/step', methods=['POST'])
+def autobattle_step(loc_id):
+    # 1. Run the round logic
+    state = CombatState(loc_id)
+    success, _msg = run_battle_round(loc_id, state)
+
+    # 2. Read the state as it was saved
+    char_stats, active_parties = _battle_stats(state.summary)
+    battle_continues = len(active_parties) > 1
+    if not battle_continues:
+        _announce_winner(active_parties)
+
     return jsonify({
         "success": success,
         "char_stats": char_stats,
         "battle_continues": battle_continues,
-        "log": messages
+        "log": _battle_log()
+    })
+
+@play_bp.route('/play/autobattle/<int:loc_id>/resolve', methods=['POST'])
+def autobattle_resolve(loc_id):
+    """Fights every round at once and saves the result in one commit.
+    The client replays the returned HP timeline.
+    """
+    state = CombatState(loc_id)
+    timeline = resolve_battle(loc_id, state=state)
+    if not timeline:
+        state.snapshot()
+
+    char_stats, active_parties = _battle_stats(state.summary)
+    battle_continues = len(active_parties) > 1
+    if not battle_continues:
+        _announce_winner(active_parties)
+    db.session.commit()
+
+    return jsonify({
+        "rounds": len(timeline),
+        "timeline": [_battle_stats(summary)[0] for summary in timeline],
+        "char_stats": char_stats,
+        "battle_continues": battle_continues,
+        "chains": state.chains.to_dict(),
+        "log": _battle_log()
     })
 
 @play_bp.route('/play/autobattle/<int:loc_id>/reset', methods=['POST'])
 def autobattle_reset(loc_id):
-    run_battle_reset(loc_id)
+    state = CombatState(loc_id)
+    run_battle_reset(loc_id, state)
 
     # Return fresh stats so the UI updates (e.g., health bars fill back up)
-    parties = get_battle_participants(loc_id)
-    char_stats = {}
-    for _party_name, members in parties.items():
-        for c in members:
-            hp = get_char_stat(c, 'hp')
-            max_hp = get_char_stat(c, 'max_hp')
-            char_stats[c.id] = {
-                "hp": format_num(hp),
-                "max_hp": format_num(max_hp),
-                "is_dead": hp <= 0
-            }
-
+    char_stats, _active_parties = _battle_stats(state.summary)
     return jsonify({
         "char_stats": char_stats,
-        "log": [{"time": m.timestamp.strftime('%H:%M'), "text": m.message, "count": m.count}
-                for m in get_chronicle(12)]
+        "log": _battle_log()
     })
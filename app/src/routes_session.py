@@ -18,6 +18,13 @@ from app.serialization import (
 from app.utils import RequestHelper, LinkLetters, BaseFieldMap, redirect_back
 from .logic_user_interaction import (
     generate_username, log_activity, run_purge, get_token_statuses)
+from .logic_query_stats import (
+    endpoint_summary, clear_query_history, REPEAT_THRESHOLD)
+from .logic_metrics import render_metrics
+from .logic_profiling import (
+    is_profile_admin, matches_profile_key, profile_key, list_profiles,
+    profile_path,
+    top_functions, PROFILE_COOKIE)
 
 logger = logging.getLogger(__name__)
 session_bp = Blueprint('session', __name__)
@@ -380,6 +387,16 @@ def maintenance_purge():
     db.session.commit()
     return jsonify(status='purged', tokens_purged=tokens_purged), 200
 
+@session_bp.route('/metrics')
+def metrics():
+    """Prometheus scrape target. Set METRICS_AUTH_TOKEN to require it."""
+    expected = os.environ.get('METRICS_AUTH_TOKEN')
+    if expected and request.headers.get('Authorization', '') \
+            != f'Bearer {expected}':
+        abort(HTTPStatus.NOT_FOUND)
+    return current_app.response_class(
+        render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @session_bp.route('/session/maintenance_log')
 def maintenance_log_page():
     token_statuses = get_token_statuses()
@@ -394,3 +411,72 @@ def maintenance_log_page():
         token_statuses=token_statuses,
         recent_logs=recent_logs,
     )
+
+@session_bp.route('/session/query-stats', methods=['GET', 'POST'])
+def query_stats_page():
+    if request.method == 'POST':
+        # Clears it for everyone, so only the admin may
+        if not is_profile_admin():
+            abort(HTTPStatus.FORBIDDEN)
+        clear_query_history()
+        return redirect(url_for('session.query_stats_page'))
+    return render_template(
+        'session/query_stats.html',
+        enabled=current_app.config['QUERY_STATS'],
+        rows=endpoint_summary(),
+        repeat_threshold=REPEAT_THRESHOLD,
+        can_clear=is_profile_admin(),
+    )
+
+@session_bp.route('/session/profiles', methods=['GET', 'POST'])
+def profiles_page():
+    if not profile_key():
+        abort(HTTPStatus.NOT_FOUND)
+    if request.method == 'POST':
+        key = request.form.get('key', '')
+        if not matches_profile_key(key):
+            abort(HTTPStatus.FORBIDDEN)
+        # Remember the admin, which also profiles this browser's requests
+        response = redirect(url_for('session.profiles_page'))
+        response.set_cookie(
+            PROFILE_COOKIE, key, httponly=True, samesite='Lax')
+        return response
+    if not is_profile_admin():
+        return render_template('session/profiles_login.html')
+    return render_template(
+        'session/profiles.html',
+        profiles=list_profiles(),
+        profiling=matches_profile_key(request.cookies.get(PROFILE_COOKIE)),
+    )
+
+@session_bp.route('/session/profiles/stop', methods=['POST'])
+def profiles_stop():
+    response = redirect(url_for('play.overview'))
+    response.delete_cookie(PROFILE_COOKIE)
+    return response
+
+@session_bp.route('/session/profiles/<filename>')
+def profile_view(filename):
+    if not is_profile_admin():
+        abort(HTTPStatus.NOT_FOUND)
+    path = profile_path(filename)
+    if not path:
+        abort(HTTPStatus.NOT_FOUND)
+    focus = request.args.get('focus', '').strip()
+    total, rows = top_functions(path, focus=focus or None)
+    return render_template(
+        'session/profile.html',
+        filename=filename,
+        focus=focus,
+        total=total,
+        rows=rows,
+    )
+
+@session_bp.route('/session/profiles/<filename>/download')
+def profile_download(filename):
+    if not is_profile_admin():
+        abort(HTTPStatus.NOT_FOUND)
+    path = profile_path(filename)
+    if not path:
+        abort(HTTPStatus.NOT_FOUND)
+    return send_file(path, as_attachment=True, download_name=filename)
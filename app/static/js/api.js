@@ -1,23 +1,34 @@
 
+/**
+ * Returned instead of data when the server answers 304 Not Modified.
+ */
+const NOT_MODIFIED = Object.freeze({ notModified: true });
+
 /**
  * Wrapper GET method
  */
-async function apiGet(url, errorContext) {
+async function apiGet(url, errorContext, etag) {
     const options = { method: 'GET' };
     if (errorContext) {
         options.errorContext = errorContext;
     }
+    if (etag) {
+        options.etag = etag;
+    }
     return apiRequest(url, options);
 }
 
 /**
  * Wrapper POST method
  */
-async function apiPost(url, body, errorContext) {
+async function apiPost(url, body, errorContext, etag) {
     const options = { method: 'POST', body };
     if (errorContext) {
         options.errorContext = errorContext;
     }
+    if (etag) {
+        options.etag = etag;
+    }
     return apiRequest(url, options);
 }
 
@@ -28,21 +39,27 @@ async function apiPost(url, body, errorContext) {
  * @param {string} method - 'GET', 'POST', etc.
  * @param {FormData|object|null} body - Data to send (for POST/PUT).
  * @param {string} errorContext - Custom prefix for error messages.
+ * @param {object|null} etag - Holds the last ETag in its value. It is sent
+ *     as If-None-Match, and NOT_MODIFIED is returned if it still matches.
  */
 async function apiRequest(
         url, {
             method = 'GET',
             body = null,
-            errorContext = "Request failed"
+            errorContext = "Request failed",
+            etag = null
         } = {})
 {
-    const options = { method };
+    const options = { method, headers: {} };
+    if (etag && etag.value) {
+        options.headers['If-None-Match'] = etag.value;
+    }
 
     if (body) {
         if (body instanceof FormData) {
             options.body = body;
         } else {
-            options.headers = { 'Content-Type': 'application/json' };
+            options.headers['Content-Type'] = 'application/json';
             options.body = JSON.stringify(body);
         }
     }
@@ -50,6 +67,8 @@ async function apiRequest(
     try {
         const res = await fetch(url, options);
         if (window.isUnloading) return null;
+        if (res.status === 304) return NOT_MODIFIED;
+        if (etag) etag.value = res.headers.get("ETag");
         const contentType = res.headers.get("content-type");
         const got_json = (contentType && contentType.includes("application/json"));
 
@@ -0,0 +1,80 @@
+/**
+ * Build one log entry. Text is set rather than parsed as HTML, since
+ * it can hold names from an uploaded scenario.
+ *
+ * @param {object} m - An entry from the server.
+ * @param {string} className - Classes for the entry.
+ * @returns {HTMLElement}
+ */
+function buildLogEntry(m, className) {
+    const entry = document.createElement('div');
+    entry.className = className;
+    entry.dataset.id = m.id;
+    const time = document.createElement('span');
+    time.className = 'label-like';
+    time.textContent = `[${m.time}]`;
+    entry.append(time, ` ${m.text} `);
+    if (m.count > 1) {
+        const count = document.createElement('span');
+        count.className = 'count';
+        count.textContent = `x${m.count}`;
+        entry.append(count);
+    }
+    return entry;
+}
+
+/**
+ * Add new game log entries at the bottom. An entry already shown with
+ * the same id is removed first, since grouping a duplicate moves it
+ * to the newest place with its new count.
+ *
+ * @param {HTMLElement} logEl - The scrollable log container.
+ * @param {Array} messages - Entries from the server, oldest first.
+ * @param {boolean} replace - Clear the log first.
+ */
+function appendLogEntries(logEl, messages, replace) {
+    if (!logEl) return;
+    const atBottom = (
+        logEl.scrollHeight - logEl.scrollTop - logEl.clientHeight < 5);
+    if (replace) logEl.replaceChildren();
+
+    messages.forEach(m => {
+        const old = logEl.querySelector(`.log-entry[data-id="${m.id}"]`);
+        if (old) old.remove();
+        logEl.append(buildLogEntry(m, 'log-entry'));
+    });
+    if (atBottom) logEl.scrollTop = logEl.scrollHeight;
+}
+
+/**
+ * Lazily load older game log entries above the current ones.
+ *
+ * @param {HTMLElement} logEl - The scrollable log container.
+ * @param {string} url - The chronicle endpoint.
+ * @param {HTMLElement} moreLink - Link that triggers loading; hidden
+ *     when there is no more history.
+ */
+function initOlderHistory(logEl, url, moreLink) {
+    if (!logEl || !moreLink) return;
+
+    moreLink.addEventListener('click', async (e) => {
+        e.preventDefault();
+        const first = logEl.querySelector('.log-entry[data-id]');
+        const params = new URLSearchParams();
+        if (first) params.set('before', first.dataset.id);
+
+        const data = await apiGet(`${url}?${params}`, "Could not load history");
+        if (!data || !data.log) return;
+
+        // Skip any grouped since they were shown at the bottom
+        const older = data.log.filter(m =>
+            !logEl.querySelector(`.log-entry[data-id="${m.id}"]`));
+        const oldHeight = logEl.scrollHeight;
+        logEl.prepend(...older.map(
+            m => buildLogEntry(m, 'log-entry text-dim')));
+
+        // Keep the entries the user was reading in place
+        logEl.scrollTop += logEl.scrollHeight - oldHeight;
+        if (!data.has_more) moreLink.classList.add('hidden');
+    });
+}
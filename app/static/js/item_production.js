@@ -0,0 +1,233 @@
+/**
+ * Production controls on the item page: the progress bar animation,
+ * start/stop/gain requests and the batch quantity fields.
+ * Uses ownerId, charId, locId, serverTimeOffset and updateStatus()
+ * from the inline script on the page.
+ */
+
+let animationFrameId = null; 
+let isWaitingForServer = false;
+
+function animateProgress(recipeId, serverStart, durationSec) {
+    // If a loop is already running, don't start a second one
+    if (animationFrameId) return;
+
+    const progBar = document.getElementById(`prog-bar-${recipeId}`);
+    const progLabel = document.getElementById(`prog-label-${recipeId}`);
+    const startTimeMs = new Date(serverStart).getTime();
+    const durationMs = durationSec * 1000;
+
+    function frame() {
+        const now = Date.now() + serverTimeOffset;
+        const elapsedMs = now - startTimeMs;
+        
+        const elapsedInCurrentBatch = elapsedMs % durationMs;
+        let percent = Math.max(0, (elapsedInCurrentBatch / durationMs) * 100);
+        percent = Math.min(percent, 100);
+
+        if (percent >= 99) {
+            percent = 100
+            isWaitingForServer = true;
+        }
+
+        if (progBar) progBar.value = percent;
+        if (progLabel) {
+            if (percent == 100) {
+                progLabel.innerHTML = '<span style="margin-left: 10px;">+</span>';
+            } else {
+                progLabel.innerText = `${Math.floor(percent)}%`;
+            }
+        }
+
+        if (!isWaitingForServer) {
+            animationFrameId = requestAnimationFrame(frame);
+        } else {
+            animationFrameId = null; 
+        }
+    }
+
+    // Reset the flag and clear old loops whenever we start a fresh animation
+    if (animationFrameId) cancelAnimationFrame(animationFrameId);
+    isWaitingForServer = false; 
+    animationFrameId = requestAnimationFrame(frame);
+}
+
+// Production
+
+async function startProd(recipeId, targetHostId) {
+    const fd = new FormData();
+    fd.append('recipe_id', recipeId);
+    fd.append('owner_id', ownerId);
+    fd.append('char_id', charId);
+    fd.append('loc_id', locId);
+    const urlParams = new URLSearchParams(window.location.search);
+    const pos = urlParams.get('pos');
+    if (pos) fd.append('pos', pos);
+
+    const batchesStopInput = document.getElementById(`batches-stop-${recipeId}`);
+    if (batchesStopInput && batchesStopInput.value !== '') {
+        const batches = parseFloat(batchesStopInput.value);
+        const netChange = parseFloat(batchesStopInput.dataset.netChange) || 1;
+        const currentQty = parseFloat(
+            document.getElementById('main-qty-display')?.textContent.replace(/,/g, '')) || 0;
+        const stopAt = currentQty + batches * netChange;
+        fd.append('stop_at', stopAt);
+    }
+
+    const url = `/production/start/host/${targetHostId}`;
+    const data = await apiPost(url, fd, "Could not start.");
+    if (!data) return;
+
+    // Trigger update immediately so buttons flip without delay
+    updateStatus();
+}
+
+async function stopProd(targetHostId, productId) {
+    const url = `/production/stop/host/${targetHostId}/item/${productId}`;
+    const data = await apiPost(url, null, "Could not stop properly.");
+    if (!data) return;
+
+    // Trigger update immediately so buttons flip without delay
+    updateStatus();
+    document.querySelectorAll('input[id^="stop-at-input-"]').forEach(input => {
+        input.value = "";
+    });
+}
+
+async function gainItem(recipeId, targetHostId) {
+    // Instant gain (one-off execution)
+    const batchInput = document.getElementById(`instant-batches-${recipeId}`);
+    const batches = batchInput ? batchInput.value : 1;
+    const fd = new FormData();
+    fd.append('owner_id', ownerId);
+    fd.append('recipe_id', recipeId);
+    fd.append('batches', batches);
+    const urlParams = new URLSearchParams(window.location.search);
+    const pos = urlParams.get('pos');
+    if (pos) fd.append('pos', pos);
+
+    const url = `/production/instant/host/${targetHostId}`;
+    const data = await apiPost(url, fd, "Could not gain.");
+    if (!data) return;
+
+    // Get new values immediately
+    updateStatus();
+}
+
+// Quantity fields
+
+function refreshQuantities() {
+    const pending = JSON.parse(sessionStorage.getItem('pendingQty'));
+    if (!pending) return;
+
+    if (pending.targetId.startsWith('instant-batches-')) {
+        const recipeId = pending.targetId.replace('instant-batches-', '');
+        // Re-apply the logic (Max/Half/1) based on the new dataset.max
+        if (pending.ratioType !== 'custom') {
+            setBatchQty(recipeId, pending.ratioType);
+        }
+    } else if (pending.targetId === 'action-qty') {
+        if (pending.ratioType !== 'custom') {
+            setActionQty(pending.ratioType);
+        }
+    }
+}
+
+(function() {
+    const saved = sessionStorage.getItem('pendingQty');
+    if (saved) {
+        try {
+            const data = JSON.parse(saved);
+            window.addEventListener('DOMContentLoaded', () => {
+                const target = document.getElementById(data.targetId);
+                if (target) {
+                    // Use lastValue, which is what applyQtyUpdate now saves
+                    target.value = data.lastValue || 1;
+                }
+                // Only remove if we actually found a target to apply it to
+                sessionStorage.removeItem('pendingQty');
+            });
+        } catch (e) {
+            sessionStorage.removeItem('pendingQty');
+        }
+    }
+    // DEFAULT BEHAVIOR: If no intent is saved, set all batch inputs to 'max'
+    else {
+        document.querySelectorAll('input[id^="instant-batches-"]').forEach(input => {
+            const recipeId = input.id.replace('instant-batches-', '');
+            const maxVal = input.dataset.max || input.getAttribute('max') || 1;
+            
+            // This "seeds" the session so updateStatus() follows it immediately
+            sessionStorage.setItem('pendingQty', JSON.stringify({
+                targetId: input.id,
+                ratioType: 'max',
+                lastValue: maxVal
+            }));
+            
+            input.value = maxVal;
+        });
+    }
+})();
+
+function applyQtyUpdate(inputId, value, ratioType = 'custom') {
+    const input = document.getElementById(inputId);
+    if (!input) return;
+
+    input.value = value;
+    
+    // Save the intent (ratioType) and the target
+    sessionStorage.setItem('pendingQty', JSON.stringify({
+        targetId: inputId,
+        ratioType: ratioType, // '1', 'half', 'max', or 'custom'
+        lastValue: value
+    }));
+}
+
+function setBatchQty(recipeId, type) {
+    // Check if we received the full string "instant-batches-123" or just "123"
+    const idOnly = recipeId.toString().replace('instant-batches-', '');
+    const inputId = `instant-batches-${idOnly}`;
+    const input = document.getElementById(inputId);
+    if (!input) return;
+
+    // Fallback chain: data-max -> attribute max -> 0
+    const max = parseInt(input.dataset.max) || parseInt(input.getAttribute('max')) || 0;
+    let finalVal = 1;
+
+    if (type === 'max') {
+        finalVal = max;
+    } else if (type === 'half') {
+        finalVal = Math.floor(max / 2);
+    } else if (type === '1') {
+        finalVal = 1;
+    } else {
+        finalVal = parseInt(type) || 1;
+        type = 'custom';
+    }
+
+    // Ensure we don't return NaN or values below 1 (if max > 0)
+    finalVal = max > 0 ? Math.min(max, Math.max(1, finalVal)) : 0;
+    
+    applyQtyUpdate(inputId, finalVal, type);
+}
+
+function setActionQty(type) {
+    const inputId = 'action-qty';
+    const el = document.getElementById('main-qty-display'); // Where the raw number lives
+    if (!el) return;
+
+    const max = parseFloat(el.textContent.replace(/,/g, '')) || 0;
+    let finalVal = 1;
+
+    if (type === 'max') {
+        finalVal = max;
+    } else if (type === 'half') {
+        finalVal = max / 2;
+    } else if (type === '1') {
+        finalVal = 1;
+    }
+
+    applyQtyUpdate(inputId, finalVal, type);
+}
+
+const getActionQty = () => document.getElementById('action-qty')?.value || 0;
@@ -0,0 +1,70 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_assets
+"""
+import gzip
+import os
+import unittest
+from flask import url_for
+from app.src.logic_assets import IMMUTABLE
+from .testing_utils import BaseTestCase
+
+class TestAssets(BaseTestCase):
+
+    def read_static(self, filename):
+        with open(os.path.join(self.app.static_folder, filename), 'rb') as f:
+            return f.read()
+
+    def test_fingerprinted_gzip(self):
+        with self.app.test_request_context():
+            url = url_for('static', filename='css/styles.css')
+        self.assertRegex(url, r'^/static/css/styles\.css\?v=[0-9a-f]{16}$')
+
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(
+            gzip.decompress(response.get_data()),
+            self.read_static('css/styles.css'))
+
+        again = self.client.get(url, headers={
+            'Accept-Encoding': 'gzip',
+            'If-None-Match': response.headers['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+    def test_refused_encoding(self):
+        response = self.client.get(
+            '/static/css/styles.css',
+            headers={'Accept-Encoding': 'gzip;q=0, identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        response.close()
+
+    def test_debug_serves_files_from_disk(self):
+        self.app.debug = True
+        self.addCleanup(setattr, self.app, 'debug', False)
+        with self.app.test_request_context():
+            url = url_for('static', filename='css/styles.css')
+        self.assertEqual(url, '/static/css/styles.css')
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        # Sent by Flask rather than from the startup snapshot
+        self.assertNotIn('-gzip', response.headers['ETag'])
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        response.close()
+
+    def test_plain_without_fingerprint(self):
+        response = self.client.get('/static/js/api.js')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(response.get_data(), self.read_static('js/api.js'))
+        response.close()
+
+    def test_stale_fingerprint_not_immutable(self):
+        response = self.client.get(
+            '/static/js/api.js?v=0000000000000000',
+            headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(self.client.get('/static/none.js').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
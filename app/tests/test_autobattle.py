@@ -0,0 +1,120 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_autobattle
+"""
+import unittest
+from app.models import (
+    db, Attrib, AttribVal, Character, Location, Event, EventFactor,
+    EventField, EntityAbility, AutobattleField, AutobattleStage, Operation,
+    OutcomeType, Participant)
+from app.src.logic_autobattle import CombatState, run_battle_round
+from app.src.logic_event import clear_event_plans
+from app.src.logic_simulation import simulate_battle, BattleStats
+from .testing_utils import BaseTestCase
+
+class TestCombatState(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        clear_event_plans()
+        tok = self.game_token
+        db.session.add_all([
+            Location(id=101, game_token=tok, name="Arena", autobattle=True),
+            Attrib(id=102, game_token=tok, name="HP",
+                   ab_field=AutobattleField.HP),
+            Attrib(id=103, game_token=tok, name="Max HP",
+                   ab_field=AutobattleField.MAX_HP),
+            Character(id=10, game_token=tok, name="Knight",
+                      party="Heroes", location_id=101),
+            Character(id=11, game_token=tok, name="Wolf",
+                      party="Enemies", location_id=101),
+            Event(id=20, game_token=tok, name="Bite",
+                  outcome_type=OutcomeType.DETERMINED, fixed_base=4.0,
+                  auto_apply=True, ab_stage=AutobattleStage.TURN),
+        ])
+        db.session.flush()
+        # Only the wolf has values stored; the knight's HP gets created
+        db.session.add_all([
+            AttribVal(game_token=tok, attrib_id=102, subject_id=11, value=6.0),
+            AttribVal(game_token=tok, attrib_id=103, subject_id=11, value=6.0),
+            AttribVal(game_token=tok, attrib_id=103, subject_id=10, value=9.0),
+            EntityAbility(game_token=tok, entity_id=11, event_id=20),
+            EventFactor(
+                game_token=tok, event_id=20, usage_type=Participant.EFF,
+                get_val_from=Participant.OUTCOME,
+                op_application=Operation.SUB,
+                outfield=EventField(
+                    game_token=tok, role=Participant.TARGET,
+                    field_mode=Participant.ATTR, attrib_id=102)),
+        ])
+        db.session.commit()
+
+    def test_loads_all_stats(self):
+        state = CombatState(101)
+        wolf, knight = state.chars[1], state.chars[0]
+        self.assertEqual(state.hp(wolf), 6.0)
+        self.assertEqual(state.hp(knight), 0)
+        self.assertEqual(state.missing_hp(knight), 9.0)
+
+    def test_sees_effects_during_round(self):
+        # The knight starts with no HP row, so give him some to lose
+        db.session.add(AttribVal(
+            game_token=self.game_token, attrib_id=102, subject_id=10,
+            value=9.0))
+        db.session.commit()
+
+        state = CombatState(101)
+        success, _msg = run_battle_round(101, state)
+        self.assertTrue(success)
+        self.assertEqual(
+            state.summary,
+            [(10, "Heroes", 5.0, 9.0), (11, "Enemies", 6.0, 6.0)])
+        row = db.session.get(AttribVal, (self.game_token, 102, 10))
+        self.assertEqual(row.value, 5.0)
+
+    def test_picks_up_new_rows(self):
+        state = CombatState(101)
+        knight = state.chars[0]
+        db.session.add(AttribVal(
+            game_token=self.game_token, attrib_id=102, subject_id=10,
+            value=3.0))
+        db.session.flush()
+        self.assertEqual(state.hp(knight), 3.0)
+
+    def test_simulated_battle(self):
+        db.session.add(AttribVal(
+            game_token=self.game_token, attrib_id=102, subject_id=10,
+            value=9.0))
+        db.session.commit()
+
+        # 9 -> 5 -> 1 -> -3
+        winner, rounds, damage = simulate_battle(101, reset=False)
+        self.assertEqual((winner, rounds), ("Enemies", 3))
+        self.assertEqual(damage, {20: 12.0})
+
+        stats = BattleStats()
+        stats.add(winner, rounds, damage)
+        report = stats.to_dict({20: "Bite"})
+        self.assertEqual(report['win_rates'], {"Enemies": 1.0})
+        self.assertEqual(report['damage_per_ability'][0]['name'], "Bite")
+
+    def test_resolve_endpoint(self):
+        db.session.add(AttribVal(
+            game_token=self.game_token, attrib_id=102, subject_id=10,
+            value=9.0))
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['game_token'] = self.game_token
+
+        data = self.client.post('/play/autobattle/101/resolve').get_json()
+        self.assertEqual(data['rounds'], 3)
+        self.assertFalse(data['battle_continues'])
+        self.assertEqual(
+            [stats['10']['hp'] for stats in data['timeline']],
+            ['5', '1', '-3'])
+        self.assertEqual(data['log'][-1]['text'], "-- Enemies Win Round --")
+        row = db.session.get(AttribVal, (self.game_token, 102, 10))
+        self.assertEqual(row.value, -3.0)
+
+if __name__ == '__main__':
+    unittest.main()
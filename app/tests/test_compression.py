@@ -0,0 +1,77 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_compression
+"""
+import gzip
+import unittest
+import zlib
+from flask import Flask, Response
+from app.src.logic_compression import CompressionMiddleware
+from .testing_utils import BaseTestCase
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+class TestCompression(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.client.session_transaction() as sess:
+            sess['game_token'] = self.game_token
+
+    def test_page_compressed(self):
+        plain = self.client.get('/overview')
+        self.assertNotIn('Content-Encoding', plain.headers)
+
+        response = self.client.get('/overview', headers=GZIP)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Vary'], 'Cookie, Accept-Encoding')
+        self.assertIn('compress;dur=', response.headers['Server-Timing'])
+        body = gzip.decompress(response.get_data())
+        self.assertIn(b'</html>', body)
+        self.assertLess(len(response.get_data()), len(body))
+
+        # The compressed page still gets a 304
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        again = self.client.get(
+            '/overview', headers={**GZIP, 'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+
+    def test_skipped_responses(self):
+        app = Flask(__name__)
+
+        @app.route('/small')
+        def small():
+            return "short"
+
+        @app.route('/image')
+        def image():
+            return Response(b'x' * 5000, mimetype='image/png')
+
+        client = app.test_client()
+        app.wsgi_app = CompressionMiddleware(app.wsgi_app)
+        for url in ('/small', '/image'):
+            response = client.get(url, headers=GZIP)
+            self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_stream_flushed_per_chunk(self):
+        app = Flask(__name__)
+        chunks = [b'{"part": %d}\n' % num for num in range(3)]
+
+        @app.route('/stream')
+        def stream():
+            return Response(iter(chunks), mimetype='application/json')
+
+        app.wsgi_app = CompressionMiddleware(app.wsgi_app)
+        response = app.test_client().get('/stream', headers=GZIP,
+                                         buffered=False)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        decoder = zlib.decompressobj(31)
+        received = [decoder.decompress(part) for part in response.response]
+        # Each chunk can be decoded as soon as it arrives
+        self.assertEqual(received[:3], chunks)
+        self.assertEqual(b''.join(received), b''.join(chunks))
+        response.close()
+
+if __name__ == '__main__':
+    unittest.main()
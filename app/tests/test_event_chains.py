@@ -0,0 +1,62 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_event_chains
+"""
+import unittest
+from app.models import (
+    db, Event, EventLink, OutcomeType)
+from app.src.logic_event import (
+    ChainStats, clear_event_plans, get_link_graph, run_event_chain,
+    MAX_CHAIN_DEPTH)
+from .testing_utils import BaseTestCase
+
+class TestEventChains(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        clear_event_plans()
+        tok = self.game_token
+        # 101 -> ... -> 108 is a long chain; 110 <-> 111 loops
+        # and 112 leads into the loop
+        ids = list(range(101, 109)) + [110, 111, 112]
+        db.session.add_all([
+            Event(id=event_id, game_token=tok, name=f"Step {event_id}",
+                  outcome_type=OutcomeType.DETERMINED, fixed_base=1.0)
+            for event_id in ids])
+        db.session.flush()
+        links = [(i, i + 1) for i in range(101, 108)]
+        links += [(110, 111), (111, 110), (112, 110)]
+        db.session.add_all([
+            EventLink(game_token=tok, parent_id=parent, child_id=child)
+            for parent, child in links])
+        db.session.commit()
+
+    def test_finds_loops(self):
+        graph = get_link_graph(self.game_token)
+        self.assertEqual(graph.looping, {110, 111, 112})
+        self.assertEqual(graph.children[101], [102])
+
+    def test_long_chain_runs_to_the_end(self):
+        stats = ChainStats()
+        self.assertTrue(run_event_chain(101, {}, stats))
+        self.assertEqual(stats.to_dict(), {
+            'chains': 1, 'events': 8, 'deepest': 8, 'cut_off': 0})
+
+    def test_loop_is_cut_off(self):
+        stats = ChainStats()
+        self.assertTrue(run_event_chain(112, {}, stats))
+        self.assertEqual(stats.events, MAX_CHAIN_DEPTH + 1)
+        self.assertEqual(stats.cut_off, 1)
+
+    def test_graph_follows_link_changes(self):
+        self.assertNotIn(101, get_link_graph(self.game_token).looping)
+        db.session.add(EventLink(
+            game_token=self.game_token, parent_id=108, child_id=101))
+        db.session.commit()
+        self.assertIn(101, get_link_graph(self.game_token).looping)
+
+    def test_missing_event(self):
+        self.assertFalse(run_event_chain(999, {}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_event_plans
+"""
+import unittest
+from flask import g
+from sqlalchemy import update
+from app.models import (
+    db, GameVersion, Item, Event, EventFactor, EventField, Operation,
+    Participant, StorageType)
+from app.src.logic_event import (
+    get_entity_value, get_event_plan, is_factor_met, clear_event_plans,
+    _event_plans)
+from app.utils import VersionedCache
+from .testing_utils import BaseTestCase
+
+class TestEventPlans(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        clear_event_plans()
+        self.item = Item(
+            id=10, game_token=self.game_token, name="Barrel",
+            storage_type=StorageType.UNIVERSAL, q_limit=5.0)
+        self.event = Event(id=20, game_token=self.game_token, name="Check")
+        db.session.add_all([self.item, self.event])
+        db.session.flush()
+
+        self.field = EventField(
+            game_token=self.game_token, role=Participant.PRESELECTED,
+            field_mode=Participant.LIMIT, item_id=10)
+        self.factor = EventFactor(
+            game_token=self.game_token, event_id=20,
+            usage_type=Participant.DET, infield=self.field,
+            op_application=Operation.GE, val_required=4.0)
+        db.session.add(self.factor)
+        db.session.commit()
+
+    def test_constant_is_compiled(self):
+        self.assertEqual(get_entity_value(None, self.field), 5.0)
+        plan = get_event_plan(self.event)
+        self.assertEqual(
+            plan.factors[self.factor.id].infield.constant, 5.0)
+
+    def test_edit_invalidates_plan(self):
+        general = db.session.get(Item, (self.game_token, 10))
+        self.assertTrue(is_factor_met(self.factor, general))
+        self.assertIn((self.game_token, 20), _event_plans)
+
+        self.item.q_limit = 2.0
+        db.session.commit()
+        self.assertNotIn((self.game_token, 20), _event_plans)
+        self.assertEqual(get_entity_value(None, self.field), 2.0)
+        self.assertFalse(is_factor_met(self.factor, general))
+
+    def test_rollback_discards_compiled_values(self):
+        self.item.q_limit = 9.0
+        db.session.flush()
+        self.assertEqual(get_entity_value(None, self.field), 9.0)
+        db.session.rollback()
+        self.assertEqual(get_entity_value(None, self.field), 5.0)
+
+    def test_change_by_other_worker_recompiles(self):
+        self.assertEqual(get_entity_value(None, self.field), 5.0)
+        db.session.commit()
+
+        # Another worker saves a change and bumps the stored version
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(Item).where(Item.game_token == self.game_token)
+                .values(q_limit=3.0))
+            connection.execute(
+                update(GameVersion)
+                .where(GameVersion.game_token == self.game_token)
+                .values(config=GameVersion.config + 1))
+
+        # A request keeps the version it started with
+        self.assertEqual(get_entity_value(None, self.field), 5.0)
+        g.pop('config_versions')
+        self.assertEqual(get_entity_value(None, self.field), 3.0)
+
+    def test_cache_is_bounded(self):
+        cache = VersionedCache(2)
+        for key in 'abc':
+            cache.put(key, 1, key.upper())
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.get('c', 1), 'C')
+        self.assertIsNone(cache.get('c', 2))
+
+if __name__ == '__main__':
+    unittest.main()
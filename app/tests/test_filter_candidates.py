@@ -0,0 +1,123 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_filter_candidates
+"""
+import unittest
+from flask import g
+from app.models import (
+    db, EQUIPMENT_SLOTS_ID, Attrib, AttribVal, Character, EnumEntry, Event,
+    EventFactor, EventField, Item, Location, Operation, Participant, Pile,
+    StorageType)
+from app.src.logic_event import (
+    AMBIGUOUS, CandidateValues, clear_event_plans, filter_candidates,
+    get_factor_plan, is_factor_met)
+from .testing_utils import BaseTestCase
+
+STRENGTH, SWORD, SHIELD, COIN = 40, 50, 51, 52
+
+class TestFilterCandidates(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        clear_event_plans()
+        tok = self.game_token
+        db.session.add_all([
+            Location(id=30, game_token=tok, name="Camp"),
+            Attrib(id=STRENGTH, game_token=tok, name="Strength"),
+            Attrib(id=EQUIPMENT_SLOTS_ID, game_token=tok,
+                   name="Equipment Slots"),
+            Item(id=SWORD, game_token=tok, name="Sword",
+                 storage_type=StorageType.CARRIED),
+            Item(id=SHIELD, game_token=tok, name="Shield",
+                 storage_type=StorageType.CARRIED),
+            Item(id=COIN, game_token=tok, name="Coin",
+                 storage_type=StorageType.CARRIED),
+            # One equipped item with Strength
+            Character(id=31, game_token=tok, name="Ada", location_id=30),
+            # Two equipped items with Strength, which the bulk path
+            # leaves to get_entity_value
+            Character(id=32, game_token=tok, name="Bo", location_id=30),
+            # Nothing equipped and no Strength of its own
+            Character(id=33, game_token=tok, name="Cy", location_id=30),
+            Event(id=20, game_token=tok, name="Lift"),
+        ])
+        db.session.flush()
+        hand, arm = (
+            EnumEntry(game_token=tok, attrib_id=EQUIPMENT_SLOTS_ID,
+                      label=label)
+            for label in ("Hand", "Arm"))
+        db.session.add_all([hand, arm])
+        db.session.flush()
+        db.session.add_all([
+            AttribVal(game_token=tok, attrib_id=STRENGTH, subject_id=31,
+                      value=6.0),
+            AttribVal(game_token=tok, attrib_id=STRENGTH, subject_id=32,
+                      value=2.0),
+            AttribVal(game_token=tok, attrib_id=STRENGTH, subject_id=SWORD,
+                      value=3.0),
+            AttribVal(game_token=tok, attrib_id=STRENGTH, subject_id=SHIELD,
+                      value=5.0),
+            Pile(game_token=tok, owner_id=31, item_id=SWORD, quantity=1.0,
+                 slot_id=hand.id),
+            Pile(game_token=tok, owner_id=31, item_id=COIN, quantity=4.0),
+            Pile(game_token=tok, owner_id=32, item_id=SWORD, quantity=1.0,
+                 slot_id=hand.id),
+            Pile(game_token=tok, owner_id=32, item_id=SHIELD, quantity=1.0,
+                 slot_id=arm.id),
+            Pile(game_token=tok, owner_id=32, item_id=COIN, quantity=1.0),
+            Pile(game_token=tok, owner_id=33, item_id=SWORD, quantity=1.0),
+        ])
+
+        def factor(order, op, required=None, negate=False, **field):
+            return EventFactor(
+                game_token=tok, event_id=20, usage_type=Participant.DET,
+                order_index=order, op_application=op,
+                val_required=required, negate=negate,
+                infield=EventField(
+                    game_token=tok, role=Participant.SELECTED, **field))
+
+        strength = {'field_mode': Participant.ATTR, 'attrib_id': STRENGTH}
+        coins = {'field_mode': Participant.QTY, 'item_id': COIN}
+        self.factors = [
+            factor(0, Operation.GE, 3.0, **strength),
+            factor(1, Operation.GE, 3.0, negate=True, **strength),
+            factor(2, Operation.GE, 2.0, **coins),
+            factor(3, Operation.ADD, **coins),
+            factor(4, Operation.GE, 4.0, child_of_anchor=True, **strength),
+            factor(5, Operation.LT, 4.0, child_of_anchor=True, **strength),
+            factor(6, Operation.GE, 1.0, child_of_anchor=True,
+                   field_mode=Participant.QTY, item_id=SWORD),
+        ]
+        db.session.add_all(self.factors)
+        db.session.commit()
+
+    def test_matches_is_factor_met(self):
+        candidates = [
+            db.session.get(Character, (self.game_token, char_id))
+            for char_id in (31, 32, 33)]
+        with self.app.test_request_context():
+            g.game_token = self.game_token
+            failures = filter_candidates(
+                self.factors, candidates, subject_id=31)
+            for ent in candidates:
+                for factor in self.factors:
+                    with self.subTest(char=ent.name, factor=factor.order_index):
+                        self.assertEqual(
+                            factor not in failures[ent],
+                            is_factor_met(factor, ent, subject_id=31))
+
+            self.assertEqual(
+                [ent.name for ent in candidates
+                 if self.factors[0] not in failures[ent]], ["Ada"])
+
+            # Bo's equipped items disagree, so it's worked out per entity
+            equipped = self.factors[4]
+            values = CandidateValues(self.factors, candidates)
+            self.assertIs(
+                values.value(
+                    equipped.infield, get_factor_plan(equipped).infield,
+                    candidates[1], subject_id=31),
+                AMBIGUOUS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_fragment_cache
+"""
+import unittest
+from app.models import (
+    db, GENERAL_ID, IdSequence, Item, Location, Pile, StorageType)
+from app.src.logic_fragment_cache import fragment_cache
+from app.src.logic_world_version import config_version
+from .testing_utils import BaseTestCase
+
+class TestFragmentCache(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            IdSequence(game_token=self.game_token, next_id=101),
+            Location(id=30, game_token=self.game_token, name="Field",
+                     dimensions=[3, 2]),
+            Item(id=10, game_token=self.game_token, name="Wood",
+                 storage_type=StorageType.UNIVERSAL),
+        ])
+        db.session.flush()
+        db.session.add(Pile(
+            game_token=self.game_token, item_id=10, owner_id=GENERAL_ID,
+            quantity=1.0))
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['game_token'] = self.game_token
+
+    def grid_page(self):
+        response = self.client.get('/play/location/30')
+        self.assertEqual(response.status_code, 200)
+        return response.get_data(as_text=True)
+
+    def test_grid_cached_until_config_changes(self):
+        html = self.grid_page()
+        self.assertIn('id="cell-3-2"', html)
+        self.assertEqual(self.grid_page(), html)
+        self.assertEqual((fragment_cache.hits, fragment_cache.misses), (1, 1))
+
+        # Play changes don't touch setup, so the grid is reused
+        before = config_version(self.game_token)
+        pile = Pile.query.filter_by(game_token=self.game_token).one()
+        pile.quantity = 5.0
+        db.session.commit()
+        self.assertEqual(config_version(self.game_token), before)
+        self.grid_page()
+        self.assertEqual((fragment_cache.hits, fragment_cache.misses), (2, 1))
+
+        # Any change to setup shows, however it was made
+        db.session.get(Location, (self.game_token, 30)).dimensions = [4, 2]
+        db.session.commit()
+        self.assertIn('id="cell-4-2"', self.grid_page())
+
+        response = self.client.post(
+            '/configure/attrib/new', data={'name': "Strength"})
+        self.assertEqual(response.status_code, 302)
+        self.assertGreater(config_version(self.game_token), before)
+
+    def test_unmasking_bumps_config_version(self):
+        before = config_version(self.game_token)
+        loc = db.session.get(Location, (self.game_token, 30))
+        loc.masked = True
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(config_version(self.game_token), before)
+
+        loc = db.session.get(Location, (self.game_token, 30))
+        loc.masked = True
+        db.session.commit()
+        self.assertEqual(
+            config_version(self.game_token), (before[0], before[1] + 1))
+
+    def test_number_format_in_key(self):
+        self.grid_page()
+        with self.client.session_transaction() as sess:
+            sess['number_format'] = 'de_DE'
+        self.grid_page()
+        self.assertEqual(fragment_cache.misses, 2)
+
+if __name__ == '__main__':
+    unittest.main()
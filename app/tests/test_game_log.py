@@ -0,0 +1,160 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_game_log
+"""
+import unittest
+from sqlalchemy import create_engine, inspect as sa_inspect, text
+from app.models import db, GameMessage
+from database_setup import upgrade_schema
+from app.src.logic_user_interaction import (
+    add_message, get_chronicle, enforce_message_cap)
+from .testing_utils import BaseTestCase
+
+class TestGameLog(BaseTestCase):
+
+    def _rows(self):
+        return GameMessage.query.filter_by(
+            game_token=self.game_token).order_by(GameMessage.id).all()
+
+    def test_duplicates_merge_before_commit(self):
+        for _ in range(5):
+            add_message("Wood produced")
+        add_message("Stone produced")
+        db.session.commit()
+
+        rows = self._rows()
+        self.assertEqual(
+            [(r.message, r.count) for r in rows],
+            [("Wood produced", 5), ("Stone produced", 1)])
+
+    def test_merges_into_recent_row_across_commits(self):
+        add_message("Wood produced", commit=True)
+        add_message("Wood produced")
+        add_message("Wood produced")
+        db.session.commit()
+
+        rows = self._rows()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0].count, 3)
+
+    def test_ungrouped_messages_stay_separate(self):
+        add_message("Roll: 4", group_duplicates=False)
+        add_message("Roll: 4", group_duplicates=False)
+        db.session.commit()
+        self.assertEqual([r.count for r in self._rows()], [1, 1])
+
+    def test_rollback_discards_pending(self):
+        add_message("Never saved")
+        db.session.rollback()
+        db.session.commit()
+        self.assertEqual(self._rows(), [])
+
+    def test_chronicle_sees_pending(self):
+        add_message("Hello")
+        messages = get_chronicle()
+        self.assertEqual([m.message for m in messages], ["Hello"])
+
+    def test_cap_drops_oldest(self):
+        self.app.config['CHRONICLE_MAX_MESSAGES'] = 3
+        for i in range(5):
+            add_message(f"Event {i}", commit=True)
+        self.assertEqual(
+            [r.message for r in self._rows()],
+            ["Event 2", "Event 3", "Event 4"])
+
+    def test_cap_helper_reports_deleted(self):
+        for i in range(4):
+            add_message(f"Event {i}")
+        db.session.commit()
+        self.assertEqual(enforce_message_cap(db.session, self.game_token, 1), 3)
+
+    def test_keyset_pages(self):
+        for i in range(7):
+            add_message(f"Event {i}")
+        db.session.commit()
+
+        page = get_chronicle(3)
+        self.assertEqual(
+            [m.message for m in page], ["Event 4", "Event 5", "Event 6"])
+        page = get_chronicle(3, before=page[0].id)
+        self.assertEqual(
+            [m.message for m in page], ["Event 1", "Event 2", "Event 3"])
+        page = get_chronicle(3, before=page[0].id)
+        self.assertEqual([m.message for m in page], ["Event 0"])
+
+    def test_pages_after_grouping_and_cap(self):
+        for i in range(7):
+            add_message(f"Event {i}")
+        db.session.commit()
+        page_ids = [m.id for m in get_chronicle(3)]
+
+        # Grouping moves the oldest shown to the end, so the page before
+        # the next one shown holds what it did
+        add_message("Event 4", commit=True)
+        self.assertEqual(
+            [m.message for m in get_chronicle(3)],
+            ["Event 5", "Event 6", "Event 4"])
+        older = get_chronicle(3, before=page_ids[1])
+        self.assertEqual(
+            [m.message for m in older], ["Event 1", "Event 2", "Event 3"])
+
+        # The cap drops the anchor along with everything older
+        self.app.config['CHRONICLE_MAX_MESSAGES'] = 2
+        add_message("Event 7", commit=True)
+        self.assertEqual(get_chronicle(3, before=page_ids[1]), [])
+
+    def test_regrouped_last_and_kept_by_cap(self):
+        for i in range(5):
+            add_message(f"Event {i}")
+        db.session.commit()
+        add_message("Event 0", commit=True)
+        self.assertEqual(
+            [m.message for m in get_chronicle()],
+            ["Event 1", "Event 2", "Event 3", "Event 4", "Event 0"])
+
+        self.app.config['CHRONICLE_MAX_MESSAGES'] = 3
+        add_message("Event 5", commit=True)
+        messages = get_chronicle()
+        self.assertEqual(
+            [(m.message, m.count) for m in messages],
+            [("Event 4", 1), ("Event 0", 2), ("Event 5", 1)])
+
+    def test_since_includes_regrouped(self):
+        for i in range(3):
+            add_message(f"Event {i}")
+        db.session.commit()
+        newest = get_chronicle()[-1]
+
+        add_message("Event 3", commit=True)
+        page = get_chronicle(since=newest.id)
+        self.assertEqual([m.message for m in page], ["Event 2", "Event 3"])
+
+    def test_hash_is_stored(self):
+        add_message("Hashed", commit=True)
+        row = self._rows()[0]
+        self.assertEqual(row.message_hash, GameMessage.hash_text("Hashed"))
+
+    def test_upgrade_adds_hash(self):
+        engine = create_engine('sqlite://')
+        with engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE game_messages (id INTEGER PRIMARY KEY, "
+                "game_token VARCHAR(50), timestamp DATETIME, "
+                "message TEXT, count INTEGER)"))
+            connection.execute(text(
+                "INSERT INTO game_messages (game_token, message, count) "
+                "VALUES ('t', 'Old', 1)"))
+        self.assertEqual(len(upgrade_schema(engine)), 5)
+        self.assertEqual(upgrade_schema(engine), [])
+        with engine.connect() as connection:
+            self.assertEqual(
+                connection.execute(text(
+                    "SELECT message_hash FROM game_messages")).scalar(),
+                GameMessage.hash_text("Old"))
+        self.assertIn(
+            'ix_game_messages_token_hash',
+            {ix['name'] for ix in sa_inspect(engine).get_indexes(
+                'game_messages')})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_htmlify
+"""
+import unittest
+from app.utils import HtmlCache, htmlify_cache, htmlify_filter
+from .testing_utils import BaseTestCase
+
+class TestHtmlify(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        htmlify_cache.clear()
+
+    def render(self, text, query='', allow_links=True):
+        with self.app.test_request_context('/play/item/5' + query):
+            return str(htmlify_filter(text, allow_links))
+
+    def test_cached_with_vars_from_url(self):
+        text = "Back to [owner](/play/character/${owner_id}) {red|${loc_id}}"
+        first = self.render(text, '?owner_id=10&loc_id=30')
+        second = self.render(text, '?owner_id=11')
+        self.assertEqual(
+            first, '<p>Back to <a href="/play/character/10">owner</a> '
+            '<span style="color:red;">30</span></p>')
+        self.assertEqual(
+            second, '<p>Back to <a href="/play/character/11">owner</a> '
+            '<span style="color:red;"></span></p>')
+        self.assertEqual((htmlify_cache.hits, htmlify_cache.misses), (1, 1))
+
+    def test_unsafe_values_left_out(self):
+        html = self.render(
+            "[x](/${char_id}) ${char_id}",
+            '?char_id=' + '/evil.com"><script>')
+        self.assertEqual(html, '<p><a href="/">x</a> </p>')
+
+    def test_links_option_cached_separately(self):
+        self.render("[Map](/play/location/1)")
+        html = self.render("[Map](/play/location/1)", allow_links=False)
+        self.assertNotIn('<a', html)
+        self.assertEqual(htmlify_cache.misses, 2)
+
+    def test_size_bound(self):
+        cache = HtmlCache(max_bytes=10)
+        cache.put('a', '12345')
+        cache.put('b', '12345')
+        cache.get('a')  # now b is the oldest
+        cache.put('c', '12345')
+        self.assertEqual(list(cache.entries), ['a', 'c'])
+        self.assertEqual(cache.size, 10)
+        cache.put('d', '12345678901')
+        self.assertNotIn('d', cache.entries)
+        self.assertEqual(cache.hit_rate(), 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_hydration
+"""
+import unittest
+from app.models import (
+    db, GENERAL_ID, IdSequence, Item, Location, Pile, hydration_plan)
+from .testing_utils import BaseTestCase
+
+class TestHydration(BaseTestCase):
+
+    def test_plans(self):
+        plan = hydration_plan(Location)
+        self.assertIn('name', plan.known_names)
+        self.assertIn('dimensions', plan.json_columns)
+        self.assertTrue(plan.needs_id)
+        self.assertFalse(hydration_plan(Pile).needs_id)
+        self.assertEqual(plan.default_for('masked'), False)
+        self.assertIsNone(plan.default_for('name'))
+
+    def test_from_dict(self):
+        db.session.add(IdSequence(game_token=self.game_token, next_id=101))
+        db.session.flush()
+        with self.assertLogs('app.models', 'WARNING') as logs:
+            loc = Location.from_dict({
+                'name': "Cave", 'dimensions': [3, 4], 'bogus': 1,
+                'destinations': [{'loc2_id': 5}]}, self.game_token)
+        self.assertIn("'bogus'", logs.output[0])
+        self.assertEqual(loc.dimensions, (3, 4))
+        self.assertEqual(loc.id, 101)
+        # Defaults are there before a flush
+        self.assertIs(loc.masked, False)
+        self.assertEqual(Item(name="Rope").storage_type, 'c')
+
+        pile = Pile.from_dict(
+            {'item_id': 7}, self.game_token, owner_id=GENERAL_ID)
+        self.assertEqual((pile.quantity, pile.owner_id), (0.0, GENERAL_ID))
+
+if __name__ == '__main__':
+    unittest.main()
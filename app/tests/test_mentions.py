@@ -0,0 +1,95 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_mentions
+"""
+import unittest
+from flask import g
+from sqlalchemy import update
+from app.models import (
+    db, GENERAL_ID, Entity, Event, GameVersion, Item, Location, Pile, Recipe,
+    RecipeSource, Scenario)
+from app.src.logic_mentions import (
+    SCENARIO_KEY, clear_mention_index, get_mention_index)
+from .testing_utils import BaseTestCase
+
+class TestMentions(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        clear_mention_index()
+        tok = self.game_token
+        db.session.get(Scenario, tok).description = "Find the Iron Ore first."
+        db.session.add_all([
+            Item(id=10, game_token=tok, name="Iron Ore"),
+            Item(id=11, game_token=tok, name="Iron Bar",
+                 description="Smelted from [ore](/play/item/10)."),
+            Location(id=30, game_token=tok, name="Mine",
+                     description="Rich in iron ore and ironore."),
+            Event(id=40, game_token=tok, name="Smelt",
+                  description="Uses Iron Ore, Iron Bar"),
+            Recipe(id=20, game_token=tok, product_id=11, rate_amount=1.0,
+                   rate_duration=5),
+            RecipeSource(game_token=tok, recipe_id=20, item_id=10,
+                         q_required=2.0),
+            Pile(game_token=tok, item_id=10, owner_id=GENERAL_ID,
+                 quantity=3.0),
+        ])
+        db.session.commit()
+
+    def found(self, ent_type, ent_id, name):
+        index = get_mention_index(self.game_token)
+        return {key for key, _name in index.find(ent_type, ent_id, name)}
+
+    def test_links_and_whole_names(self):
+        self.assertEqual(
+            self.found('item', 10, "Iron Ore"),
+            {SCENARIO_KEY, ('item', 11), ('event', 40)})
+        # Not itself, and no partial words
+        self.assertEqual(self.found('item', 11, "Iron Bar"), {('event', 40)})
+
+    def test_kept_current_on_save(self):
+        self.found('item', 10, "Iron Ore")  # builds the index
+        loc = db.session.get(Location, (self.game_token, 30))
+        loc.description = "Iron Ore everywhere."
+        db.session.delete(db.session.get(Event, (self.game_token, 40)))
+        db.session.commit()
+        self.assertEqual(
+            self.found('item', 10, "Iron Ore"),
+            {SCENARIO_KEY, ('item', 11), ('location', 30)})
+
+        item = db.session.get(Item, (self.game_token, 11))
+        item.description = "Nothing here"
+        db.session.flush()
+        db.session.rollback()
+        self.assertIn(('item', 11), self.found('item', 10, "Iron Ore"))
+
+    def test_rebuilt_after_change_by_other_worker(self):
+        self.found('item', 10, "Iron Ore")  # builds the index
+        db.session.commit()
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(Entity)
+                .where(Entity.game_token == self.game_token, Entity.id == 30)
+                .values(description="Iron Ore everywhere."))
+            connection.execute(
+                update(GameVersion)
+                .where(GameVersion.game_token == self.game_token)
+                .values(config=GameVersion.config + 1))
+
+        g.pop('config_versions')  # as in the next request
+        self.assertIn(('location', 30), self.found('item', 10, "Iron Ore"))
+
+    def test_lookup_page(self):
+        with self.client.session_transaction() as sess:
+            sess['game_token'] = self.game_token
+        html = self.client.get(
+            '/configure/lookup/item/10').get_data(as_text=True)
+        for expected in (
+                "Mentioned in Descriptions", "Scenario Settings",
+                "Item Desc", "Event Desc", "Required To Produce",
+                "Iron Bar", "General Storage"):
+            self.assertIn(expected, html)
+        self.assertNotIn("Location Desc", html)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_metrics
+"""
+import unittest
+from app.src.logic_metrics import (
+    Counter, Histogram, render_metrics, MESSAGES_WRITTEN, _registry)
+from app.src.logic_user_interaction import add_message
+from app.models import db
+from .testing_utils import BaseTestCase
+
+class TestMetrics(BaseTestCase):
+
+    def _make(self, metric):
+        self.addCleanup(_registry.remove, metric)
+        return metric
+
+    def test_histogram_buckets_are_cumulative(self):
+        hist = self._make(Histogram(
+            'test_wait_seconds', "Test.", labels=('lock',),
+            buckets=(0.1, 1.0)))
+        hist.observe(0.05, 'sqlite')
+        hist.observe(0.5, 'sqlite')
+        lines = hist.render()
+        self.assertIn('test_wait_seconds_bucket{lock="sqlite",le="0.1"} 1', lines)
+        self.assertIn('test_wait_seconds_bucket{lock="sqlite",le="1.0"} 2', lines)
+        self.assertIn('test_wait_seconds_bucket{lock="sqlite",le="+Inf"} 2', lines)
+        self.assertIn('test_wait_seconds_count{lock="sqlite"} 2', lines)
+
+    def test_counter_without_labels_starts_at_zero(self):
+        counter = self._make(Counter('test_things_total', "Test."))
+        self.assertIn('test_things_total 0', counter.render())
+        counter.inc(amount=3)
+        self.assertIn('test_things_total 3', counter.render())
+
+    def test_endpoint(self):
+        before = MESSAGES_WRITTEN.values.get(('new',), 0)
+        add_message("Hello")
+        db.session.commit()
+        self.assertEqual(MESSAGES_WRITTEN.values[('new',)], before + 1)
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.get_data(as_text=True)
+        self.assertIn('# TYPE team_progress_tick_seconds histogram', text)
+        self.assertIn('team_progress_active_progress 0', text)
+        self.assertIn('team_progress_messages_written_total{kind="new"}', text)
+        self.assertEqual(text, render_metrics())
+        # Scrapes don't start a game session
+        with self.client.session_transaction() as sess:
+            self.assertNotIn('game_token', sess)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 from .testing_utils import BaseTestCase
-from app.utils import format_num, unformat_num
+from app.utils import format_num, format_many, unformat_num
 
 class TestNumberUtilities(BaseTestCase):
 
@@ -40,8 +40,19 @@ class TestNumberUtilities(BaseTestCase):
         self.assertEqual(format_num(1234.56, "en_US"), "1,234.56")
         self.assertEqual(format_num(1000000, "en_US"), "1,000,000")
 
-        # Note: 'de_DE' behavior depends on system locale availability,
-        # but the utility falls back to 'C' (1234.56) if missing.
+        # Separators are built in, so no system locale is needed
+        self.assertEqual(format_num(-1234567.891, "de_DE"), "-1.234.567,891")
+        self.assertEqual(format_num(1000.5, "de_DE.UTF-8"), "1.000,5")
+        # Unknown locales fall back to plain 'C' formatting
+        self.assertEqual(format_num(1234.56, "xx_XX"), "1234.56")
+
+    def test_format_many(self):
+        """Same results as format_num for each value."""
+        values = [None, 5, 1234.5, -0.25, "n/a"]
+        for fmt in ("en_US", "de_DE", "abbr", "sci"):
+            self.assertEqual(
+                format_many(values, fmt),
+                [format_num(value, fmt) for value in values])
 
     def test_unformatting(self):
         """Test parsing strings back into floats (Inverse operations)."""
@@ -0,0 +1,82 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_odds
+"""
+import unittest
+from collections import Counter
+from unittest.mock import patch
+from app.models import (
+    db, Event, GameMessage, OutcomeType, RollerType, SuccessTier)
+from app.src.logic_event import roll_for_outcome
+from app.src.logic_odds import (
+    MAX_DICE, dnd_distribution, ironsworn_distribution, event_odds)
+from .testing_utils import BaseTestCase
+
+class TestDiceOdds(unittest.TestCase):
+
+    def test_two_d6(self):
+        dist = dnd_distribution(2, 6, bonus=1)
+        self.assertAlmostEqual(sum(dist.values()), 1.0)
+        self.assertAlmostEqual(dist[8], 6 / 36)
+        self.assertEqual(min(dist), 3)
+        self.assertEqual(max(dist), 13)
+
+    def test_ironsworn(self):
+        hits, tiers = ironsworn_distribution(bonus=0)
+        self.assertAlmostEqual(sum(hits.values()), 1.0)
+        self.assertAlmostEqual(sum(tiers.values()), 1.0)
+        # Action die 1 never beats a challenge die
+        self.assertGreater(hits[0.0], 1 / 6)
+
+class TestEventOdds(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.event = Event(
+            id=30, game_token=self.game_token, name="Climb",
+            outcome_type=OutcomeType.FOURWAY, numeric_range=[1, 20])
+        db.session.add(self.event)
+        db.session.commit()
+
+    def test_fourway_matches_each_face(self):
+        odds = event_odds(self.event, {}, difficulty=0.5)
+        self.assertEqual(odds['method'], 'exact')
+        self.assertAlmostEqual(sum(odds['tiers'].values()), 1.0)
+
+        counted = Counter()
+        for face in range(1, 21):
+            with patch('app.src.logic_event.random.randint',
+                       return_value=face):
+                _val, _display, tier = roll_for_outcome(
+                    30, {}, difficulty=0.5)
+            counted[tier] += 1 / 20
+        for tier, prob in counted.items():
+            self.assertAlmostEqual(odds['tiers'][tier], prob)
+
+    def test_odds_do_not_log(self):
+        event_odds(self.event, {}, difficulty=0.5)
+        db.session.commit()
+        self.assertEqual(GameMessage.query.count(), 0)
+
+    def test_dnd_roller(self):
+        self.event.outcome_type = OutcomeType.ROLLER
+        self.event.roller_type = RollerType.DND
+        odds = event_odds(self.event, {}, num_dice=1, sides=4, bonus=2)
+        self.assertEqual(
+            [d['value'] for d in odds['distribution']], [3, 4, 5, 6])
+        self.assertEqual(odds['tiers'], {SuccessTier.SUCCESS_MINOR: 1.0})
+
+    def test_large_dnd_roll_sampled(self):
+        self.event.outcome_type = OutcomeType.ROLLER
+        self.event.roller_type = RollerType.DND
+        odds = event_odds(
+            self.event, {}, num_dice=10**9, sides=10**9, samples=200)
+        self.assertEqual((odds['method'], odds['samples']), ('simulated', 200))
+        values = [d['value'] for d in odds['distribution']]
+        self.assertGreaterEqual(min(values), MAX_DICE)
+        self.assertLessEqual(max(values), MAX_DICE * 10**9)
+        self.assertAlmostEqual(
+            sum(d['probability'] for d in odds['distribution']), 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_profiling
+"""
+import os
+import shutil
+import tempfile
+import cProfile
+import unittest
+from unittest import mock
+from app.src.logic_profiling import list_profiles, PROFILE_HEADER
+from .testing_utils import BaseTestCase
+
+class TestProfiling(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.profile_dir = tempfile.mkdtemp()
+        self.app.config['PROFILE_DIR'] = self.profile_dir
+        env = mock.patch.dict(os.environ, {'PROFILE_AUTH_TOKEN': 'secret'})
+        env.start()
+        self.addCleanup(env.stop)
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        with self.client.session_transaction() as sess:
+            sess['game_token'] = self.game_token
+
+    def test_only_admin_requests_are_profiled(self):
+        self.client.get('/overview')
+        self.client.get('/overview', headers={PROFILE_HEADER: 'wrong'})
+        self.assertEqual(list_profiles(), [])
+
+        self.client.get('/overview', headers={PROFILE_HEADER: 'secret'})
+        profiles = list_profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]['endpoint'], 'play.overview')
+
+    def test_overlapping_profile_skipped(self):
+        running = cProfile.Profile()
+        running.enable()
+        try:
+            response = self.client.get(
+                '/overview', headers={PROFILE_HEADER: 'secret'})
+        finally:
+            running.disable()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list_profiles(), [])
+
+    def test_profiles_page(self):
+        # Without the cookie the page only asks for the token
+        page = self.client.get('/session/profiles')
+        self.assertNotIn(b'download', page.data)
+        self.client.get('/session/profiles?key=secret')
+        self.client.get('/overview')
+        self.assertEqual(list_profiles(), [])
+        response = self.client.post(
+            '/session/profiles', data={'key': 'wrong'})
+        self.assertEqual(response.status_code, 403)
+
+        # Entering the key remembers the admin in a cookie
+        response = self.client.post(
+            '/session/profiles', data={'key': 'secret'})
+        self.assertEqual(response.status_code, 302)
+        self.client.get('/overview')
+        filename = list_profiles()[0]['filename']
+
+        page = self.client.get('/session/profiles')
+        self.assertIn(filename.encode(), page.data)
+        view = self.client.get(
+            f'/session/profiles/{filename}?focus=overview')
+        self.assertIn(b'overview', view.data)
+        download = self.client.get(f'/session/profiles/{filename}/download')
+        self.assertEqual(download.status_code, 200)
+        download.close()
+
+        self.assertEqual(
+            self.client.get('/session/profiles/../app.db').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
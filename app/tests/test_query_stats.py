@@ -0,0 +1,74 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_query_stats
+"""
+import os
+import unittest
+from unittest import mock
+from app.src.logic_profiling import PROFILE_HEADER
+from app.src.logic_query_stats import (
+    RequestQueries, fingerprint, init_query_stats, endpoint_summary,
+    clear_query_history, REPEAT_THRESHOLD)
+from .testing_utils import BaseTestCase
+
+class TestQueryStats(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        init_query_stats(self.app)
+        clear_query_history()
+        with self.client.session_transaction() as sess:
+            sess['game_token'] = self.game_token
+
+    def test_fingerprint_ignores_list_length(self):
+        self.assertEqual(
+            fingerprint("SELECT x FROM t WHERE id IN (?, ?)"),
+            fingerprint("SELECT x\n  FROM t WHERE id IN (?, ?, ?, ?)"))
+
+    def test_flags_repeated_statements(self):
+        stats = RequestQueries()
+        for _ in range(REPEAT_THRESHOLD):
+            stats.add("SELECT * FROM piles WHERE id = ?", 0.001)
+        stats.add("SELECT * FROM items", 0.001)
+        self.assertEqual(stats.count, REPEAT_THRESHOLD + 1)
+        self.assertEqual(
+            stats.repeated(),
+            [("SELECT * FROM piles WHERE id = ?", REPEAT_THRESHOLD)])
+
+    def test_page_reports_queries(self):
+        response = self.client.get('/overview')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('queries"', response.headers['Server-Timing'])
+        self.assertIn(b'class="query-stats"', response.data)
+
+        row = next(
+            row for row in endpoint_summary()
+            if row['endpoint'] == 'play.overview')
+        self.assertEqual(row['requests'], 1)
+        self.assertGreater(row['max_queries'], 0)
+
+        page = self.client.get('/session/query-stats')
+        self.assertIn(b'play.overview', page.data)
+
+    def test_only_admin_clears(self):
+        def endpoints():
+            return {row['endpoint'] for row in endpoint_summary()}
+
+        self.client.get('/overview')
+        with mock.patch.dict(os.environ, {'PROFILE_AUTH_TOKEN': 'secret'}):
+            page = self.client.get('/session/query-stats')
+            self.assertNotIn(b'Clear', page.data)
+            response = self.client.post('/session/query-stats')
+            self.assertEqual(response.status_code, 403)
+            response = self.client.post(
+                '/session/query-stats', headers={PROFILE_HEADER: 'wrong'})
+            self.assertEqual(response.status_code, 403)
+            self.assertIn('play.overview', endpoints())
+
+            response = self.client.post(
+                '/session/query-stats', headers={PROFILE_HEADER: 'secret'})
+            self.assertEqual(response.status_code, 302)
+            self.assertNotIn('play.overview', endpoints())
+
+if __name__ == '__main__':
+    unittest.main()
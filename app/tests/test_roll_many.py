@@ -0,0 +1,106 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_roll_many
+"""
+import unittest
+from app.models import (
+    db, Item, Character, Location, Pile, Event, EventFactor, EventField,
+    GameMessage, Operation, OutcomeType, Participant, StorageType)
+from app.src.logic_event import roll_many, clear_event_plans
+from app.src.logic_piles import get_accessible_quantity
+from .testing_utils import BaseTestCase
+
+class TestRollMany(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        clear_event_plans()
+        self.item = Item(
+            id=10, game_token=self.game_token, name="Crate",
+            storage_type=StorageType.UNIVERSAL, q_limit=5.0)
+        self.event = Event(
+            id=20, game_token=self.game_token, name="Stack",
+            outcome_type=OutcomeType.DETERMINED, fixed_base=2.0,
+            auto_apply=True)
+        db.session.add_all([self.item, self.event])
+        db.session.flush()
+
+        def limit_field():
+            return EventField(
+                game_token=self.game_token, role=Participant.PRESELECTED,
+                field_mode=Participant.LIMIT, item_id=10)
+        # Only roll while the limit is below 12
+        db.session.add(EventFactor(
+            game_token=self.game_token, event_id=20,
+            usage_type=Participant.DET, infield=limit_field(),
+            op_application=Operation.LT, val_required=12.0))
+        # Each roll raises the limit by the outcome
+        db.session.add(EventFactor(
+            game_token=self.game_token, event_id=20,
+            usage_type=Participant.EFF, outfield=limit_field(),
+            get_val_from=Participant.OUTCOME,
+            op_application=Operation.ADD))
+        db.session.commit()
+
+    def _messages(self):
+        return [m.message for m in GameMessage.query.filter_by(
+            game_token=self.game_token).order_by(GameMessage.id)]
+
+    def test_rolls_see_earlier_effects(self):
+        rolls, summary = roll_many(self.event, {}, 10)
+        db.session.commit()
+
+        # 5 -> 7 -> 9 -> 11 -> 13, then the requirement fails
+        self.assertEqual([r['v'] for r in rolls], [2.0] * 4)
+        self.assertEqual(summary, "total 8, average 2")
+        item = db.session.get(Item, (self.game_token, 10))
+        self.assertEqual(item.q_limit, 13.0)
+
+    def test_net_change_logged_once(self):
+        roll_many(self.event, {}, 3)
+        db.session.commit()
+        self.assertEqual(self._messages(), [
+            "Set Crate storage limit to 11",
+            "Stack ×3: total 6, average 2",
+        ])
+
+    def test_unmet_on_first_roll(self):
+        self.item.q_limit = 20.0
+        db.session.commit()
+        rolls, message = roll_many(self.event, {}, 3)
+        self.assertEqual(rolls, [])
+        self.assertIn("Requirements not met", message)
+
+    def test_quantity_counts_floor_items(self):
+        tok = self.game_token
+        db.session.add_all([
+            Location(id=30, game_token=tok, name="Cellar"),
+            Character(id=31, game_token=tok, name="Cook", location_id=30),
+            Item(id=32, game_token=tok, name="Apple",
+                 storage_type=StorageType.CARRIED),
+            Event(id=33, game_token=tok, name="Pick",
+                  outcome_type=OutcomeType.DETERMINED, fixed_base=1.0,
+                  auto_apply=True),
+        ])
+        db.session.flush()
+        db.session.add_all([
+            Pile(game_token=tok, owner_id=31, item_id=32, quantity=2.0),
+            Pile(game_token=tok, owner_id=30, item_id=32, quantity=3.0),
+            EventFactor(
+                game_token=tok, event_id=33, usage_type=Participant.EFF,
+                get_val_from=Participant.OUTCOME,
+                op_application=Operation.ADD,
+                outfield=EventField(
+                    game_token=tok, role=Participant.SUBJECT,
+                    field_mode=Participant.QTY, item_id=32)),
+        ])
+        db.session.commit()
+
+        event = db.session.get(Event, (tok, 33))
+        roll_many(event, {Participant.SUBJECT: 31}, 3)
+        db.session.commit()
+        # The apples on the floor stay where they are
+        self.assertEqual(get_accessible_quantity(32, 31), 8.0)
+
+if __name__ == '__main__':
+    unittest.main()
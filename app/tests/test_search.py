@@ -0,0 +1,107 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_search
+"""
+import unittest
+from sqlalchemy import text
+from app.models import db, Entity, Event, Item, Location, IdSequence
+from app.serialization import clear_game_data
+from app.src.logic_search import (
+    SEARCH_KEYS_TABLE, SEARCH_TABLE, build_query, create_search_index,
+    search_entities)
+from .testing_utils import BaseTestCase
+
+OTHER_TOKEN = 'other-token-456'
+
+class TestSearch(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        tok = self.game_token
+        db.session.add_all([
+            Item(id=10, game_token=tok, name="Iron Ore",
+                 description="Dug from the <b>deep</b> mine."),
+            Item(id=11, game_token=tok, name="Copper Bar",
+                 description="Smelted from ore that looks like iron."),
+            Location(id=30, game_token=tok, name="Mine",
+                     description="Rich in copper."),
+            Event(id=40, game_token=tok, name="Smelt"),
+            Item(id=10, game_token=OTHER_TOKEN, name="Iron Sword"),
+        ])
+        db.session.commit()
+
+    def found(self, text):
+        return [(hit['entity_type'], hit['id'])
+                for hit in search_entities(text, game_token=self.game_token)]
+
+    def test_ranking_and_scope(self):
+        # A match in the name outranks one in the description
+        self.assertEqual(self.found("iron"), [('item', 10), ('item', 11)])
+        # Prefixes, every word must match, and not from another game
+        self.assertEqual(self.found("cop ba"), [('item', 11)])
+        self.assertEqual(self.found("sword"), [])
+        self.assertEqual(self.found('" * ( -'), [])
+        self.assertEqual(build_query('"ir" OR', 'sqlite'), '"ir"* "OR"*')
+
+    def test_kept_current(self):
+        item = db.session.get(Item, (self.game_token, 11))
+        item.name = "Bronze Bar"
+        db.session.delete(db.session.get(Location, (self.game_token, 30)))
+        db.session.commit()
+        self.assertEqual(self.found("copper"), [])
+        self.assertEqual(self.found("bronze"), [('item', 11)])
+
+        clear_game_data(self.game_token)
+        self.assertEqual(self.found("iron"), [])
+        self.assertEqual(
+            [hit['id'] for hit in search_entities(
+                "iron", game_token=OTHER_TOKEN)], [10])
+
+    def test_rowids_renumbered(self):
+        # As VACUUM may do to a table without an INTEGER PRIMARY KEY
+        db.session.execute(text(
+            f"UPDATE {Entity.__tablename__} SET rowid = rowid + 1000"))
+        db.session.commit()
+        self.assertEqual(self.found("iron"), [('item', 10), ('item', 11)])
+
+        item = db.session.get(Item, (self.game_token, 10))
+        item.name = "Tin Ore"
+        db.session.commit()
+        self.assertEqual(self.found("tin"), [('item', 10)])
+
+    def test_older_layout_replaced(self):
+        with db.engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE {SEARCH_KEYS_TABLE}"))
+            connection.execute(text(f"DROP TABLE {SEARCH_TABLE}"))
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                "name, description, game_token UNINDEXED, "
+                f"content='{Entity.__tablename__}', content_rowid='rowid')"))
+            create_search_index(connection)
+        self.assertEqual(self.found("iron"), [('item', 10), ('item', 11)])
+
+    def test_snippet_escaped(self):
+        hit = search_entities("deep", game_token=self.game_token)[0]
+        self.assertIn("&lt;b&gt;<mark>deep</mark>&lt;/b&gt;", hit['snippet'])
+        self.assertEqual(hit['name_html'], "Iron Ore")
+
+    def test_pages(self):
+        db.session.add(IdSequence(game_token=self.game_token, next_id=101))
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['game_token'] = self.game_token
+        # Saved through the editor, then found
+        self.client.post('/configure/item/new', data={
+            'name': "Tin Ingot", 'description': "Soft metal"})
+        hits = self.client.get('/configure/search.json?q=ingot').get_json()
+        self.assertEqual([hit['name'] for hit in hits], ["Tin Ingot"])
+        self.assertEqual(hits[0]['name_html'], "Tin <mark>Ingot</mark>")
+        self.assertTrue(hits[0]['link'].startswith('/configure/item/'))
+
+        html = self.client.get('/configure/search?q=ore').get_data(
+            as_text=True)
+        self.assertIn("Iron <mark>Ore</mark>", html)
+        self.assertIn("/configure/lookup/item/11", html)
+
+if __name__ == '__main__':
+    unittest.main()
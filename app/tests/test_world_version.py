@@ -0,0 +1,191 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_world_version
+"""
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from sqlalchemy import delete, select
+from app.models import (
+    db, GENERAL_ID, GameMessage, GameVersion, Item, Pile, Progress, Recipe,
+    StorageType)
+from app.src.logic_user_interaction import add_message
+from app.src.logic_world_version import config_version, world_version
+from .testing_utils import BaseTestCase
+
+class TestWorldVersion(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        tok = self.game_token
+        db.session.add_all([
+            Item(id=10, game_token=tok, name="Wood",
+                 storage_type=StorageType.UNIVERSAL, toplevel=True),
+            Recipe(id=20, game_token=tok, product_id=10, rate_amount=1.0,
+                   rate_duration=3600),
+        ])
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['game_token'] = tok
+
+    def get(self, url, etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(url, headers=headers)
+
+    def test_unchanged_page_not_modified(self):
+        first = self.get('/overview')
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        self.assertEqual(first.headers['Cache-Control'], 'private, no-cache')
+
+        # Presence tracking commits on every request but doesn't count
+        second = self.get('/overview', etag)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.get_data(), b'')
+
+        db.session.add(Pile(
+            game_token=self.game_token, item_id=10, owner_id=GENERAL_ID,
+            quantity=5.0))
+        db.session.commit()
+        third = self.get('/overview', etag)
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third.headers['ETag'], etag)
+
+    def test_settings_change_etag(self):
+        etag = self.get('/play/item/10').headers['ETag']
+        self.assertEqual(self.get('/play/item/10', etag).status_code, 304)
+        with self.client.session_transaction() as sess:
+            sess['number_format'] = 'de_DE'
+        self.assertEqual(self.get('/play/item/10', etag).status_code, 200)
+
+    def test_tick_bumps_version(self):
+        started = datetime.now(timezone.utc).replace(tzinfo=None)
+        db.session.add(Progress(
+            game_token=self.game_token, recipe_id=20, product_id=10,
+            owner_id=GENERAL_ID, host_id=GENERAL_ID, start_time=started))
+        db.session.commit()
+        url = f'/production/status/item/10/owner/{GENERAL_ID}'
+
+        first = self.client.post(url)
+        etag = first.headers['ETag']
+        self.assertEqual(first.get_json()['main']['quantity'], '0')
+        # No batch has finished yet
+        response = self.client.post(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        later = datetime.now(timezone.utc) + timedelta(hours=1, seconds=5)
+
+        class LaterDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return later.astimezone(tz) if tz else later
+
+        with mock.patch('app.src.logic_progress.datetime', LaterDatetime):
+            response = self.client.post(
+                url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['main']['quantity'], '1')
+
+    def test_overview_delta(self):
+        add_message("Wood produced", commit=True)
+        page = self.get('/overview')
+        layout = page.get_data(as_text=True).split(
+            'PAGE_LAYOUT = "')[1].split('"')[0]
+        since = GameMessage.query.filter_by(
+            game_token=self.game_token).one().id
+
+        first = self.get(f'/overview/delta?since={since}')
+        data = first.get_json()
+        self.assertEqual(data['layout'], layout)
+        self.assertEqual(data['items'], [
+            {'id': 10, 'quantity': '0', 'producing': False}])
+        self.assertFalse(data['log_replaced'])
+        self.assertEqual(
+            [(m['text'], m['count']) for m in data['log']],
+            [("Wood produced", 1)])
+        self.assertEqual(self.get(
+            f'/overview/delta?since={since}', first.headers['ETag']
+            ).status_code, 304)
+
+        db.session.add(Pile(
+            game_token=self.game_token, item_id=10, owner_id=GENERAL_ID,
+            quantity=1500.0))
+        add_message("Wood produced", commit=True)
+        data = self.get(f'/overview/delta?since={since}').get_json()
+        self.assertEqual(data['items'][0]['quantity'], '1,500')
+        self.assertEqual(data['log'][0]['count'], 2)
+
+        # A message id the page has that no longer exists
+        data = self.get('/overview/delta?since=999999').get_json()
+        self.assertTrue(data['log_replaced'])
+        self.assertEqual(len(data['log']), 1)
+
+    def test_bulk_and_rolled_back_changes(self):
+        before = world_version(self.game_token)
+        db.session.add(Pile(
+            game_token=self.game_token, item_id=10, owner_id=GENERAL_ID,
+            quantity=5.0))
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(world_version(self.game_token), before)
+
+        db.session.execute(delete(GameMessage).filter_by(
+            game_token=self.game_token))
+        db.session.commit()
+        self.assertEqual(
+            world_version(self.game_token), (before[0], before[1] + 1))
+
+        # Not limited to one game
+        db.session.execute(delete(GameMessage))
+        db.session.commit()
+        epoch, version = world_version(self.game_token)
+        self.assertEqual((epoch, version), (before[0] + 1, before[1] + 1))
+
+    def test_capped_log_write_leaves_other_games(self):
+        other = 'other-token-456'
+        db.session.add(Item(id=10, game_token=other, name="Stone"))
+        db.session.commit()
+        before = world_version(other)
+
+        # Drops the oldest message in a bulk delete
+        self.app.config['CHRONICLE_MAX_MESSAGES'] = 1
+        add_message("First", commit=True)
+        add_message("Second", commit=True)
+        self.assertEqual(
+            GameMessage.query.filter_by(game_token=self.game_token).count(),
+            1)
+        self.assertEqual(world_version(other), before)
+
+    def test_configure_save_leaves_other_games(self):
+        other = 'other-token-456'
+        db.session.add(Item(id=10, game_token=other, name="Stone"))
+        db.session.commit()
+        mine = config_version(self.game_token)
+        others = config_version(other)
+
+        # Saving replaces the item's limits and abilities in bulk
+        response = self.client.post(
+            '/configure/item/10', data={'name': "Oak", 'description': ""})
+        self.assertLess(response.status_code, 400)
+        self.assertEqual(config_version(self.game_token)[0], mine[0])
+        self.assertGreater(config_version(self.game_token)[1], mine[1])
+        self.assertEqual(config_version(other), others)
+
+    def test_version_committed_with_changes(self):
+        before = world_version(self.game_token)
+        db.session.add(Pile(
+            game_token=self.game_token, item_id=10, owner_id=GENERAL_ID,
+            quantity=5.0))
+        db.session.commit()
+
+        # Other workers read it from the database
+        with db.engine.connect() as connection:
+            stored = connection.execute(
+                select(GameVersion.world).filter_by(
+                    game_token=self.game_token)).scalar()
+        self.assertEqual(stored, before[1] + 1)
+        self.assertEqual(
+            world_version(self.game_token), (before[0], before[1] + 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Run from project root in venv:
+python -m unittest app.tests.test_worldgen
+"""
+import io
+import json
+import unittest
+from app.models import (
+    db, Character, Event, EventLink, Item, Location, Pile, Recipe,
+    StorageType)
+from app.src.logic_worldgen import generate_world
+from .testing_utils import BaseTestCase
+
+SMALL = {
+    'items': 80, 'recipe_depth': 5, 'attribs': 6, 'characters': 12,
+    'locations': 5, 'grid': 40, 'local_piles': 8, 'events': 30}
+
+class TestWorldGen(BaseTestCase):
+
+    def test_same_seed_same_world(self):
+        self.assertEqual(generate_world(7, **SMALL), generate_world(7, **SMALL))
+        self.assertNotEqual(
+            generate_world(7, **SMALL), generate_world(8, **SMALL))
+
+    def test_recipe_depth(self):
+        items = generate_world(1, **SMALL)['entities']['items']
+        sources = {
+            item['id']: {
+                source['item_id']
+                for recipe in item['recipes']
+                for source in recipe.get('sources', [])}
+            for item in items}
+        depth = {}
+        for item in items:  # sources always come earlier
+            depth[item['id']] = 1 + max(
+                (depth[src] for src in sources[item['id']]), default=0)
+        self.assertEqual(max(depth.values()), SMALL['recipe_depth'])
+
+    def test_imports(self):
+        data = generate_world(2, **SMALL)
+        with self.client.session_transaction() as sess:
+            sess['game_token'] = self.game_token
+        response = self.client.post('/upload', data={
+            'file': (io.BytesIO(json.dumps(data).encode()), 'world.json')})
+        self.assertEqual(response.status_code, 302)
+
+        def count(model):
+            return model.query.filter_by(game_token=self.game_token).count()
+
+        entities = data['entities']
+        self.assertEqual(count(Item), SMALL['items'])
+        self.assertEqual(count(Location), SMALL['locations'])
+        self.assertEqual(count(Character), SMALL['characters'])
+        self.assertEqual(count(Event), SMALL['events'])
+        self.assertEqual(
+            count(Recipe), sum(len(item['recipes']) for item in entities['items']))
+        self.assertEqual(
+            count(EventLink),
+            sum(len(ev.get('chained', [])) for ev in entities['events']))
+        local = db.session.query(Pile).join(Item, db.and_(
+            Item.game_token == Pile.game_token, Item.id == Pile.item_id)
+        ).filter(
+            Pile.game_token == self.game_token,
+            Item.storage_type == StorageType.LOCAL).count()
+        self.assertEqual(
+            local, sum(len(loc['items']) for loc in entities['locations']))
+        self.assertEqual(self.client.get('/overview').status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
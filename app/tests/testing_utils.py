@@ -2,6 +2,7 @@ import unittest
 from flask import g
 from app import create_app, db
 from app.serialization import init_game_session
+from app.src.logic_fragment_cache import fragment_cache
 
 class BaseTestCase(unittest.TestCase):
     def setUp(self):
@@ -18,6 +19,9 @@ class BaseTestCase(unittest.TestCase):
         # Create all tables in the in-memory DB
         db.create_all()
 
+        # Every test reuses the token, so drop fragments from earlier ones
+        fragment_cache.clear()
+
         # Bootstrap the session
         self.game_token = "test-token-123"
         g.game_token = self.game_token
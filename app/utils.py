@@ -1,15 +1,18 @@
-import locale
 import logging
 import json
 import re
+import hashlib
+import threading
+from collections import OrderedDict
 from flask import session, request, url_for, redirect
 from sqlalchemy import func, literal_column, text as sa_text
 import markdown
-from markupsafe import Markup
+from markupsafe import Markup, escape
 import bleach
 from bleach.css_sanitizer import CSSSanitizer
 from .models import GENERAL_ID, StorageType
 from .database import USE_SQLITE
+from .src.logic_metrics import HTMLIFY_CACHE_BYTES, HTMLIFY_CACHE_LOOKUPS
 
 logger = logging.getLogger(__name__)
 
@@ -259,11 +262,59 @@ class LinkLetters:
 # Number Formatting
 # ------------------------------------------------------------------------
 
-def format_num(value, nformat='en_US'):
+class LocaleFormat:
     """
-    Formats a number based on the session's 'number_format' setting.
-    Supports: 'sci', 'abbr', and standard locales like 'en_US' or 'de_DE'.
+    Grouped number with up to 3 decimal digits, using fixed separators
+    instead of setlocale, which changes the whole process.
     """
+    def __init__(self, group_sep, decimal_point):
+        self.decimal_point = decimal_point
+        self.table = str.maketrans({',': group_sep, '.': decimal_point})
+
+    def __call__(self, value):
+        # Strip trailing zeros and the decimal point if it becomes empty
+        val_str = f"{value:,.3f}".rstrip('0').rstrip('.')
+        return val_str.translate(self.table)
+
+_SCI_EXPONENT = re.compile(r'e(\+|-)0?(\d)')
+
+def _format_sci(value):
+    """Scientific: 1.23e6"""
+    formatted = "{:.2e}".format(value)
+    # Clean up leading zeros in exponent for readability
+    return _SCI_EXPONENT.sub(
+        lambda m: f"e{'-' if m.group(1) == '-' else ''}{m.group(2)}",
+        formatted)
+
+def _format_abbr(value):
+    """Abbreviated: 1.23m"""
+    chunk = 0
+    abs_val = abs(value)
+    while abs_val >= 1000 and chunk < len(BIGNUM_SUFFIXES) - 1:
+        abs_val /= 1000.0
+        chunk += 1
+    # Use 2 decimal places for abbreviated chunks
+    return f"{abs_val if value >=0 else -abs_val:.2f}{BIGNUM_SUFFIXES[chunk]}"
+
+# Key: number_format setting → function of a float
+NUMBER_FORMATTERS = {
+    'sci': _format_sci,
+    'abbr': _format_abbr,
+    'en_US': LocaleFormat(',', '.'),
+    'de_DE': LocaleFormat('.', ','),
+}
+# Like the C locale, for unknown settings
+_PLAIN_FORMAT = LocaleFormat('', '.')
+
+def get_formatter(nformat):
+    """Accepts names with an encoding too, such as 'de_DE.UTF-8'."""
+    formatter = NUMBER_FORMATTERS.get(nformat)
+    if formatter is None:
+        formatter = NUMBER_FORMATTERS.get(
+            (nformat or '').split('.')[0], _PLAIN_FORMAT)
+    return formatter
+
+def _format_with(formatter, value):
     if value is None or value == '':
         return ''
 
@@ -276,38 +327,19 @@ def format_num(value, nformat='en_US'):
     if abs(value) < 1000 and int(value) == value:
         return str(int(value))
 
-    if nformat == "sci":  # Scientific: 1.23e6
-        formatted = "{:.2e}".format(value)
-        # Clean up leading zeros in exponent for readability
-        formatted = re.sub(r'e\+0?(\d)', r'e\1', formatted)
-        formatted = re.sub(r'e-0?(\d)', r'e-\1', formatted)
-        return formatted
-
-    if nformat == "abbr":  # Abbreviated: 1.23m
-        chunk = 0
-        abs_val = abs(value)
-        while abs_val >= 1000 and chunk < len(BIGNUM_SUFFIXES) - 1:
-            abs_val /= 1000.0
-            chunk += 1
-        # Use 2 decimal places for abbreviated chunks
-        return f"{abs_val if value >=0 else -abs_val:.2f}{BIGNUM_SUFFIXES[chunk]}"
-
-    # Standard Locale Formatting
-    try:
-        # Fallback to C if locale is invalid
-        current_locale = nformat if '.' in nformat else f"{nformat}.UTF-8"
-        locale.setlocale(locale.LC_ALL, current_locale)
-    except locale.Error:
-        locale.setlocale(locale.LC_ALL, 'C')
+    return formatter(value)
 
-    # Show up to 3 decimal digits
-    try:
-        val_str = locale.format_string("%.3f", value, grouping=True)
-        # Strip trailing zeros and the decimal point if it becomes empty
-        val_str = val_str.rstrip('0').rstrip(locale.localeconv()['decimal_point'])
-        return val_str
-    except Exception:
-        return str(value)
+def format_num(value, nformat='en_US'):
+    """
+    Formats a number based on the session's 'number_format' setting.
+    Supports: 'sci', 'abbr', and standard locales like 'en_US' or 'de_DE'.
+    """
+    return _format_with(get_formatter(nformat), value)
+
+def format_many(values, nformat='en_US'):
+    """format_num for each value, looking up the format only once."""
+    formatter = get_formatter(nformat)
+    return [_format_with(formatter, value) for value in values]
 
 def unformat_num(value_str):
     """Remove formatting from a string. Returns a float."""
@@ -496,6 +528,128 @@ def sort_by_name_stripped(items, named=lambda x: x):
 # ------------------------------------------------------------------------
 
 ALLOWED_DESC_VARS = {'char_id', 'loc_id', 'subject_id', 'owner_id', 'host_id'}
+# Stand-ins for ${var} that survive every step unchanged, so the sanitized
+# HTML can be cached and the values from the URL filled in afterwards
+_DESC_VARS = sorted(ALLOWED_DESC_VARS)
+_DESC_VAR_PATTERN = re.compile(r'\$\{([^}]+)\}')
+_DESC_VAR_MARKER = re.compile(r'=descvar(\d+)=')
+# Only values like IDs are filled in; anything else could change a link
+_DESC_VAR_VALUE = re.compile(r'^[\w.\-]*$')
+
+HTMLIFY_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+class HtmlCache:
+    """LRU of sanitized HTML, bounded by the total size of the entries."""
+    def __init__(self, max_bytes=HTMLIFY_CACHE_MAX_BYTES,
+                 lookups=HTMLIFY_CACHE_LOOKUPS, size_gauge=HTMLIFY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.lookups = lookups
+        self.size_gauge = size_gauge
+        self.entries = OrderedDict()  # key -> (html, size)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text, allow_links):
+        return hashlib.blake2b(
+            text.encode('utf-8'), digest_size=16).digest(), allow_links
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                self.lookups.inc('miss')
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        self.lookups.inc('hit')
+        return entry[0]
+
+    def put(self, key, html):
+        size = len(html.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old:
+                self.size -= old[1]
+            self.entries[key] = (html, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _key, (_html, old_size) = self.entries.popitem(last=False)
+                self.size -= old_size
+            self.size_gauge.set(self.size)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.size_gauge.set(0)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+class VersionedCache:
+    """
+    LRU of values built from one version of a game's configuration,
+    bounded by the number of entries. Looking one up with any other
+    version misses, so workers never use what another has made stale.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (version, value)
+        self.lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def peek(self, key):
+        """The value stored under any version, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry[1] if entry else None
+
+    def put(self, key, version, value):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (version, value)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def discard_if(self, predicate):
+        """Drops entries for which predicate(key, value) is true."""
+        with self.lock:
+            stale = [
+                key for key, (_version, value) in self.entries.items()
+                if predicate(key, value)]
+            for key in stale:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+htmlify_cache = HtmlCache()
 
 def htmlify_filter(text, allow_links=True):
     """
@@ -505,14 +659,31 @@ def htmlify_filter(text, allow_links=True):
     if not text:
         return ""
 
-    # 1. Variable Substitution: ${subject_id} -> value from current URL
+    key = HtmlCache.make_key(text, allow_links)
+    html = htmlify_cache.get(key)
+    if html is None:
+        html = _htmlify(text, allow_links)
+        htmlify_cache.put(key, html)
+
+    # Variable Substitution: ${subject_id} -> value from current URL
     def sub_vars(match):
+        value = request.args.get(_DESC_VARS[int(match.group(1))], "")
+        return str(escape(value)) if _DESC_VAR_VALUE.match(value) else ""
+
+    return Markup(_DESC_VAR_MARKER.sub(sub_vars, html))
+
+_CSS_SANITIZER = CSSSanitizer(allowed_css_properties=['color'])
+
+def _htmlify(text, allow_links):
+    """Sanitized HTML with markers where the allowed ${var}s go."""
+    # 1. Mark variables to substitute
+    def mark_vars(match):
         var_name = match.group(1)
         if var_name in ALLOWED_DESC_VARS:
-            return request.args.get(var_name, "")
+            return f"=descvar{_DESC_VARS.index(var_name)}="
         return match.group(0)
 
-    text = re.sub(r'\$\{([^}]+)\}', sub_vars, text)
+    text = _DESC_VAR_PATTERN.sub(mark_vars, text)
 
     # 2. Convert Markdown (Standard Links: [Text](/url))
     html = markdown.markdown(
@@ -562,7 +733,6 @@ def htmlify_filter(text, allow_links=True):
     html = re.sub(r'<p>\s*</p>', '', html)
 
     # 7. Sanitize with Bleach
-    css_sanitizer = CSSSanitizer(allowed_css_properties=['color'])
     allowed_tags = {
         'a', 'b', 'i', 'span', 'div', 'pre', 'code', 'br', 'hr', 'strong', 'em',
         'u', 'p', 'ul', 'ol', 'li', 'h1', 'h2', 'h3', 'sup', 'sub'}
@@ -576,7 +746,7 @@ def htmlify_filter(text, allow_links=True):
         html,
         tags=allowed_tags,
         attributes=allowed_attrs,
-        css_sanitizer=css_sanitizer
+        css_sanitizer=_CSS_SANITIZER
     )
 
-    return Markup(clean_html)
+    return clean_html
@@ -0,0 +1,383 @@
+import copy
+import io
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import statistics
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from flask import g
+from sqlalchemy import event as sa_event
+from app import create_app
+from app.models import (
+    db, ENTITIES, GENERAL_ID, JsonKeys, Event, Item, Location, Pile,
+    Progress, Recipe, Scenario, StorageType, prime_enum_cache)
+from app.serialization import load_scenario_from_path
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'app', 'data_files')
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.25
+# Production has this much to catch up on before every page that ticks
+CATCHUP_SECONDS = 3600
+# Time differences below this are noise rather than regressions
+MIN_MS = 2.0
+METRICS = ('ms', 'queries', 'peak_kb')
+
+# ------------------------------------------------------------------------
+# Fake Clock
+# ------------------------------------------------------------------------
+
+class FakeClock:
+    """Replaces datetime.now() in production code with a settable time."""
+    def __init__(self):
+        self.now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        clock = self
+
+        class FakeDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                now = clock.now
+                return now.astimezone(tz) if tz else now.replace(tzinfo=None)
+
+        self.patches = [
+            mock.patch(f'{module}.datetime', FakeDatetime)
+            for module in ('app.src.logic_progress', 'app.src.routes_play')]
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+    def __enter__(self):
+        for patch in self.patches:
+            patch.start()
+        return self
+
+    def __exit__(self, *_exc):
+        for patch in self.patches:
+            patch.stop()
+
+# ------------------------------------------------------------------------
+# Cases
+# ------------------------------------------------------------------------
+
+class Case:
+    """One endpoint request to measure."""
+    def __init__(self, name, method, url, data=None, ticks=False):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.data = data
+        self.ticks = ticks
+
+    def request(self, client):
+        data = self.data() if callable(self.data) else self.data
+        if self.method == 'POST':
+            return client.post(self.url, data=data)
+        return client.get(self.url)
+
+def start_production(client, game_token):
+    """
+    Starts every general storage recipe that can run, so that pages
+    which tick have work to catch up on. Returns the items being made.
+    """
+    with client.application.app_context():
+        g.game_token = game_token
+        recipes = [
+            (recipe.id, recipe.product_id)
+            for recipe in Recipe.query.filter_by(game_token=game_token)
+            if not recipe.instant and recipe.product
+            and recipe.product.storage_type == StorageType.UNIVERSAL]
+    started = []
+    for recipe_id, product_id in recipes:
+        response = client.post(
+            f'/production/start/host/{GENERAL_ID}',
+            data={'recipe_id': recipe_id, 'owner_id': GENERAL_ID})
+        if response.status_code < 300:
+            started.append(product_id)
+    return started
+
+def build_cases(client, game_token):
+    with client.application.app_context():
+        g.game_token = game_token
+
+        def first_id(model, **filters):
+            row = model.query.filter_by(
+                game_token=game_token, **filters).order_by(model.id).first()
+            return row.id if row else None
+
+        loc_id = first_id(Location)
+        battle_loc_id = first_id(Location, autobattle=True)
+        item_id = first_id(Item)
+        event_id = first_id(Event)
+
+    products = start_production(client, game_token)
+    cases = [Case('overview', 'GET', '/overview', ticks=True)]
+    if loc_id:
+        cases.append(Case(
+            'play_location', 'GET', f'/play/location/{loc_id}'))
+    if item_id:
+        cases.append(Case(
+            'play_item', 'GET', f'/play/item/{item_id}', ticks=True))
+    if products:
+        cases.append(Case(
+            'item_production_status', 'POST',
+            f'/production/status/item/{products[0]}/owner/{GENERAL_ID}',
+            ticks=True))
+    if event_id:
+        cases.append(Case('play_event', 'GET', f'/play/event/{event_id}'))
+        cases.append(Case('roll', 'POST', f'/event/roll/{event_id}'))
+    if battle_loc_id:
+        cases.append(Case(
+            'autobattle_step', 'POST',
+            f'/play/autobattle/{battle_loc_id}/step'))
+    cases.append(Case('save', 'GET', '/save'))
+
+    saved = client.get('/save').get_data()
+    # Replaces the game, so it goes last
+    cases.append(Case('upload', 'POST', '/upload', data=lambda: {
+        'file': (io.BytesIO(saved), 'upload.json')}))
+    return cases
+
+# ------------------------------------------------------------------------
+# Measuring
+# ------------------------------------------------------------------------
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        sa_event.listen(engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *_args):
+        self.count += 1
+
+def measure(client, case, clock, counter, repeat):
+    def run():
+        if case.ticks:
+            clock.advance(CATCHUP_SECONDS)
+        response = case.request(client)
+        response.close()
+        return response.status_code
+
+    status = run()  # warm up caches and compiled plans
+    times = []
+    queries = []
+    for _ in range(repeat):
+        before = counter.count
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count - before)
+
+    # Tracing slows everything down, so memory gets a run of its own
+    tracemalloc.start()
+    run()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'status': status,
+        # Best of the runs, since slower ones are mostly other load
+        'ms': round(min(times), 2),
+        'queries': round(statistics.mean(queries), 1),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+def bench_scenario(filename, repeat):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        app = create_app(db_uri=f'sqlite:///{db_path}')
+        with app.app_context():
+            db.create_all()
+            counter = QueryCounter(db.engine)
+        client = app.test_client()
+        random.seed(0)
+        with FakeClock() as clock:
+            client.get('/overview')
+            if os.path.isfile(filename):
+                # Such as a world from generate_world.py
+                with open(filename, 'rb') as f:
+                    client.post('/upload', data={
+                        'file': (io.BytesIO(f.read()), 'upload.json')})
+            else:
+                client.post('/scenarios', data={'scenario_file': filename})
+            with client.session_transaction() as sess:
+                game_token = sess['game_token']
+            results = {}
+            for case in build_cases(client, game_token):
+                results[case.name] = measure(
+                    client, case, clock, counter, repeat)
+        with app.app_context():
+            db.engine.dispose()
+    return results
+
+def hydrate_all(data, game_token):
+    """Creates every object in a scenario dict, as import does."""
+    count = 0
+    for key, model_cls in ENTITIES.items():
+        for entity in data[JsonKeys.ENTITIES].get(key, []):
+            model_cls.from_dict(entity, game_token)
+            count += 1
+    for pile_data in data[JsonKeys.GENERAL].get('piles', []):
+        Pile.from_dict(pile_data, game_token, owner_id=GENERAL_ID)
+        count += 1
+    Scenario.from_dict(data[JsonKeys.OVERALL], game_token)
+    for prog_data in data.get('progress', []):
+        Progress.from_dict(prog_data, game_token)
+    return count + 1 + len(data.get('progress', []))
+
+def bench_hydration(filename, repeat):
+    """
+    Times from_dict alone over a whole scenario, without the queries and
+    flushes that make up most of an import.
+    """
+    path = filename if os.path.isfile(filename) \
+        else os.path.join(DATA_DIR, filename)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data.setdefault(JsonKeys.ENTITIES, {})
+    data.setdefault(JsonKeys.GENERAL, {})
+    data.setdefault(JsonKeys.OVERALL, {})
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        app = create_app(db_uri=f'sqlite:///{db_path}')
+        with app.test_request_context():
+            db.create_all()
+            g.game_token = 'benchmark'
+            # Enum labels in the data are looked up while hydrating
+            load_scenario_from_path(path)
+            prime_enum_cache(g.game_token)
+            times = []
+            with db.session.no_autoflush:
+                for _ in range(repeat + 1):
+                    # from_dict renames legacy keys in place
+                    copies = copy.deepcopy(data)
+                    start = time.perf_counter()
+                    count = hydrate_all(copies, g.game_token)
+                    times.append((time.perf_counter() - start) * 1000)
+                    db.session.rollback()
+            db.session.remove()
+            db.engine.dispose()
+    # The first run warms up caches
+    best = min(times[1:])
+    return {
+        'objects': count,
+        'ms': round(best, 2),
+        'us_per_object': round(best * 1000 / count, 1),
+    }
+
+def run_hydration(scenarios, repeat):
+    for filename in scenarios:
+        result = bench_hydration(filename, repeat)
+        print(
+            f"{filename:<32}{result['objects']:>6} objects"
+            f"{result['ms']:>9.2f} ms"
+            f"{result['us_per_object']:>8.1f} us each")
+
+def run_benchmarks(scenarios, repeat=DEFAULT_REPEAT):
+    report = {
+        'meta': {
+            'python': sys.version.split()[0],
+            'repeat': repeat,
+            'catchup_seconds': CATCHUP_SECONDS,
+        },
+        'results': {},
+    }
+    for filename in scenarios:
+        print(f"{filename}...", file=sys.stderr)
+        report['results'][filename] = bench_scenario(filename, repeat)
+    return report
+
+# ------------------------------------------------------------------------
+# Comparing
+# ------------------------------------------------------------------------
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Lists (scenario, case, metric, old, new) for every metric that grew
+    by more than the threshold fraction since the baseline.
+    """
+    regressions = []
+    for scenario, cases in current['results'].items():
+        old_cases = baseline['results'].get(scenario, {})
+        for name, result in cases.items():
+            old = old_cases.get(name)
+            if not old:
+                continue
+            for metric in METRICS:
+                before, after = old[metric], result[metric]
+                if after <= before * (1 + threshold):
+                    continue
+                if metric == 'ms' and after - before < MIN_MS:
+                    continue
+                regressions.append((scenario, name, metric, before, after))
+    return regressions
+
+def print_table(report):
+    for scenario, cases in report['results'].items():
+        print(scenario)
+        for name, result in cases.items():
+            print(
+                f"  {name:<24}{result['ms']:>9.2f} ms"
+                f"{result['queries']:>8.1f} queries"
+                f"{result['peak_kb']:>10.1f} KB"
+                + ("" if result['status'] < 400
+                   else f"  (status {result['status']})"))
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the main pages against each bundled scenario.")
+    parser.add_argument(
+        'scenarios', nargs='*',
+        help='Scenario files in data_files or paths to other scenario '
+             'files (default: all in data_files).')
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=DEFAULT_REPEAT,
+        help=f'Timed requests per page (default {DEFAULT_REPEAT}).')
+    parser.add_argument(
+        '--hydrate', action='store_true',
+        help='Instead of pages, time creating model objects from each '
+             'scenario file.')
+    parser.add_argument(
+        '-o', '--out', help='Write the results here as JSON.')
+    parser.add_argument(
+        '--compare', metavar='BASELINE',
+        help='Compare with earlier results and fail on regressions.')
+    parser.add_argument(
+        '--threshold', type=float, default=DEFAULT_THRESHOLD,
+        help='Fraction a value may grow before it counts as a regression '
+             f'(default {DEFAULT_THRESHOLD}).')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.ERROR,
+        format='[%(filename)s:%(lineno)d] - %(message)s')
+
+    scenarios = args.scenarios or sorted(
+        name for name in os.listdir(DATA_DIR) if name.endswith('.json'))
+    if args.hydrate:
+        run_hydration(scenarios, args.repeat)
+        return
+    report = run_benchmarks(scenarios, args.repeat)
+    print_table(report)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+        print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        for scenario, name, metric, before, after in regressions:
+            print(f"REGRESSION {scenario} {name} {metric}: {before} -> {after}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions.")
+
+if __name__ == "__main__":
+    main()
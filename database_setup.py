@@ -1,9 +1,10 @@
 import logging
 import sys
 from flask import Flask
-from sqlalchemy import text
+from sqlalchemy import inspect as sa_inspect, text
 from app import create_app
 from app.database import USE_SQLITE, db, start_db
+from app.models import GameMessage
 
 logger = logging.getLogger(__name__)
 
@@ -31,8 +32,44 @@ def setup_database(app: Flask, drop_first=False):
 
         log_and_print("Initializing tables.")
         db.create_all()
+        for change in upgrade_schema(db.engine):
+            log_and_print(change)
         log_and_print("Finished.")
 
+def upgrade_schema(engine):
+    """
+    Adds what db.create_all() won't to tables that already exist.
+    Safe to run again. Returns a description of each change made.
+    """
+    changes = []
+    table = GameMessage.__table__
+    inspector = sa_inspect(engine)
+    if not inspector.has_table(table.name):
+        return changes
+    columns = {col['name'] for col in inspector.get_columns(table.name)}
+    indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+    with engine.begin() as connection:
+        if 'message_hash' not in columns:
+            connection.execute(text(
+                f"ALTER TABLE {table.name} ADD COLUMN message_hash "
+                f"{table.c.message_hash.type.compile(engine.dialect)}"))
+            changes.append(f"Added {table.name}.message_hash.")
+        rows = connection.execute(text(
+            f"SELECT id, message FROM {table.name} "
+            "WHERE message_hash IS NULL")).all()
+        if rows:
+            connection.execute(
+                text(f"UPDATE {table.name} SET message_hash = :hash "
+                     "WHERE id = :id"),
+                [{'id': msg_id, 'hash': GameMessage.hash_text(message)}
+                 for msg_id, message in rows])
+            changes.append(f"Filled in {len(rows)} message hashes.")
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(connection)
+                changes.append(f"Added index {index.name}.")
+    return changes
+
 if __name__ == "__main__":
     # This allows running 'python database_setup.py' from the terminal
     # to perform a fresh schema creation.
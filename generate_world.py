@@ -0,0 +1,30 @@
+import sys
+import json
+import argparse
+from app.src.logic_worldgen import generate_world, DEFAULT_COUNTS
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a large scenario file for scaling tests.")
+    for key, default in DEFAULT_COUNTS.items():
+        parser.add_argument(
+            f"--{key.replace('_', '-')}", type=int, default=default,
+            dest=key, help=f'(default {default})')
+    parser.add_argument(
+        '--seed', type=int, default=0,
+        help='Random seed; the same seed gives the same world.')
+    parser.add_argument(
+        '-o', '--out', help='Write the scenario here instead of stdout.')
+    args = parser.parse_args()
+
+    counts = {key: getattr(args, key) for key in DEFAULT_COUNTS}
+    text = json.dumps(generate_world(args.seed, **counts), indent=4)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"Scenario written to {args.out}")
+    else:
+        sys.stdout.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
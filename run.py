@@ -18,6 +18,11 @@ def main():
         dest='debug',
         help='Disable Flask debug mode.'
     )
+    parser.add_argument(
+        '--query-stats',
+        action='store_true',
+        help='Count and time SQL queries for each page; see /session/query-stats.'
+    )
     parser.set_defaults(debug=True)
     args = parser.parse_args()
 
@@ -37,7 +42,7 @@ def main():
     log.setLevel(logging.ERROR)
 
     # 2. Initialize App
-    flask_app = create_app()
+    flask_app = create_app(query_stats=args.query_stats)
 
     # 3. Start Database and App
     start_db()
@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import logging
+import argparse
+from flask import g
+from app import create_app
+from app.serialization import export_to_dict
+from app.src.logic_simulation import (
+    run_simulation, DEFAULT_BATTLES, DEFAULT_MAX_ROUNDS)
+
+def load_snapshot(args):
+    """Game data to simulate, from a scenario file or a saved game."""
+    if args.scenario:
+        path = args.scenario
+        if not os.path.exists(path):
+            path = os.path.join(
+                os.path.dirname(__file__), 'app', 'data_files', path)
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    flask_app = create_app()
+    with flask_app.app_context():
+        g.game_token = args.token
+        return export_to_dict()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Simulate autobattles at a location without saving.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        '--scenario', help='Scenario JSON file, or a name in data_files.')
+    source.add_argument(
+        '--token', help='Game token of a game in the database.')
+    parser.add_argument(
+        'loc_id', type=int, help='Location where the battle takes place.')
+    parser.add_argument(
+        '-n', '--battles', type=int, default=DEFAULT_BATTLES,
+        help=f'Number of battles to run (default {DEFAULT_BATTLES}).')
+    parser.add_argument(
+        '-w', '--workers', type=int, default=None,
+        help='Worker processes (default: one per CPU).')
+    parser.add_argument(
+        '--seed', type=int, default=0,
+        help='Base random seed; battle i uses seed + i.')
+    parser.add_argument(
+        '--max-rounds', type=int, default=DEFAULT_MAX_ROUNDS,
+        help='Rounds before a battle counts as a draw.')
+    parser.add_argument(
+        '--no-reset', action='store_false', dest='reset',
+        help="Skip the characters' reset events before each battle.")
+    parser.add_argument(
+        '-o', '--out', help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.ERROR,
+        format='[%(filename)s:%(lineno)d] - %(message)s')
+
+    report = run_simulation(
+        load_snapshot(args), args.loc_id, battles=args.battles,
+        workers=args.workers, seed=args.seed, max_rounds=args.max_rounds,
+        reset=args.reset)
+
+    text = json.dumps(report, indent=4)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"Report written to {args.out}")
+    else:
+        sys.stdout.write(text + "\n")
+
+if __name__ == "__main__":
+    main()